@@ -0,0 +1,56 @@
+# Benchmarks the throughput of validating many files with tools/batch.py
+# for increasing numbers of worker processes.
+
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+from tools.batch import validate_files
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PLAYGROUND_DIR = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground')
+
+
+def create_files(directory, count):
+    ''' Copies the playground documents into a directory until it holds
+        count files, and returns their paths '''
+
+    sources = sorted(glob.glob(os.path.join(PLAYGROUND_DIR, '*.covjson')))
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"{i:06d}.covjson")
+        shutil.copy(sources[i % len(sources)], path)
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunksize', type=int, default=16)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = create_files(directory, args.files)
+        print(f"Validating {args.files} files ({os.cpu_count()} CPUs):")
+        base = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            for _ in validate_files(paths, workers, args.chunksize):
+                pass
+            throughput = len(paths) / (time.perf_counter() - start)
+            base = base or throughput
+            print(f"  {workers:3} workers  {throughput:8.1f} files/s   "
+                  f"scaling {throughput / base:5.2f}x")
@@ -0,0 +1,54 @@
+# Benchmarks the validation of a CoverageCollection with many point
+# coverages, serially and by tools.collection with increasing numbers of
+# worker processes.
+
+import argparse
+import copy
+import json
+import os
+import time
+import warnings
+
+from tools.collection import CollectionValidator
+from tools.validator import create_custom_validator, create_schema_store
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground',
+                           'point-collection.covjson')
+
+
+def get_collection(count):
+    with open(SAMPLE_PATH) as f:
+        doc = json.load(f)
+    coverages = doc["coverages"]
+    doc["coverages"] = [copy.deepcopy(coverages[i % len(coverages)]) for i in range(count)]
+    return doc
+
+
+def time_validation(validator, doc):
+    start = time.perf_counter()
+    validator.validate(doc)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--coverages', type=int, default=50000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--shard-size', type=int, default=500)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    store = create_schema_store()
+    doc = get_collection(args.coverages)
+    print(f"{args.coverages} coverages, {os.cpu_count()} CPUs")
+
+    serial = create_custom_validator("/schemas/coveragejson", store,
+                                     dispatch=True, fast_items=True)
+    serial_time = time_validation(serial, doc)
+    print(f"serial        {serial_time:8.2f} s")
+    for workers in args.workers:
+        validator = CollectionValidator(store, workers, args.shard_size)
+        elapsed = time_validation(validator, doc)
+        print(f"{workers:2} workers    {elapsed:8.2f} s   speedup {serial_time / elapsed:5.2f}x",
+              flush=True)
@@ -0,0 +1,54 @@
+# Benchmarks the validators generated by tools.compile_validator against
+# the native jsonschema validator on the playground coverages.
+
+import argparse
+import glob
+import json
+import os
+import time
+import warnings
+
+from tools.compile_validator import compile_schema_store, load_compiled_module
+from tools.validator import create_custom_validator, create_schema_store
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PLAYGROUND_DIR = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground')
+
+
+def time_validation(validator, docs, repeat):
+    ''' Returns the best time of validating all documents in seconds '''
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            validator.validate(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--root', default='/schemas/coveragejson')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    docs = []
+    for path in sorted(glob.glob(os.path.join(PLAYGROUND_DIR, '**', '*.covjson'), recursive=True)):
+        with open(path) as f:
+            docs.append(json.load(f))
+
+    store = create_schema_store()
+    start = time.perf_counter()
+    module = load_compiled_module(compile_schema_store(store))
+    compile_time = time.perf_counter() - start
+
+    native = time_validation(create_custom_validator(args.root, store), docs, args.repeat)
+    compiled = time_validation(module.Validator(args.root), docs, args.repeat)
+
+    print(f"Validating {len(docs)} playground documents (best of {args.repeat}):")
+    print(f"  compile time:       {compile_time * 1e3:8.2f} ms")
+    print(f"  native:             {native * 1e3:8.2f} ms")
+    print(f"  compiled:           {compiled * 1e3:8.2f} ms")
+    print(f"  speedup:            {native / compiled:8.1f}x")
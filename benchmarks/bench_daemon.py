@@ -0,0 +1,57 @@
+# Benchmarks the latency of validating files with one command line call
+# per file, as shell scripts do, with and without --daemon, compared with
+# the validation alone in a warm process.
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from tools.daemon import DAEMON_DIR_ENV, check_path, create_daemon_validator
+from tools.validator import CACHE_DIR_ENV, DAEMON_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PLAYGROUND_DIR = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground')
+
+
+def time_calls(paths, env):
+    ''' Returns the mean seconds of a command line call per file '''
+
+    start = time.perf_counter()
+    for path in paths:
+        subprocess.run([sys.executable, "-m", "tools.validator", "--daemon-idle-timeout", "10",
+                        path], cwd=ROOT_DIR, env=env, capture_output=True)
+    return (time.perf_counter() - start) / len(paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Number of times every playground document is validated')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    paths = sorted(glob.glob(os.path.join(PLAYGROUND_DIR, '*.covjson'))) * args.rounds
+    validator = create_daemon_validator()
+    start = time.perf_counter()
+    for path in paths:
+        check_path(validator, path)
+    alone = (time.perf_counter() - start) / len(paths)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, **{CACHE_DIR_ENV: os.path.join(directory, "cache"),
+                                  DAEMON_DIR_ENV: os.path.join(directory, "daemon")})
+        direct = time_calls(paths, env)
+        daemon_env = dict(env, **{DAEMON_ENV: "1"})
+        # Starts the daemon
+        time_calls(paths[:1], daemon_env)
+        daemon = time_calls(paths, daemon_env)
+
+    print(f"{len(paths)} files, ms per file:")
+    print(f"  validation alone  {alone * 1000:8.1f}")
+    print(f"  command line      {direct * 1000:8.1f}")
+    print(f"  with --daemon     {daemon * 1000:8.1f}")
@@ -0,0 +1,51 @@
+# Benchmarks the dispatching validator, which only evaluates the if/then
+# branch selected by a discriminator such as "type", against the native one.
+
+import argparse
+import glob
+import json
+import os
+import time
+import warnings
+
+from tools.validator import create_custom_validator, create_schema_store
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PLAYGROUND_DIR = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground')
+
+
+def time_validation(validator, docs, repeat):
+    ''' Returns the best time of validating all documents in seconds '''
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            validator.validate(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    docs = {}
+    for path in sorted(glob.glob(os.path.join(PLAYGROUND_DIR, '**', '*.covjson'), recursive=True)):
+        with open(path) as f:
+            doc = json.load(f)
+        docs.setdefault(doc["type"], []).append(doc)
+
+    store = create_schema_store()
+    native = create_custom_validator("/schemas/coveragejson", store)
+    dispatch = create_custom_validator("/schemas/coveragejson", store, dispatch=True)
+
+    print(f"Validating playground documents by type (best of {args.repeat}):")
+    for doc_type, type_docs in sorted(docs.items()):
+        native_time = time_validation(native, type_docs, args.repeat)
+        dispatch_time = time_validation(dispatch, type_docs, args.repeat)
+        print(f"  {doc_type + f' ({len(type_docs)})':24} native {native_time * 1e3:8.2f} ms   "
+              f"dispatch {dispatch_time * 1e3:8.2f} ms   "
+              f"speedup {native_time / dispatch_time:5.2f}x")
@@ -0,0 +1,61 @@
+# Benchmarks the time to reject NdArrays whose values are all of the wrong
+# type, by finding the first error (--quick), the first 100 errors
+# (--max-errors 100) and all errors (--all), with the native validator of
+# the command line and with the compiled validator.
+
+import argparse
+import time
+import warnings
+
+from tools.compile_validator import create_compiled_validator
+from tools.validator import create_custom_validator, create_schema_store, iter_limited_errors
+
+
+def get_ndarray(size):
+    return {
+        "type": "NdArray",
+        "dataType": "float",
+        "shape": [size],
+        "axisNames": ["x"],
+        "values": ["x"] * size
+    }
+
+
+def time_errors(validator, ndarray, max_errors):
+    ''' Returns the time to find the first max_errors errors (all for None)
+        in seconds '''
+
+    start = time.perf_counter()
+    for _ in iter_limited_errors(validator, ndarray, max_errors):
+        pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-exp', type=int, default=6,
+                        help='Largest array size as power of 10')
+    parser.add_argument('--all-max-exp', type=int, default=5,
+                        help='Largest array size of which all errors are found')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    store = create_schema_store()
+    validators = {
+        "native": create_custom_validator("/schemas/ndArray", store, dispatch=True,
+                                          fast_items=True, memoize=True),
+        "compiled": create_compiled_validator("/schemas/ndArray", store),
+    }
+
+    print(f"{'validator':12}{'size':>12}{'quick':>12}{'100 errors':>12}{'all':>12}")
+    for name, validator in validators.items():
+        for exp in range(3, args.max_exp + 1):
+            ndarray = get_ndarray(10 ** exp)
+            row = f"{name:12}{10 ** exp:>12}"
+            row += f"{time_errors(validator, ndarray, 1):>11.4f}s"
+            row += f"{time_errors(validator, ndarray, 100):>11.4f}s"
+            if exp <= args.all_max_exp:
+                row += f"{time_errors(validator, ndarray, None):>11.4f}s"
+            else:
+                row += f"{'-':>12}"
+            print(row, flush=True)
@@ -0,0 +1,87 @@
+# Benchmarks type checking of NdArray "values" item by item (native)
+# against the bulk check of tools.fast_items, with and without NumPy,
+# for arrays of 10^3 up to 10^max-exp values.
+
+import argparse
+import time
+import warnings
+
+import tools.fast_items as fast_items
+from tools.validator import create_custom_validator, create_schema_store
+
+
+CASES = ["float", "integer", "integer-as-float", "string"]
+
+
+def get_ndarray(case, size, invalid_every):
+    data_type = case.split("-")[0]
+    if case == "float":
+        values = [i * 0.5 for i in range(size)]
+        bad = "x"
+    elif case == "integer":
+        values = list(range(size))
+        bad = 0.5
+    elif case == "integer-as-float":
+        values = [float(i) for i in range(size)]
+        bad = 0.5
+    else:
+        values = [str(i % 1000) for i in range(size)]
+        bad = 1
+    if invalid_every:
+        values[::invalid_every] = [bad] * len(values[::invalid_every])
+    return {
+        "type": "NdArray",
+        "dataType": data_type,
+        "shape": [size],
+        "axisNames": ["x"],
+        "values": values
+    }
+
+
+def time_errors(validator, ndarray, max_errors):
+    ''' Returns the time to collect the first max_errors errors in seconds '''
+
+    start = time.perf_counter()
+    count = 0
+    for _ in validator.iter_errors(ndarray):
+        count += 1
+        if count == max_errors:
+            break
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-exp', type=int, default=7,
+                        help='Largest array size as power of 10 (8 needs ~10 GB of RAM)')
+    parser.add_argument('--native-max-exp', type=int, default=6,
+                        help='Largest array size validated natively')
+    parser.add_argument('--invalid-every', type=int, default=0,
+                        help='Make every n-th value invalid (default: all valid)')
+    parser.add_argument('--max-errors', type=int, default=100,
+                        help='Stop after this many errors')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    store = create_schema_store()
+    native = create_custom_validator("/schemas/ndArray", store)
+    fast = create_custom_validator("/schemas/ndArray", store, fast_items=True)
+    numpy = fast_items.numpy
+
+    print(f"{'values':18}{'size':>12}{'native':>12}{'numpy':>12}{'python':>12}")
+    for case in CASES:
+        for exp in range(3, args.max_exp + 1):
+            ndarray = get_ndarray(case, 10 ** exp, args.invalid_every)
+            row = f"{case:18}{10 ** exp:>12}"
+            if exp <= args.native_max_exp:
+                row += f"{time_errors(native, ndarray, args.max_errors):>11.4f}s"
+            else:
+                row += f"{'-':>12}"
+            if numpy is not None:
+                row += f"{time_errors(fast, ndarray, args.max_errors):>11.4f}s"
+            else:
+                row += f"{'-':>12}"
+            fast_items.numpy = None
+            row += f"{time_errors(fast, ndarray, args.max_errors):>11.4f}s"
+            fast_items.numpy = numpy
+            print(row, flush=True)
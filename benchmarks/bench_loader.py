@@ -0,0 +1,61 @@
+# Benchmarks the parse throughput of the JSON backends of tools.loader
+# installed in this environment, for a grid coverage with a large float
+# range, a collection of coverages with tuple domains and a document
+# with long integers (which orjson leaves to json), with and without
+# pausing the garbage collector.
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.suite import generate_document
+from tools.loader import available_backends, load_file
+
+
+def get_documents(size):
+    ''' Returns documents of roughly size MB '''
+
+    grid_length = int((size * 2 ** 20 / 10) ** 0.5)
+    tuples = max(size * 2 ** 20 // (80 * 50), 1)
+    large_integers = {"type": "Coverage", "values": [2 ** 64 + i for i in range(size * 2 ** 20 // 22)]}
+    return {
+        "grid": generate_document("Grid", grid_length, 1, 1, 1),
+        "trajectory collection": generate_document("Trajectory", 1, 50, 2, tuples),
+        "large integers": large_integers,
+    }
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=20, help='Approximate document size in MB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = available_backends()
+    print(f"{'document':24}{'MB':>8}  {'backend':10}{'MB/s':>8}{'freeze-gc MB/s':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, doc in get_documents(args.size).items():
+            path = os.path.join(tmp, "doc.json")
+            with open(path, "w") as f:
+                json.dump(doc, f)
+            del doc
+            megabytes = os.path.getsize(path) / 2 ** 20
+            for backend in backends:
+                seconds = best_time(lambda: load_file(path, backend), args.repeat)
+                frozen = best_time(lambda: load_file(path, backend, freeze_gc=True), args.repeat)
+                gc.unfreeze()
+                print(f"{name:24}{megabytes:>8.1f}  {backend:10}{megabytes / seconds:>8.1f}"
+                      f"{megabytes / frozen:>16.1f}", flush=True)
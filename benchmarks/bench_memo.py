@@ -0,0 +1,49 @@
+# Benchmarks the validation of a CoverageCollection whose coverages all
+# repeat the grid domain of the playground (like the members of an
+# ensemble forecast), with and without memoizing repeated domains.
+
+import argparse
+import copy
+import json
+import os
+import time
+import warnings
+
+import tools.memo as memo
+from tools.result_cache import format_stats
+from tools.validator import create_custom_validator, create_schema_store
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground', 'grid.covjson')
+
+
+def get_collection(count):
+    with open(SAMPLE_PATH) as f:
+        coverage = json.load(f)
+    collection = {
+        "type": "CoverageCollection",
+        "parameters": coverage.pop("parameters"),
+        "coverages": [copy.deepcopy(coverage) for _ in range(count)],
+    }
+    return collection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--coverages', type=int, default=5000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    store = create_schema_store()
+    doc = get_collection(args.coverages)
+    times = {}
+    for memoize in [False, True]:
+        validator = create_custom_validator("/schemas/coveragejson", store, dispatch=True,
+                                            fast_items=True, memoize=memoize)
+        start = time.perf_counter()
+        validator.validate(doc)
+        times[memoize] = time.perf_counter() - start
+    print(f"{args.coverages} coverages with the same grid domain")
+    print(f"plain     {times[False]:8.2f} s")
+    print(f"memoized  {times[True]:8.2f} s   speedup {times[False] / times[True]:5.2f}x")
+    print("Repeated domains: " + format_stats(memo.get_stats()))
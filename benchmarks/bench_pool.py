@@ -0,0 +1,40 @@
+# Benchmarks the startup time and memory use of the worker processes of
+# tools/batch.py: forked after the validator is created and warmed up in
+# the parent process (PreloadedPool, the default where processes can be
+# forked), and creating their own validator after forking.
+
+import argparse
+import warnings
+
+import tools.batch as batch
+from tools.pool import PreloadedPool
+
+
+def measure(workers, preload):
+    ''' Returns the slowest startup time (s), and the total RSS and
+        private memory (MB) of the workers of a pool '''
+
+    if preload:
+        pool = PreloadedPool(workers, warm_up=lambda: (batch.preload_worker(), batch.warm_up()))
+    else:
+        pool = PreloadedPool(workers, initializer=batch.init_worker)
+    with pool:
+        stats = pool.worker_stats
+    return (max(s["startup_seconds"] for s in stats),
+            sum(s["rss"] for s in stats) / 2 ** 20,
+            sum(s["private"] for s in stats) / 2 ** 20)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    print(f"{'workers':>8}{'mode':>12}{'startup ms':>12}{'RSS MB':>10}{'private MB':>12}")
+    for workers in args.workers:
+        for preload in [True, False]:
+            startup, rss, private = measure(workers, preload)
+            mode = "preloaded" if preload else "per worker"
+            print(f"{workers:>8}{mode:>12}{startup * 1000:>12.0f}{rss:>10.1f}{private:>12.1f}",
+                  flush=True)
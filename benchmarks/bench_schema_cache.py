@@ -0,0 +1,91 @@
+# Benchmarks loading the schema store with and without the persistent cache,
+# both in-process and as end-to-end invocations of the validator CLI.
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.validator import (
+    CACHE_DIR_ENV, create_schema_store, load_cached_schema_store
+)
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground', 'grid.covjson')
+
+
+def time_call(fn, repeat):
+    ''' Returns the best wall-clock time of calling fn in seconds '''
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_in_process(repeat):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        uncached = time_call(create_schema_store, repeat)
+
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            load_cached_schema_store(cache_dir=cache_dir)
+
+        def warm():
+            load_cached_schema_store(cache_dir=cache_dir)
+
+        cold_time = time_call(cold, repeat)
+        warm_time = time_call(warm, repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("In-process schema store loading (best of %d):" % repeat)
+    print(f"  create_schema_store:        {uncached * 1e3:8.2f} ms")
+    print(f"  cold cache (build + write): {cold_time * 1e3:8.2f} ms")
+    print(f"  warm cache (read):          {warm_time * 1e3:8.2f} ms")
+
+
+def bench_cli(repeat, path):
+    cache_dir = tempfile.mkdtemp()
+    env = dict(os.environ, **{CACHE_DIR_ENV: cache_dir})
+    cmd = [sys.executable, "-m", "tools.validator", path]
+
+    def run(extra_args=()):
+        subprocess.run(cmd[:3] + list(extra_args) + cmd[3:], cwd=ROOT_DIR,
+                       env=env, check=True, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL)
+
+    try:
+        no_cache = time_call(lambda: run(["--no-cache"]), repeat)
+
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            run()
+
+        cold_time = time_call(cold, repeat)
+        warm_time = time_call(run, repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("End-to-end CLI invocation (best of %d):" % repeat)
+    print(f"  --no-cache:                 {no_cache * 1e3:8.2f} ms")
+    print(f"  cold cache:                 {cold_time * 1e3:8.2f} ms")
+    print(f"  warm cache:                 {warm_time * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--cli-repeat', type=int, default=5)
+    parser.add_argument('--path', default=SAMPLE_PATH,
+                        help='CoverageJSON document used for CLI invocations')
+    args = parser.parse_args()
+
+    bench_in_process(args.repeat)
+    bench_cli(args.cli_repeat, args.path)
@@ -0,0 +1,97 @@
+# Load-tests the validation service (python -m tools.validator serve) and
+# compares its request latency with one-shot invocations of the CLI.
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground', 'grid.covjson')
+
+
+def percentiles(latencies):
+    ''' Returns the p50 and p99 of latencies in milliseconds '''
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49] * 1e3, cuts[98] * 1e3
+
+
+def wait_for_server(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port)
+            conn.request("GET", "/health")
+            conn.getresponse().read()
+            return
+        except ConnectionError:
+            time.sleep(0.05)
+    raise RuntimeError("The server did not start")
+
+
+def run_client(port, body, count):
+    ''' Sends count requests over one connection, returning their latencies '''
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        conn.request("POST", "/schemas/coveragejson", body)
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 200
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+    return latencies
+
+
+def time_cli(count):
+    ''' Returns the latencies of count invocations of the CLI '''
+
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-W', 'ignore', '-m', 'tools.validator', SAMPLE_PATH],
+                       cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=8,
+                        help='Number of concurrent connections')
+    parser.add_argument('--cli-runs', type=int, default=20)
+    parser.add_argument('--port', type=int, default=8138)
+    args = parser.parse_args()
+
+    with open(SAMPLE_PATH, 'rb') as f:
+        body = f.read()
+
+    server = subprocess.Popen(
+        [sys.executable, '-W', 'ignore', '-m', 'tools.validator', 'serve', '--port', str(args.port)],
+        cwd=ROOT_DIR)
+    try:
+        wait_for_server(args.port)
+        per_client = args.requests // args.clients
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.clients) as executor:
+            results = executor.map(run_client, [args.port] * args.clients,
+                                   [body] * args.clients, [per_client] * args.clients)
+            latencies = [latency for result in results for latency in result]
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    p50, p99 = percentiles(latencies)
+    print(f"Server: {len(latencies)} requests from {args.clients} clients, "
+          f"{len(latencies) / elapsed:.0f} requests/s, p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    p50, p99 = percentiles(time_cli(args.cli_runs))
+    print(f"CLI:    {args.cli_runs} runs, p50 {p50:.2f} ms, p99 {p99:.2f} ms")
@@ -0,0 +1,117 @@
+# Benchmarks the startup of the command line of tools/validator.py: the
+# modules imported by `python -X importtime` and the time to the first
+# verdict for documents rejected before the validator is loaded, and for
+# valid documents validated with the native and the precompiled validator
+# (see python -m tools.compile_validator --cache). Times are the best of
+# several runs, which take turns to even out changes of the load of the
+# machine, and include the startup of the interpreter, which is reported
+# separately.
+# benchmarks.suite --startup records these times and compares them with
+# a baseline.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.compile_validator import write_precompiled_module
+from tools.validator import CACHE_DIR_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground', 'point.covjson')
+
+# Modules the cheap paths of the command line should not import
+HEAVY_MODULES = ["jsonschema", "referencing", "numpy"]
+
+
+def run_time(args, env=None):
+    ''' Returns the wall time of running python with args, in seconds '''
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT_DIR, env=env, capture_output=True)
+    return time.perf_counter() - start
+
+
+def import_times(args, env=None):
+    ''' Returns the self and cumulative import time in seconds of every
+        module imported by running python with args, in import order '''
+
+    result = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=ROOT_DIR, env=env,
+                            capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+    return times
+
+
+def get_cases(directory):
+    ''' Returns the command line arguments and environment of every case '''
+
+    not_object = os.path.join(directory, "not-object.json")
+    unknown_type = os.path.join(directory, "unknown-type.json")
+    with open(not_object, "w") as f:
+        json.dump([1, 2, 3], f)
+    with open(unknown_type, "w") as f:
+        json.dump({"type": "Feature"}, f)
+
+    native_env = dict(os.environ, **{CACHE_DIR_ENV: os.path.join(directory, "native")})
+    precompiled_env = dict(os.environ, **{CACHE_DIR_ENV: os.path.join(directory, "precompiled")})
+    write_precompiled_module(cache_dir=precompiled_env[CACHE_DIR_ENV])
+    # Fills the schema store cache, which every later run reads
+    subprocess.run([sys.executable, "-m", "tools.validator", SAMPLE_PATH], cwd=ROOT_DIR,
+                   env=native_env, capture_output=True, check=True)
+    cases = {
+        "help": (["--help"], native_env),
+        "not-object": ([not_object], native_env),
+        "unknown-type": ([unknown_type], native_env),
+        "valid-native": ([SAMPLE_PATH], native_env),
+        "valid-precompiled": ([SAMPLE_PATH], precompiled_env),
+    }
+    return {name: (["-m", "tools.validator"] + args, env) for name, (args, env) in cases.items()}
+
+
+def measure_startup(repeat=5):
+    ''' Returns the time to the first verdict of every case and the heavy
+        modules it imports, and under "interpreter" the time of python
+        doing nothing '''
+
+    with tempfile.TemporaryDirectory() as directory:
+        cases = dict(interpreter=(["-c", "pass"], None), **get_cases(directory))
+        seconds = dict.fromkeys(cases, float("inf"))
+        for _ in range(repeat):
+            for name, (args, env) in cases.items():
+                seconds[name] = min(seconds[name], run_time(args, env))
+        return {
+            name: {"seconds": seconds[name],
+                   "heavy_modules": [m for m in HEAVY_MODULES if m in import_times(args, env)]}
+            for name, (args, env) in cases.items()
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15,
+                        help='Number of the slowest imports of tools.validator printed')
+    args = parser.parse_args()
+
+    imported = import_times(["-c", "import tools.validator"])
+    print(f"import tools.validator: {imported['tools.validator'][1] * 1000:.1f} ms")
+    # The modules imported by the interpreter itself come first
+    names = list(imported)
+    names = names[names.index("site") + 1:] if "site" in names else names
+    slowest = sorted(((name, imported[name]) for name in names),
+                     key=lambda item: item[1][0], reverse=True)
+    for name, (self_seconds, cumulative_seconds) in slowest[:args.top]:
+        print(f"  {name:40}{self_seconds * 1000:8.1f} ms self{cumulative_seconds * 1000:8.1f} ms")
+
+    print(f"\n{'case':20}{'first verdict ms':>18}  heavy modules")
+    for name, result in measure_startup(args.repeat).items():
+        print(f"{name:20}{result['seconds'] * 1000:>18.1f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
@@ -0,0 +1,63 @@
+# Benchmarks the throughput of validating the point coverage of the
+# playground from several threads, with one validator of
+# create_shared_validator shared by all threads and with a validator of
+# create_custom_validator per thread. Only free-threaded builds of Python
+# validate in parallel; with the GIL the threads take turns.
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.validator import create_custom_validator, create_schema_store, create_shared_validator
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SAMPLE_PATH = os.path.join(ROOT_DIR, 'test', 'test_data', 'playground', 'point.covjson')
+
+SCHEMA_ID = "/schemas/coveragejson"
+
+
+def run(get_validator, doc, threads, calls):
+    ''' Returns the validations per second of calls validations '''
+
+    with ThreadPoolExecutor(threads) as executor:
+        # Creates the validators of the threads before timing
+        list(executor.map(lambda _: get_validator(), range(threads * 4)))
+        start = time.perf_counter()
+        list(executor.map(lambda _: get_validator().validate(doc), range(calls)))
+        return calls / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--calls', type=int, default=1000)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, {'GIL' if gil else 'free-threaded'}, "
+          f"{os.cpu_count()} CPUs")
+
+    store = create_schema_store()
+    with open(SAMPLE_PATH) as f:
+        doc = json.load(f)
+
+    print(f"{'threads':>8}{'shared/s':>12}{'per thread/s':>14}")
+    for threads in args.threads:
+        shared = create_shared_validator(SCHEMA_ID, store, dispatch=True, fast_items=True)
+        local = threading.local()
+
+        def get_local_validator():
+            if not hasattr(local, "validator"):
+                local.validator = create_custom_validator(SCHEMA_ID, store, dispatch=True,
+                                                          fast_items=True)
+            return local.validator
+
+        shared_rate = run(lambda: shared, doc, threads, args.calls)
+        local_rate = run(get_local_validator, doc, threads, args.calls)
+        print(f"{threads:>8}{shared_rate:>12.1f}{local_rate:>14.1f}", flush=True)
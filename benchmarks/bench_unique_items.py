@@ -0,0 +1,64 @@
+# Benchmarks the "uniqueItems" check of large composite axes (tuples of
+# trajectories, tuples mixing numbers and strings, polygons) of jsonschema
+# against the hash-based check of tools.unique_items, for axes of 10^3 up
+# to 10^max-exp values, and the validation of the axes as a whole.
+
+import argparse
+import time
+import warnings
+
+from jsonschema._utils import uniq
+
+from tools.unique_items import is_unique
+from tools.validator import create_custom_validator, create_schema_store
+
+CASES = ["trajectory", "tuple-mixed", "polygon"]
+
+
+def get_axis(case, size):
+    if case == "trajectory":
+        values = [[f"2008-01-01T{i % 24:02d}:{i % 60:02d}:00Z", i * 1e-3, 20 + i * 1e-4]
+                  for i in range(size)]
+        return {"dataType": "tuple", "coordinates": ["t", "x", "y"], "values": values}
+    if case == "tuple-mixed":
+        # Cannot be sorted, so jsonschema compares all pairs
+        values = [[i if i % 2 else str(i), i * 1e-3] for i in range(size)]
+        return {"dataType": "tuple", "coordinates": ["z", "x"], "values": values}
+    values = [[[[i, 0.0], [i + 1, 0.0], [i + 1, 1.0], [i, 1.0], [i, 0.0]]]
+              for i in range(size)]
+    return {"dataType": "polygon", "coordinates": ["x", "y"], "values": values}
+
+
+def time_call(fn, arg):
+    start = time.perf_counter()
+    assert fn(arg)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-exp', type=int, default=6,
+                        help='Largest axis size as power of 10')
+    parser.add_argument('--native-max-exp', type=int, default=5,
+                        help='Largest axis size checked by jsonschema '
+                             '(at most 10^3 for tuple-mixed, which is O(n^2))')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    store = create_schema_store()
+    native = create_custom_validator("/schemas/anyAxis", store)
+    fast = create_custom_validator("/schemas/anyAxis", store, fast_items=True)
+
+    print(f"{'':30}{'uniqueItems':>24}{'whole axis':>24}")
+    print(f"{'axis':18}{'size':>12}{'native':>12}{'hashed':>12}{'native':>12}{'fast':>12}")
+    for case in CASES:
+        max_exp = min(args.native_max_exp, 3) if case == "tuple-mixed" else args.native_max_exp
+        for exp in range(3, args.max_exp + 1):
+            axis = get_axis(case, 10 ** exp)
+            native_uniq = native_axis = "-"
+            if exp <= max_exp:
+                native_uniq = f"{time_call(uniq, axis['values']):.4f}s"
+                native_axis = f"{time_call(native.is_valid, axis):.4f}s"
+            print(f"{case:18}{10 ** exp:>12}{native_uniq:>12}"
+                  f"{time_call(is_unique, axis['values']):>11.4f}s{native_axis:>12}"
+                  f"{time_call(fast.is_valid, axis):>11.4f}s", flush=True)
@@ -0,0 +1,357 @@
+# A benchmark suite timing the loading and validation of synthetic
+# coverages of every domain type of test/generate_domains.py, for sweeps
+# of axis lengths, composite axis sizes (number of tuples or polygons),
+# parameter counts and collection sizes, and measuring their memory use.
+# The results are written as JSON, to track scaling curves and compare
+# releases (see --baseline):
+#
+#   python -m benchmarks.suite --axis-lengths 10 100 1000 --output results.json
+#
+# With --startup, the time to the first verdict of the command line is
+# recorded too (see benchmarks/bench_startup.py), and the suite fails if it
+# regressed by more than --startup-threshold compared with the baseline.
+
+import argparse
+import datetime
+import importlib.metadata
+import itertools
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import jsonschema
+
+from benchmarks.bench_startup import measure_startup
+from test.generate_domains import DOMAIN_TYPES
+from tools.bundle_schema import bundle_schema
+from tools.compile_validator import create_compiled_validator
+from tools.downgrade_schema_to_draft07 import downgrade_schema_to_draft07
+from tools.validator import create_custom_validator, create_schema_store, create_shared_validator
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+SCHEMA_ID = "/schemas/coveragejson"
+MODES = ["native", "native-fast", "native-shared", "draft-07-bundle", "compiled"]
+
+START_TIME = datetime.datetime(2008, 1, 1, 4, tzinfo=datetime.timezone.utc)
+
+# Properties of a result identifying its case
+CASE_KEYS = ["domain_type", "axis_length", "composite_count", "parameters",
+             "collection_size", "mode"]
+
+
+def create_validator(mode, schema_store):
+    ''' Creates a validator like the test fixture of the same mode '''
+
+    if mode == "native":
+        return create_custom_validator(SCHEMA_ID, schema_store)
+    if mode == "native-fast":
+        return create_custom_validator(SCHEMA_ID, schema_store, dispatch=True, fast_items=True)
+    if mode == "native-shared":
+        return create_shared_validator(SCHEMA_ID, schema_store, dispatch=True, fast_items=True)
+    if mode == "draft-07-bundle":
+        schema = downgrade_schema_to_draft07(bundle_schema(schema_store, SCHEMA_ID))
+        return jsonschema.Draft7Validator(schema)
+    if mode == "compiled":
+        return create_compiled_validator(SCHEMA_ID, schema_store)
+    raise ValueError(f"Unknown mode {mode}")
+
+
+def axis_values(name, length):
+    ''' Returns a values or regularly spaced axis with length coordinates '''
+
+    if length == 1:
+        value = START_TIME.strftime("%Y-%m-%dT%H:%M:%SZ") if name == "t" else 1.0
+        return {"values": [value]}
+    if name in ("x", "y"):
+        return {"start": 0.0, "stop": float(length - 1), "num": length}
+    if name == "z":
+        return {"values": [i * 10.0 for i in range(length)]}
+    return {"values": [(START_TIME + datetime.timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+                       for i in range(length)]}
+
+
+def composite_values(data_type, coordinates, count):
+    ''' Returns count distinct tuples or polygons '''
+
+    if data_type == "polygon":
+        return [[[[i, 0.0], [i + 1.0, 0.0], [i + 1.0, 1.0], [i, 1.0], [i, 0.0]]]
+                for i in range(count)]
+    values = []
+    for i in range(count):
+        time_value = (START_TIME + datetime.timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        values.append([time_value if c == "t" else i * 0.01 for c in coordinates])
+    return values
+
+
+def generate_domain(domain_type, axis_length, composite_count):
+    ''' Returns a domain of a type of DOMAIN_TYPES whose axes with several
+        coordinates ("+") have axis_length of them, and whose composite axis
+        with several values has composite_count tuples or polygons.
+        Optional axes ("[1]", "[+]") have a single coordinate. '''
+
+    spec = DOMAIN_TYPES[domain_type]
+    axes = {}
+    for name in ["x", "y", "z", "t"]:
+        cardinality = getattr(spec, name)
+        if cardinality:
+            axes[name] = axis_values(name, axis_length if cardinality == "+" else 1)
+
+    coordinates = [name for name in axes]
+    if spec.composite:
+        composite_coordinates = next(list(c) for c in spec.composite.coordinates
+                                     if not set(c) & set(axes))
+        count = composite_count if spec.composite.cardinality == "+" else 1
+        axes["composite"] = {
+            "dataType": spec.composite.data_type,
+            "coordinates": composite_coordinates,
+            "values": composite_values(spec.composite.data_type, composite_coordinates, count),
+        }
+        coordinates += composite_coordinates
+
+    referencing = []
+    if "t" in coordinates:
+        referencing.append({"coordinates": ["t"],
+                            "system": {"type": "TemporalRS", "calendar": "Gregorian"}})
+    if "x" in coordinates and "y" in coordinates:
+        referencing.append({"coordinates": ["x", "y"],
+                            "system": {"type": "GeographicCRS",
+                                       "id": "http://www.opengis.net/def/crs/OGC/1.3/CRS84"}})
+    if "z" in coordinates:
+        referencing.append({"coordinates": ["z"],
+                            "system": {"type": "VerticalCRS",
+                                       "id": "http://www.opengis.net/def/crs/EPSG/0/5703"}})
+    return {"type": "Domain", "domainType": domain_type, "axes": axes,
+            "referencing": referencing}
+
+
+def axis_length(axis):
+    return axis["num"] if "num" in axis else len(axis["values"])
+
+
+def generate_document(domain_type, axis_length_, composite_count, parameters, collection_size):
+    ''' Returns a Coverage, or a CoverageCollection of collection_size
+        coverages, with the given number of parameters, each with a float
+        range over all axes of the domain '''
+
+    domain = generate_domain(domain_type, axis_length_, composite_count)
+    axis_names = list(domain["axes"])
+    shape = [axis_length(axis) for axis in domain["axes"].values()]
+    size = math.prod(shape)
+    params = {
+        f"P{i}": {
+            "type": "Parameter",
+            "observedProperty": {"label": {"en": f"Property {i}"}},
+        }
+        for i in range(parameters)
+    }
+    ranges = {
+        key: {"type": "NdArray", "dataType": "float", "axisNames": axis_names,
+              "shape": shape, "values": [j * 0.5 for j in range(size)]}
+        for key in params
+    }
+    coverage = {"type": "Coverage", "domain": domain, "parameters": params, "ranges": ranges}
+    if collection_size == 1:
+        return coverage
+    del coverage["parameters"]
+    return {"type": "CoverageCollection", "domainType": domain_type, "parameters": params,
+            "coverages": [coverage] * collection_size}
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn):
+    ''' Returns the peak of memory allocated by fn in bytes '''
+
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def get_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "jsonschema": importlib.metadata.version("jsonschema"),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_case(case, validators, repeat, memory):
+    ''' Returns the results of one document for all validators '''
+
+    doc = generate_document(case["domain_type"], case["axis_length"], case["composite_count"],
+                            case["parameters"], case["collection_size"])
+    text = json.dumps(doc)
+    load_seconds = best_time(lambda: json.loads(text), repeat)
+    load_peak = peak_memory(lambda: json.loads(text)) if memory else None
+    doc = json.loads(text)
+
+    results = []
+    for mode, validator in validators.items():
+        validator.validate(doc)
+        results.append(dict(
+            case, mode=mode, document_bytes=len(text), load_seconds=load_seconds,
+            validate_seconds=best_time(lambda: validator.validate(doc), repeat),
+            load_peak_bytes=load_peak,
+            validate_peak_bytes=peak_memory(lambda: validator.validate(doc)) if memory else None,
+        ))
+    return results
+
+
+def iter_cases(args):
+    seen = set()
+    for domain_type, length, count, parameters, collection_size in itertools.product(
+            args.domain_types, args.axis_lengths, args.composite_counts, args.parameters,
+            args.collection_sizes):
+        spec = DOMAIN_TYPES[domain_type]
+        # The composite count only matters for composite axes with several values
+        if not spec.composite or spec.composite.cardinality != "+":
+            count = 1
+        # Nor does the axis length without axes with several coordinates
+        if "+" not in spec[:4]:
+            length = 1
+        case = dict(domain_type=domain_type, axis_length=length, composite_count=count,
+                    parameters=parameters, collection_size=collection_size)
+        key = tuple(case.values())
+        if key not in seen:
+            seen.add(key)
+            yield case
+
+
+def case_key(result):
+    return tuple(result[name] for name in CASE_KEYS)
+
+
+def format_bytes(n):
+    return "-" if n is None else f"{n / 2 ** 20:.1f}"
+
+
+def find_startup_regressions(startup, baseline_startup, threshold):
+    ''' Returns the startup cases more than threshold times slower than
+        in the baseline, and the new heavy modules they import '''
+
+    regressions = []
+    for name, result in startup.items():
+        base = baseline_startup.get(name)
+        # The interpreter is measured to tell the machine being slower
+        if base is None or name == "interpreter":
+            continue
+        if result["seconds"] > base["seconds"] * threshold:
+            regressions.append(f"{name}: {base['seconds'] * 1000:.1f} ms -> "
+                               f"{result['seconds'] * 1000:.1f} ms")
+        new_modules = set(result["heavy_modules"]) - set(base["heavy_modules"])
+        if new_modules:
+            regressions.append(f"{name}: imports {', '.join(sorted(new_modules))}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times loading and validating synthetic "
+                                                 "CoverageJSON documents")
+    parser.add_argument('--domain-types', nargs='+', default=list(DOMAIN_TYPES),
+                        choices=list(DOMAIN_TYPES), metavar='TYPE')
+    parser.add_argument('--axis-lengths', type=int, nargs='+', default=[10, 100],
+                        help='Number of coordinates of axes with several coordinates')
+    parser.add_argument('--composite-counts', type=int, nargs='+', default=[10, 1000],
+                        help='Number of tuples or polygons of composite axes')
+    parser.add_argument('--parameters', type=int, nargs='+', default=[1])
+    parser.add_argument('--collection-sizes', type=int, nargs='+', default=[1],
+                        help='Number of coverages (1 for a single Coverage)')
+    parser.add_argument('--modes', nargs='+', default=["native", "draft-07-bundle"],
+                        choices=MODES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip measuring the peak memory with tracemalloc')
+    parser.add_argument('--output', default=None,
+                        help='Results file (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--baseline', default=None,
+                        help='Results file of an earlier run to compare validation times with')
+    parser.add_argument('--startup', action='store_true',
+                        help='Also measure the startup of the command line')
+    parser.add_argument('--startup-threshold', type=float, default=1.25,
+                        help='Fail if a startup time is more than this times that of the '
+                             'baseline (default: 1.25)')
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    baseline = {}
+    baseline_startup = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_results = json.load(f)
+        baseline = {case_key(result): result for result in baseline_results["results"]}
+        baseline_startup = baseline_results.get("startup", {})
+
+    store = create_schema_store()
+    validators = {mode: create_validator(mode, store) for mode in args.modes}
+
+    print(f"{'domain type':20}{'axis':>6}{'comp':>6}{'par':>5}{'cov':>6}{'MB':>8}"
+          f"{'load s':>9}{'load MB':>9} {'mode':16}{'valid. s':>10}{'valid. MB':>10}"
+          f"{'vs base':>9}")
+    results = []
+    for case in iter_cases(args):
+        for result in run_case(case, validators, args.repeat, not args.no_memory):
+            results.append(result)
+            ratio = ""
+            if case_key(result) in baseline:
+                ratio = f"{result['validate_seconds'] / baseline[case_key(result)]['validate_seconds']:.2f}x"
+            print(f"{result['domain_type']:20}{result['axis_length']:>6}"
+                  f"{result['composite_count']:>6}{result['parameters']:>5}"
+                  f"{result['collection_size']:>6}{result['document_bytes'] / 2 ** 20:>8.2f}"
+                  f"{result['load_seconds']:>9.4f}{format_bytes(result['load_peak_bytes']):>9} "
+                  f"{result['mode']:16}{result['validate_seconds']:>10.4f}"
+                  f"{format_bytes(result['validate_peak_bytes']):>10}{ratio:>9}", flush=True)
+
+    startup = {}
+    regressions = []
+    if args.startup:
+        startup = measure_startup(args.repeat)
+        print(f"\n{'startup case':20}{'first verdict s':>16}{'vs base':>9}  heavy modules")
+        for name, result in startup.items():
+            ratio = ""
+            if name in baseline_startup:
+                ratio = f"{result['seconds'] / baseline_startup[name]['seconds']:.2f}x"
+            print(f"{name:20}{result['seconds']:>16.4f}{ratio:>9}  "
+                  f"{', '.join(result['heavy_modules']) or '-'}")
+        regressions = find_startup_regressions(startup, baseline_startup,
+                                               args.startup_threshold)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    results_file = {"metadata": get_metadata(), "results": results}
+    if startup:
+        results_file["startup"] = startup
+    with open(output, "w") as f:
+        json.dump(results_file, f, indent=1)
+    print(f"Results written to {output}")
+    if regressions:
+        print("Startup regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
@@ -8,6 +8,7 @@ import jsonschema
 import tools.validator as validator_
 from tools.bundle_schema import bundle_schema
 from tools.downgrade_schema_to_draft07 import downgrade_schema_to_draft07
+from tools.compile_validator import create_compiled_validator
 
 
 VALIDATOR_CACHE = {}
@@ -20,7 +21,7 @@ def schema_store():
     return validator_.create_schema_store()
 
 
-@pytest.fixture(params=["native", "draft-07-bundle"])
+@pytest.fixture(params=["native", "native-fast", "native-shared", "draft-07-bundle", "compiled"])
 def validator(request, schema_store):
     mode = request.param
     schema_marker = request.node.get_closest_marker("schema")
@@ -32,6 +33,12 @@ def validator(request, schema_store):
     schema = schema_store[schema_id]
     if mode == "native":
         validator = validator_.create_custom_validator(schema_id, schema_store)
+    elif mode == "native-fast":
+        validator = validator_.create_custom_validator(
+            schema_id, schema_store, dispatch=True, fast_items=True)
+    elif mode == "native-shared":
+        validator = validator_.create_shared_validator(
+            schema_id, schema_store, dispatch=True, fast_items=True)
     elif mode == "draft-07-bundle":
         schema = bundle_schema(schema_store, schema_id)
         schema = downgrade_schema_to_draft07(schema)
@@ -43,6 +50,8 @@ def validator(request, schema_store):
         schema_file = tmp_dir / f"{schema_name}.draft07.json"
         with open(schema_file, "w") as f:
             json.dump(schema, f, indent=2)
+    elif mode == "compiled":
+        validator = create_compiled_validator(schema_id, schema_store)
     else:
         raise ValueError(f"Unknown mode {mode}")
     VALIDATOR_CACHE[(mode, schema_id)] = validator
@@ -0,0 +1,48 @@
+# Helpers to derive invalid documents from valid ones and
+# to compare the errors reported for them by different validators
+
+import copy
+
+REPLACEMENTS = [None, 1.5, "x", [], {"type": "Foo"}]
+
+
+def error_signature(error):
+    return (
+        error.message,
+        tuple(error.path),
+        tuple(error.schema_path),
+        error.validator,
+        tuple(error_signature(e) for e in error.context),
+    )
+
+
+def mutations(doc):
+    ''' Yields copies of a document with a single member replaced or removed '''
+
+    paths = []
+
+    def walk(obj, path):
+        if isinstance(obj, dict):
+            items = obj.items()
+        elif isinstance(obj, list):
+            items = enumerate(obj[:2])
+        else:
+            return
+        for key, value in items:
+            paths.append(path + (key,))
+            walk(value, path + (key,))
+
+    walk(doc, ())
+    for path in paths:
+        for replacement in REPLACEMENTS + [KeyError]:
+            mutated = copy.deepcopy(doc)
+            parent = mutated
+            for key in path[:-1]:
+                parent = parent[key]
+            if replacement is KeyError:
+                if not isinstance(parent, dict):
+                    continue
+                del parent[path[-1]]
+            else:
+                parent[path[-1]] = replacement
+            yield mutated
@@ -0,0 +1,124 @@
+# Pytests to test the aggregation of repeated validation errors
+# in tools/aggregate.py
+
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+from jsonschema import ValidationError
+
+from tools.aggregate import ErrorGroup, aggregate_errors
+from tools.validator import format_error
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+def get_ndarray(values):
+    return {
+        "type": "NdArray",
+        "dataType": "integer",
+        "shape": [len(values)],
+        "axisNames": ["x"],
+        "values": values
+    }
+
+
+def type_errors(count, array=("values",)):
+    ''' Yields errors of the "type" of items of an array, created lazily '''
+
+    for index in range(count):
+        yield ValidationError(f"{index + 0.5} is not of type 'integer'", validator="type",
+                              path=list(array) + [index], schema_path=["items", "type"])
+
+
+@pytest.mark.schema("/schemas/ndArray")
+def test_ndarray_values(validator):
+    ''' Invalid: errors of all values are one group with index ranges '''
+
+    values = [i + 0.5 if i % 100 else i for i in range(1000)]
+    errors = list(validator.iter_errors(get_ndarray(values)))
+    groups = aggregate_errors(iter(errors), max_examples=3)
+    assert len(groups) == 1
+    group = groups[0]
+    assert group.keyword == "type" and group.schema_path[-2:] == ("items", "type")
+    assert group.count == len(errors) == 990
+    assert group.message == errors[0].message
+    assert group.paths == [("values", 1), ("values", 2), ("values", 3)]
+    assert group.ranges == [[("values",), 1, 100], [("values",), 101, 200],
+                            [("values",), 201, 300]]
+    assert group.more_ranges
+
+
+def test_groups():
+    ''' Invalid: groups are formed by keyword and schema path, in the order
+        of their first error '''
+
+    required = ValidationError("'x' is a required property", validator="required",
+                               path=[], schema_path=["required"])
+    errors = [required, *type_errors(3), *type_errors(2, ("other",)), required]
+    groups = aggregate_errors(errors)
+    assert [(group.keyword, group.count) for group in groups] == [("required", 2), ("type", 5)]
+    assert groups[1].ranges == [[("values",), 0, 3], [("other",), 0, 2]]
+    assert groups[0].format().splitlines()[1] == "  at /, /"
+    assert groups[1].format().splitlines() == [
+        "5 errors of 'type' at /items/type, first: 0.5 is not of type 'integer' "
+        "(at /values/0)",
+        "  at /values/0, /values/1, /values/2, /other/0, /other/1",
+        "  indices /values/0-2, /other/0-1"]
+
+
+def test_single_error():
+    ''' Invalid: a group of one error is described like format_error does '''
+
+    error = next(type_errors(1))
+    assert aggregate_errors([error])[0].format() == format_error(error)
+
+
+def test_ranges():
+    ''' Invalid: repeated and unordered indices '''
+
+    group = ErrorGroup("type", ("items", "type"), "message", max_examples=2)
+    for index in [4, 5, 5, 6, 2, 9]:
+        group.add(("values", index))
+    group.add(("values",))
+    assert group.count == 7
+    assert group.ranges == [[("values",), 4, 7], [("values",), 2, 3]]
+    assert group.more_ranges
+    assert group.format().endswith("indices /values/4-6, /values/2 and more")
+
+
+def test_constant_memory():
+    ''' Invalid: memory does not grow with the number of errors '''
+
+    peaks = []
+    for count in [1000, 100000]:
+        tracemalloc.start()
+        groups = aggregate_errors(type_errors(count))
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert groups[0].count == count
+    assert peaks[1] < peaks[0] * 2
+
+
+def test_cli(tmp_path):
+    ''' Invalid: --aggregate prints the groups of all errors or of the
+        first --max-errors '''
+
+    path = tmp_path / "ndarray.covjson"
+    path.write_text(json.dumps(get_ndarray([i + 0.5 for i in range(100)])))
+
+    def run(*args):
+        return subprocess.run([sys.executable, "-m", "tools.validator", "--no-cache", "--aggregate",
+                               *args, str(path)], cwd=ROOT_DIR, capture_output=True, text=True)
+
+    result = run()
+    assert result.returncode == 1
+    lines = result.stdout.splitlines()
+    assert len(lines) == 3 and lines[0].startswith("Invalid: 100 errors of 'type'")
+    assert lines[2] == "  indices /values/0-99"
+    result = run("--max-errors", "10", "--aggregate-examples", "1")
+    assert result.stdout.splitlines()[1:] == ["  at /values/0 and 9 more", "  indices /values/0-9"]
+    assert run("--quick").returncode == 2
@@ -290,6 +290,22 @@ def test_duplicate_tuple_value(validator):
         validator.validate(axis)
 
 
+def test_duplicate_tuple_value_int_float(validator):
+    ''' Invalid: tuple values are duplicated, as 1 and 1.0 are equal in JSON '''
+
+    axis = {
+        "dataType": "tuple",
+        "coordinates": ["t", "x", "y"],
+        "values": [
+            ["2008-01-01T04:00:00Z", 1, 20],
+            ["2008-01-01T04:30:00Z", 2.0, 21],
+            ["2008-01-01T04:30:00Z", 2, 21.0]
+        ]
+    }
+    with pytest.raises(ValidationError):
+        validator.validate(axis)
+
+
 def test_missing_value_in_tuple(validator):
     ''' Invalid: one of the tuples only has one value (not a tuple) '''
 
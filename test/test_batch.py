@@ -0,0 +1,76 @@
+# Pytests to test the batch validation of many files in tools/batch.py
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import tools.batch as batch
+from tools.validator import CACHE_DIR_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+@pytest.fixture
+def batch_dir(tmp_path, monkeypatch):
+    ''' A directory with valid, invalid and malformed files '''
+
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    files_dir = tmp_path / "files"
+    sub_dir = files_dir / "sub"
+    sub_dir.mkdir(parents=True)
+    for name in ["grid.covjson", "point.covjson", "profile-collection.covjson"]:
+        shutil.copy(os.path.join(PLAYGROUND_DIR, name), files_dir / name)
+    with open(os.path.join(PLAYGROUND_DIR, "point.covjson")) as f:
+        doc = json.load(f)
+    doc["ranges"]["POTM"]["values"][0] = "x"
+    with open(sub_dir / "invalid.covjson", "w") as f:
+        json.dump(doc, f)
+    (sub_dir / "malformed.json").write_text("{")
+    (sub_dir / "notes.txt").write_text("not validated")
+    return files_dir
+
+
+def test_expand_paths(batch_dir):
+    ''' Directories are searched recursively, globs are expanded '''
+
+    expected = [
+        "grid.covjson", "point.covjson", "profile-collection.covjson",
+        "sub/invalid.covjson", "sub/malformed.json",
+    ]
+    paths = list(batch.expand_paths([str(batch_dir)]))
+    assert [os.path.relpath(p, batch_dir) for p in paths] == expected
+
+    paths = list(batch.expand_paths([str(batch_dir / "**" / "*.covjson"), "missing.covjson"]))
+    assert [os.path.relpath(p, batch_dir) for p in paths[:-1]] == [
+        "grid.covjson", "point.covjson", "profile-collection.covjson", "sub/invalid.covjson"]
+    assert paths[-1] == "missing.covjson"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_validate_files(batch_dir, workers):
+    ''' Every file gets a result, in the order of the paths '''
+
+    paths = list(batch.expand_paths([str(batch_dir)])) + [str(batch_dir / "missing.covjson")]
+    results = list(batch.validate_files(paths, workers=workers, chunksize=2))
+    assert [path for path, _, _ in results] == paths
+    assert [status for _, status, _ in results] == [
+        batch.VALID, batch.VALID, batch.VALID, batch.INVALID, batch.ERROR, batch.ERROR]
+    assert results[3][2] == "'x' is not of type 'number', 'null' (at /ranges/POTM/values/0)"
+
+
+def test_cli(batch_dir):
+    ''' One line per file, exit code 1 if any file is not valid '''
+
+    result = subprocess.run(
+        [sys.executable, "-m", "tools.validator", "--workers", "2", str(batch_dir)],
+        cwd=ROOT_DIR, capture_output=True, text=True)
+    lines = result.stdout.splitlines()
+    assert result.returncode == 1
+    assert len(lines) == 5
+    assert lines[0] == f"{batch_dir / 'grid.covjson'}: Valid"
+    assert lines[4].startswith(f"{batch_dir / 'sub' / 'malformed.json'}: Error: ")
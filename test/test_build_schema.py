@@ -0,0 +1,113 @@
+# Pytests to test the incremental build of all schema artifacts
+# in tools/build_schema.py
+
+import json
+import os
+import shutil
+
+import pytest
+
+from tools.build_schema import MANIFEST_NAME, SchemaBuild, parse_versions
+from tools.bundle_schema import bundle_schema
+from tools.downgrade_schema_to_draft07 import downgrade_schema_to_draft07
+from tools.patch_schema import patch_schema
+from tools.validator import SCHEMA_DIR
+
+VERSION_ID = "https://covjson.org/schema/1.0/coveragejson.json"
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def schema_dir(tmp_path):
+    ''' A copy of the schemas directory that tests can change '''
+
+    path = tmp_path / "schemas"
+    shutil.copytree(SCHEMA_DIR, path)
+    return path
+
+
+def test_artifacts(tmp_path, schema_store):
+    ''' Valid: the artifacts are those of the separate tools '''
+
+    out_dir = tmp_path / "build"
+    written, skipped = SchemaBuild(str(out_dir), versions={"1.0": VERSION_ID}).run()
+    assert written == ["bundle.json", "coveragejson.json", "coveragejson-no-id.json",
+                       "coveragejson-1.0.json"]
+    assert skipped == []
+
+    bundle = bundle_schema(schema_store, "/schemas/coveragejson")
+    draft07 = downgrade_schema_to_draft07(bundle)
+    expected = {
+        "bundle.json": bundle,
+        "coveragejson.json": draft07,
+        "coveragejson-no-id.json": patch_schema(draft07, drop_id=True),
+        "coveragejson-1.0.json": patch_schema(draft07, set_id=VERSION_ID),
+    }
+    for name, schema in expected.items():
+        assert read(out_dir / name) == json.dumps(schema, indent=2)
+    assert "$id" not in expected["coveragejson-no-id.json"]
+    assert draft07["$id"] == "/schemas/coveragejson"
+
+
+def test_unchanged_inputs_are_skipped(tmp_path, schema_dir):
+    ''' Valid: only artifacts with changed inputs are built again '''
+
+    out_dir = str(tmp_path / "build")
+    SchemaBuild(out_dir, versions={"1.0": VERSION_ID}, schema_dir=str(schema_dir)).run()
+
+    build = SchemaBuild(out_dir, versions={"1.0": VERSION_ID}, schema_dir=str(schema_dir))
+    assert build.run() == ([], ["bundle.json", "coveragejson.json",
+                                "coveragejson-no-id.json", "coveragejson-1.0.json"])
+
+    build = SchemaBuild(out_dir, versions={"1.0": VERSION_ID, "2.0": "https://example.com/2"},
+                        schema_dir=str(schema_dir))
+    written, _ = build.run()
+    assert written == ["coveragejson-2.0.json"]
+    # Artifacts needed by the new one are read, not built
+    assert build._store is None
+
+    with open(schema_dir / "parameter.json") as f:
+        schema = json.load(f)
+    schema["description"] = "Changed"
+    with open(schema_dir / "parameter.json", "w") as f:
+        json.dump(schema, f)
+    build = SchemaBuild(out_dir, versions={"1.0": VERSION_ID}, schema_dir=str(schema_dir))
+    written, _ = build.run()
+    assert written == ["bundle.json", "coveragejson.json", "coveragejson-no-id.json",
+                       "coveragejson-1.0.json"]
+    assert "Changed" in read(os.path.join(out_dir, "coveragejson-1.0.json"))
+
+
+def test_missing_artifact_is_built(tmp_path):
+    ''' Valid: artifacts deleted since the last build are built again '''
+
+    out_dir = tmp_path / "build"
+    SchemaBuild(str(out_dir)).run()
+    os.remove(out_dir / "coveragejson.json")
+    assert SchemaBuild(str(out_dir)).run()[0] == ["coveragejson.json"]
+    assert SchemaBuild(str(out_dir), force=True).run()[1] == []
+    assert json.loads(read(out_dir / MANIFEST_NAME)).keys() == {
+        "bundle.json", "coveragejson.json", "coveragejson-no-id.json"}
+
+
+def test_patch_schema_keeps_input():
+    ''' Valid: patching does not change the given schema, and the result
+        shares no objects with it '''
+
+    schema = {"$id": "/schemas/x", "properties": {"a": {}}}
+    patched = patch_schema(schema, set_id="https://example.com/x")
+    assert patched["$id"] == "https://example.com/x"
+    patched["properties"]["a"]["type"] = "string"
+    assert schema == {"$id": "/schemas/x", "properties": {"a": {}}}
+
+
+@pytest.mark.parametrize("value", ["1.0", "=https://example.com", "1.0="])
+def test_parse_versions_invalid(value):
+    ''' Invalid: arguments that are not NAME=ID '''
+
+    with pytest.raises(ValueError, match="Expected NAME=ID"):
+        parse_versions([value])
@@ -0,0 +1,90 @@
+# Pytests to test the parallel validation of CoverageCollections
+# in tools/collection.py
+
+import copy
+import json
+import os
+
+import pytest
+
+import tools.validator as validator_
+from tools.collection import CollectionValidator
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+@pytest.fixture(scope="module")
+def serial_validator(schema_store):
+    return validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                              dispatch=True, fast_items=True)
+
+
+def get_collection(count):
+    ''' Returns the point collection of the playground with count coverages '''
+
+    with open(os.path.join(PLAYGROUND_DIR, "point-collection.covjson")) as f:
+        doc = json.load(f)
+    coverages = doc["coverages"]
+    doc["coverages"] = [copy.deepcopy(coverages[i % len(coverages)]) for i in range(count)]
+    return doc
+
+
+def signatures(errors):
+    return [(tuple(error.absolute_path), error.message, error.validator,
+             tuple(error.absolute_schema_path)) for error in errors]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_valid(schema_store, workers):
+    ''' Valid: a collection with many coverages '''
+
+    validator = CollectionValidator(schema_store, workers, shard_size=7,
+                                    min_parallel_coverages=0)
+    validator.validate(get_collection(50))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_invalid(schema_store, serial_validator, workers):
+    ''' Invalid: the errors are those of serial validation, with the errors
+        of the collection members first and those of the coverages in order '''
+
+    doc = get_collection(50)
+    doc["coverages"][3]["ranges"]["POTM"]["values"] = ["x"]
+    doc["coverages"][41]["type"] = "Covrage"
+    del doc["coverages"][18]["domain"]
+    doc["referencing"] = "x"
+
+    validator = CollectionValidator(schema_store, workers, shard_size=7,
+                                    min_parallel_coverages=0)
+    errors = signatures(validator.iter_errors(doc))
+    assert sorted(errors) == sorted(signatures(serial_validator.iter_errors(doc)))
+    assert [path[:2] for path, *_ in errors] == [
+        ("referencing",), ("coverages", 3), ("coverages", 18), ("coverages", 41)]
+
+
+@pytest.mark.parametrize("member", ["parameters", "referencing"])
+def test_inherited_members(schema_store, serial_validator, member):
+    ''' Invalid: without collection-level parameters (or referencing), each
+        coverage (or domain) must have its own '''
+
+    doc = get_collection(10)
+    del doc[member]
+    validator = CollectionValidator(schema_store, 1, shard_size=3, min_parallel_coverages=0)
+    errors = signatures(validator.iter_errors(doc))
+    assert len(errors) == 10
+    assert sorted(errors) == sorted(signatures(serial_validator.iter_errors(doc)))
+
+    for coverage in doc["coverages"]:
+        coverage["parameters"] = {}
+        coverage["domain"]["referencing"] = []
+    assert validator.is_valid(doc)
+
+
+def test_small_collection(schema_store, serial_validator):
+    ''' Invalid: small collections are validated serially '''
+
+    doc = get_collection(2)
+    doc["coverages"][1]["type"] = "Covrage"
+    validator = CollectionValidator(schema_store, 2)
+    assert signatures(validator.iter_errors(doc)) == \
+        signatures(serial_validator.iter_errors(doc))
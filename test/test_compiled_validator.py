@@ -0,0 +1,55 @@
+# Pytests checking that the validators generated by tools/compile_validator.py
+# report the same errors as the native validator
+
+import json
+from pathlib import Path
+
+import pytest
+
+import tools.validator as validator_
+from tools.bundle_schema import bundle_schema
+from tools.compile_validator import (
+    compile_schema_store, create_compiled_validator, load_compiled_module,
+    schema_store_from_bundle
+)
+
+from .mutations import error_signature, mutations
+
+PLAYGROUND_DIR = Path(__file__).parent / "test_data" / "playground"
+
+
+@pytest.mark.parametrize("name", ["grid", "point-collection"])
+def test_same_errors_as_native(name, schema_store):
+    ''' Mutated playground coverages give identical errors in both modes '''
+
+    native = validator_.create_custom_validator("/schemas/coveragejson", schema_store)
+    compiled = create_compiled_validator("/schemas/coveragejson", schema_store)
+    with open(PLAYGROUND_DIR / f"{name}.covjson") as f:
+        doc = json.load(f)
+    for mutated in mutations(doc):
+        expected = [error_signature(e) for e in native.iter_errors(mutated)]
+        actual = [error_signature(e) for e in compiled.iter_errors(mutated)]
+        assert actual == expected
+        assert compiled.is_valid(mutated) == (not expected)
+
+
+def test_compile_bundle(schema_store):
+    ''' A bundled schema compiles to the same validator as the store '''
+
+    bundle = bundle_schema(schema_store, "/schemas/coveragejson")
+    store = schema_store_from_bundle(bundle)
+    module = load_compiled_module(compile_schema_store(store, ["/schemas/coveragejson"]))
+    validator = module.Validator("/schemas/coveragejson")
+    with open(PLAYGROUND_DIR / "grid.covjson") as f:
+        doc = json.load(f)
+    assert validator.is_valid(doc)
+    doc["ranges"]["ICEC"]["values"][0] = "warm"
+    assert not validator.is_valid(doc)
+
+
+def test_unsupported_keyword():
+    ''' Schemas using keywords the compiler does not know are rejected '''
+
+    store = {"/schemas/test": {"$id": "/schemas/test", "maxLength": 3}}
+    with pytest.raises(NotImplementedError):
+        compile_schema_store(store)
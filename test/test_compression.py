@@ -0,0 +1,161 @@
+# Pytests to test the validation of compressed documents, detected by
+# tools/compression.py, in all the ways documents can be loaded
+
+import bz2
+import functools
+import gzip
+import http.server
+import io
+import json
+import lzma
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import tools.batch as batch
+import tools.compression as compression
+import tools.loader as loader
+import tools.stream as stream
+from tools.validator import CACHE_DIR_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+GRID_PATH = os.path.join(PLAYGROUND_DIR, "grid.covjson")
+
+COMPRESSORS = {"gzip": gzip.compress, "bz2": bz2.compress, "xz": lzma.compress}
+
+
+def read_grid():
+    with open(GRID_PATH, "rb") as f:
+        return f.read()
+
+
+def write_compressed(path, compression_, data):
+    path.write_bytes(COMPRESSORS[compression_](data))
+    return path
+
+
+@pytest.mark.parametrize("compression_", COMPRESSORS)
+def test_detect_compression(compression_):
+    ''' Valid: the format is told by the magic bytes '''
+
+    assert compression.detect_compression(COMPRESSORS[compression_](b"{}")) == compression_
+
+
+@pytest.mark.parametrize("head", [b"", b"{", b"\x1f", b"BZ", b"\xef\xbb\xbf{"])
+def test_detect_no_compression(head):
+    ''' Invalid: data that is not compressed '''
+
+    assert compression.detect_compression(head) is None
+
+
+@pytest.mark.parametrize("backend", loader.available_backends())
+@pytest.mark.parametrize("compression_", COMPRESSORS)
+def test_load_file(tmp_path, compression_, backend):
+    ''' Valid: compressed files load like the uncompressed file, whatever
+        their name '''
+
+    path = write_compressed(tmp_path / "grid", compression_, read_grid())
+    assert loader.load_file(path, backend) == json.loads(read_grid())
+    assert loader.loads(path.read_bytes(), backend) == json.loads(read_grid())
+
+
+class RawStream(io.RawIOBase):
+    ''' A stream without peek, like a raw HTTP response '''
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+
+@pytest.mark.parametrize("backend", loader.available_backends())
+@pytest.mark.parametrize("compression_", [None] + list(COMPRESSORS))
+def test_load_stream(compression_, backend):
+    ''' Valid: streams are decompressed if they are compressed '''
+
+    data = read_grid() if compression_ is None else COMPRESSORS[compression_](read_grid())
+    with compression.open_stream(RawStream(data)) as f:
+        assert loader.load_stream(f, backend) == json.loads(read_grid())
+
+
+@pytest.mark.parametrize("compression_", COMPRESSORS)
+def test_load_file_truncated(tmp_path, compression_):
+    ''' Invalid: truncated compressed files '''
+
+    data = COMPRESSORS[compression_](read_grid())
+    path = tmp_path / "grid.covjson.gz"
+    path.write_bytes(data[:len(data) // 2])
+    with pytest.raises(compression.DECOMPRESSION_ERRORS):
+        loader.load_file(path)
+
+
+@pytest.mark.parametrize("compression_", COMPRESSORS)
+def test_load_streamed(tmp_path, compression_, monkeypatch):
+    ''' Valid: streamed arrays read from compressed files '''
+
+    monkeypatch.setattr(stream, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(stream, "MAX_MATERIALIZED_LENGTH", 1)
+    path = write_compressed(tmp_path / "grid.covjson.xz", compression_, read_grid())
+    doc = stream.load_streamed(str(path))
+    values = doc["ranges"]["ICEC"]["values"]
+    assert isinstance(values, stream.StreamedArray)
+    assert doc == json.loads(read_grid())
+    assert values[3] == json.loads(read_grid())["ranges"]["ICEC"]["values"][3]
+
+
+def test_batch(tmp_path, monkeypatch):
+    ''' Valid: compressed files are found in directories and validated '''
+
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    files_dir = tmp_path / "files"
+    files_dir.mkdir()
+    for compression_, extension in [("gzip", ".gz"), ("bz2", ".bz2"), ("xz", ".xz")]:
+        write_compressed(files_dir / f"grid.covjson{extension}", compression_, read_grid())
+    truncated = gzip.compress(read_grid())
+    (files_dir / "truncated.json.gz").write_bytes(truncated[:len(truncated) // 2])
+    (files_dir / "notes.txt.gz").write_bytes(gzip.compress(b"not validated"))
+
+    paths = list(batch.expand_paths([str(files_dir)]))
+    assert [os.path.basename(p) for p in paths] == [
+        "grid.covjson.bz2", "grid.covjson.gz", "grid.covjson.xz", "truncated.json.gz"]
+    for result_cache in [None, str(tmp_path / "results.sqlite")]:
+        results = list(batch.validate_files(paths, workers=1, result_cache=result_cache))
+        assert [status for _, status, _ in results] == [
+            batch.VALID, batch.VALID, batch.VALID, batch.ERROR]
+
+
+@pytest.fixture
+def http_dir(tmp_path):
+    ''' A directory served over HTTP, yields its URL '''
+
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield tmp_path, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("compression_", [None] + list(COMPRESSORS))
+def test_cli_url(http_dir, compression_, monkeypatch):
+    ''' Valid: documents served over HTTP, compressed or not '''
+
+    pytest.importorskip("requests")
+    directory, url = http_dir
+    monkeypatch.setenv(CACHE_DIR_ENV, str(directory / "cache"))
+    data = read_grid() if compression_ is None else COMPRESSORS[compression_](read_grid())
+    (directory / "grid.covjson.data").write_bytes(data)
+    result = subprocess.run(
+        [sys.executable, "-m", "tools.validator", "--source", "url", f"{url}/grid.covjson.data"],
+        cwd=ROOT_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "Valid!"
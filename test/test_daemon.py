@@ -0,0 +1,214 @@
+# Pytests to test the daemon validating the documents of command line
+# calls with --daemon, in tools/daemon.py
+
+import asyncio
+import glob
+import json
+import os
+import signal
+import socket
+import stat
+import subprocess
+import sys
+
+import pytest
+
+import tools.daemon as daemon
+from tools.compile_validator import create_compiled_validator
+from tools.validator import CACHE_DIR_ENV, DAEMON_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+GRID_PATH = os.path.join(PLAYGROUND_DIR, "grid.covjson")
+
+SHORT_VALUES_MESSAGE = \
+    "values has 5 items, but shape [1, 1, 2, 3] requires 6 (at /ranges/ICEC/values)"
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Requires Unix sockets")
+
+
+@pytest.fixture(scope="module")
+def validator(schema_store):
+    return create_compiled_validator("/schemas/coveragejson", schema_store)
+
+
+@pytest.fixture
+def documents(tmp_path):
+    ''' Writes documents of every status, returns their paths by name '''
+
+    with open(GRID_PATH) as f:
+        grid = json.load(f)
+    grid["ranges"]["ICEC"]["values"].pop()
+    paths = {"short-values": tmp_path / "short-values.covjson",
+             "wrong-type": tmp_path / "wrong-type.covjson",
+             "malformed": tmp_path / "malformed.covjson"}
+    paths["short-values"].write_text(json.dumps(grid))
+    grid["ranges"]["ICEC"]["values"][0] = "warm"
+    paths["wrong-type"].write_text(json.dumps(grid))
+    paths["malformed"].write_text("{")
+    return {name: str(path) for name, path in paths.items()}
+
+
+def test_check_path(validator, documents):
+    ''' Valid and invalid: the verdicts of the command line '''
+
+    assert daemon.check_path(validator, GRID_PATH) == (daemon.VALID, [])
+    assert daemon.check_path(validator, documents["short-values"]) == \
+        (daemon.INVALID, [SHORT_VALUES_MESSAGE])
+    assert daemon.check_path(validator, documents["short-values"], semantic=False) == \
+        (daemon.VALID, [])
+    assert daemon.check_path(validator, documents["wrong-type"]) == \
+        (daemon.INVALID, ["'warm' is not of type 'number', 'null' (at /ranges/ICEC/values/0)"])
+    status, messages = daemon.check_path(validator, documents["malformed"])
+    assert status == daemon.ERROR and messages[0].startswith("Expecting property name")
+
+
+def test_check_path_errors(tmp_path, validator):
+    ''' Invalid: files that cannot be validated are errors instead of
+        exceptions of the daemon '''
+
+    assert daemon.check_path(validator, str(tmp_path / "missing.covjson"))[0] == daemon.ERROR
+    path = tmp_path / "nested.covjson"
+    path.write_text("[" * 100000 + "]" * 100000)
+    assert daemon.check_path(validator, str(path))[0] == daemon.ERROR
+
+    class BrokenValidator:
+        def is_valid(self, instance):
+            raise KeyError("x")
+
+    assert daemon.check_path(BrokenValidator(), GRID_PATH) == \
+        (daemon.ERROR, ["Internal error: KeyError('x')"])
+
+
+def test_bad_requests(tmp_path, validator):
+    ''' Invalid: bad requests are answered with an error, not an empty
+        line '''
+
+    socket_path = str(tmp_path / "daemon.sock")
+
+    def send_line(line):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(line)
+            with client.makefile("rb") as f:
+                return json.loads(f.readline())
+
+    async def main():
+        serving = asyncio.create_task(daemon.serve_daemon(validator, socket_path, 0.5))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        responses = [await loop.run_in_executor(None, send_line, line)
+                     for line in [b"{\n", b"[1]\n", b"\n", b'{"nonsense": 1}\n']]
+        with pytest.raises(daemon.DaemonError, match="Bad request: the request has no path"):
+            await loop.run_in_executor(None, daemon.send_request, socket_path, {"path": 1})
+        await asyncio.wait_for(serving, 5)
+        return responses
+
+    for response in asyncio.run(main()):
+        assert list(response) == ["error"] and response["error"].startswith("Bad request: ")
+
+
+@pytest.mark.parametrize("answer", [b"", b"{\n", b"[]\n", b'{"status": "Maybe"}\n'])
+def test_bad_answers(tmp_path, monkeypatch, answer):
+    ''' Invalid: a daemon answering badly is reported, not restarted '''
+
+    socket_path = str(tmp_path / "daemon.sock")
+    monkeypatch.setattr(daemon, "spawn_daemon", lambda *args: pytest.fail("Restarted"))
+
+    async def main():
+        async def answer_badly(reader, writer):
+            await reader.readline()
+            writer.write(answer)
+            await writer.drain()
+            writer.close()
+
+        server = await asyncio.start_unix_server(answer_badly, socket_path)
+        async with server:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, daemon.run_client, socket_path, GRID_PATH)
+
+    with pytest.raises(daemon.DaemonError):
+        asyncio.run(main())
+
+
+def test_serve_until_idle(tmp_path, validator):
+    ''' Valid: the daemon answers requests and exits once idle '''
+
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def main():
+        serving = asyncio.create_task(daemon.serve_daemon(validator, socket_path, 0.5))
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        loop = asyncio.get_running_loop()
+        responses = [await loop.run_in_executor(None, daemon.send_request, socket_path, request)
+                     for request in [{"ping": True}, {"path": GRID_PATH}]]
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        await asyncio.wait_for(serving, 5)
+        return responses
+
+    assert asyncio.run(main()) == [{"pid": os.getpid()}, {"status": daemon.VALID, "messages": []}]
+    assert not os.path.exists(socket_path)
+    assert daemon.send_request(socket_path, {"ping": True}) is None
+
+
+def test_daemon_dir(tmp_path, monkeypatch):
+    ''' Valid: sockets are in a directory only the user can access '''
+
+    monkeypatch.setenv(daemon.DAEMON_DIR_ENV, str(tmp_path / "daemons"))
+    path = daemon.get_socket_path("ab" * 32)
+    assert path == str(tmp_path / "daemons" / f"daemon-{'ab' * 8}.sock")
+    assert stat.S_IMODE(os.stat(tmp_path / "daemons").st_mode) == 0o700
+
+
+@pytest.fixture
+def daemon_env(tmp_path):
+    ''' An environment of command line calls using a daemon of their own,
+        which is stopped afterwards '''
+
+    daemon_dir = tmp_path / "daemons"
+    yield dict(os.environ, **{CACHE_DIR_ENV: str(tmp_path / "cache"),
+                              daemon.DAEMON_DIR_ENV: str(daemon_dir), DAEMON_ENV: "1"})
+    for lock_path in daemon_dir.glob("*.lock"):
+        try:
+            os.kill(int(lock_path.read_text()), signal.SIGTERM)
+        except (ValueError, ProcessLookupError):
+            pass
+
+
+def run_cli(args, env):
+    return subprocess.run([sys.executable, "-m", "tools.validator"] + args,
+                          cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+
+
+def test_cli(daemon_env, documents):
+    ''' Valid and invalid: calls print the verdicts of the daemon, which
+        the first call starts '''
+
+    result = run_cli([GRID_PATH], daemon_env)
+    assert (result.returncode, result.stdout) == (0, "Valid!\n")
+    lock_paths = glob.glob(os.path.join(daemon_env[daemon.DAEMON_DIR_ENV], "*.lock"))
+    assert len(lock_paths) == 1
+    with open(lock_paths[0]) as f:
+        pid = int(f.read())
+
+    result = run_cli([documents["short-values"]], daemon_env)
+    assert (result.returncode, result.stdout) == (1, f"Invalid: {SHORT_VALUES_MESSAGE}\n")
+    # The same output as without the daemon, for semantic errors and
+    # errors against the schemas
+    for name in ["short-values", "wrong-type"]:
+        with_daemon = run_cli([documents[name]], daemon_env)
+        without_daemon = run_cli(["--no-cache", documents[name]], daemon_env)
+        assert (with_daemon.returncode, with_daemon.stdout) == \
+            (without_daemon.returncode, without_daemon.stdout)
+        assert without_daemon.stdout.startswith("Invalid: ")
+        assert "Traceback" not in without_daemon.stderr
+    result = run_cli([documents["malformed"]], daemon_env)
+    assert result.returncode == 1
+    assert result.stderr.startswith("Error: Expecting property name")
+
+    # All calls went to the same daemon
+    with open(lock_paths[0]) as f:
+        assert int(f.read()) == pid
+    os.kill(pid, 0)
@@ -0,0 +1,48 @@
+# Pytests checking that the dispatching "allOf" of tools/validator.py
+# reports the same errors as evaluating every if/then branch
+
+import json
+from pathlib import Path
+
+import pytest
+
+import tools.validator as validator_
+
+from .mutations import error_signature, mutations
+
+PLAYGROUND_DIR = Path(__file__).parent / "test_data" / "playground"
+
+
+def test_find_discriminator(schema_store):
+    ''' The "type" chain of the root schema is recognized '''
+
+    all_of = schema_store["/schemas/coveragejson"]["allOf"]
+    name, branches, discriminated = validator_.find_discriminator(all_of)
+    assert name == "type"
+    assert branches["Coverage"] == [3]
+    assert discriminated == {0, 1, 2, 3, 4}
+
+
+def test_find_discriminator_mixed_properties():
+    ''' Branches selected by different properties are not dispatched '''
+
+    all_of = [
+        {"if": {"properties": {"a": {"const": "x"}}}, "then": {}},
+        {"if": {"properties": {"b": {"const": "y"}}}, "then": {}},
+    ]
+    assert validator_.find_discriminator(all_of) is None
+
+
+@pytest.mark.parametrize("name", ["grid", "point-collection"])
+def test_same_errors_as_native(name, schema_store):
+    ''' Mutated playground coverages give identical errors with dispatch '''
+
+    native = validator_.create_custom_validator("/schemas/coveragejson", schema_store)
+    dispatch = validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                                  dispatch=True)
+    with open(PLAYGROUND_DIR / f"{name}.covjson") as f:
+        doc = json.load(f)
+    for mutated in mutations(doc):
+        expected = [error_signature(e) for e in native.iter_errors(mutated)]
+        actual = [error_signature(e) for e in dispatch.iter_errors(mutated)]
+        assert actual == expected
@@ -0,0 +1,149 @@
+# Pytests to test the fail-fast and bounded-error validation of
+# iter_limited_errors and of the --quick, --max-errors and --all
+# options of the command line in tools/validator.py
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import tools.validator as validator_
+
+from .mutations import error_signature, mutations
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+POINT_PATH = os.path.join(PLAYGROUND_DIR, "point.covjson")
+
+
+def get_ndarray(values):
+    return {
+        "type": "NdArray",
+        "dataType": "float",
+        "shape": [len(values)],
+        "axisNames": ["x"],
+        "values": values
+    }
+
+
+def run_cli(args):
+    return subprocess.run([sys.executable, "-m", "tools.validator", "--no-cache"] + args,
+                          cwd=ROOT_DIR, capture_output=True, text=True)
+
+
+@pytest.mark.schema("/schemas/ndArray")
+@pytest.mark.parametrize("max_errors", [1, 5])
+def test_limited_errors(validator, max_errors):
+    ''' Invalid: the limited errors are the first errors of iter_errors '''
+
+    ndarray = get_ndarray([1.5, "a", None, "b", [], "c", {}, "d", True, "e"] * 10)
+    expected = [error_signature(e) for e in validator.iter_errors(ndarray)]
+    assert len(expected) > max_errors
+    errors = validator_.iter_limited_errors(validator, ndarray, max_errors)
+    assert [error_signature(e) for e in errors] == expected[:max_errors]
+    errors = validator_.iter_limited_errors(validator, ndarray)
+    assert [error_signature(e) for e in errors] == expected
+
+
+def test_lazy_references(schema_store):
+    ''' Invalid: references yielding their errors lazily report the same
+        errors as those of jsonschema '''
+
+    native = validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                                dispatch=True)
+    fast = validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                              dispatch=True, fast_items=True)
+    with open(os.path.join(PLAYGROUND_DIR, "grid.covjson")) as f:
+        doc = json.load(f)
+    for mutated in list(mutations(doc))[::5]:
+        expected = [error_signature(e) for e in native.iter_errors(mutated)]
+        assert [error_signature(e) for e in fast.iter_errors(mutated)] == expected
+
+
+def test_interleaved_references():
+    ''' Invalid: relative references are resolved against their own scope
+        when the errors of two references are consumed in turns '''
+
+    import jsonschema
+    from tools.lazy_ref import lazy_ref
+
+    store = {
+        "https://example.com/a/list": {"items": {"$ref": "item"}},
+        "https://example.com/a/item": {"anyOf": [{"type": "integer"}]},
+        "https://example.com/b/list": {"items": {"$ref": "item"}},
+        "https://example.com/b/item": {"anyOf": [{"type": "string"}]},
+    }
+    cls = jsonschema.validators.extend(jsonschema.validators.Draft202012Validator,
+                                       {"$ref": lazy_ref})
+    resolver = jsonschema.RefResolver("", referrer={}, store=store)
+    validator = cls({}, resolver=resolver)
+
+    strings = validator.descend(["x", "y"], {"$ref": "https://example.com/a/list"})
+    integers = validator.descend([1, 2], {"$ref": "https://example.com/b/list"})
+    assert next(strings).instance == "x"
+    assert next(integers).instance == 1
+    assert next(strings).instance == "y"
+    assert next(strings, None) is None
+    assert next(integers).instance == 2
+    assert next(integers, None) is None
+    assert resolver.resolution_scope == ""
+
+
+def test_bounded_rejection(schema_store):
+    ''' Invalid: rejecting a long array of wrong values stops at the first
+        errors instead of finding all of them '''
+
+    fast = validator_.create_custom_validator("/schemas/ndArray", schema_store,
+                                              dispatch=True, fast_items=True)
+    ndarray = get_ndarray(["a"] * 20000)
+
+    start = time.perf_counter()
+    assert len(list(validator_.iter_limited_errors(fast, ndarray, 3))) == 3
+    assert not fast.is_valid(ndarray)
+    limited = time.perf_counter() - start
+    start = time.perf_counter()
+    assert len(list(fast.iter_errors(ndarray))) == 20000
+    assert limited < (time.perf_counter() - start) / 5
+
+
+def test_cli_modes(tmp_path):
+    ''' Invalid: the modes print no error, the first errors or all errors '''
+
+    path = tmp_path / "ndarray.covjson"
+    path.write_text(json.dumps(get_ndarray([1.5, "a", "b", "c"])))
+
+    result = run_cli(["--quick", str(path)])
+    assert (result.returncode, result.stdout) == (1, "Invalid\n")
+    result = run_cli(["--max-errors", "2", str(path)])
+    assert result.returncode == 1
+    assert result.stdout.splitlines() == [
+        "Invalid: 'a' is not of type 'number', 'null' (at /values/1)",
+        "Invalid: 'b' is not of type 'number', 'null' (at /values/2)"]
+    result = run_cli(["--all", str(path)])
+    assert result.returncode == 1
+    assert len(result.stdout.splitlines()) == 3
+
+    # Semantic errors are reported like schema errors
+    path.write_text(json.dumps(dict(get_ndarray([1.5, 2.5]), shape=[3])))
+    result = run_cli(["--all", str(path)])
+    assert result.returncode == 1
+    assert result.stdout.startswith("Invalid: values has 2 items")
+
+
+def test_cli_quick_valid():
+    ''' Valid: a valid document passes with --quick '''
+
+    result = run_cli(["--quick", POINT_PATH])
+    assert (result.returncode, result.stdout) == (0, "Valid!\n")
+
+
+@pytest.mark.parametrize("args", [["--max-errors", "0", POINT_PATH],
+                                  ["--quick", "--all", POINT_PATH],
+                                  ["--quick", POINT_PATH, POINT_PATH]])
+def test_cli_invalid_options(args):
+    ''' Invalid: a limit below 1, several modes or several documents '''
+
+    assert run_cli(args).returncode == 2
@@ -0,0 +1,71 @@
+# Pytests checking that the bulk "items" type check of tools/fast_items.py
+# reports the same errors as checking every item
+
+import pytest
+
+import tools.fast_items as fast_items
+import tools.validator as validator_
+
+from .mutations import error_signature
+
+LENGTH = 1000
+
+
+def get_ndarray(data_type, values):
+    return {
+        "type": "NdArray",
+        "dataType": data_type,
+        "shape": [len(values)],
+        "axisNames": ["x"],
+        "values": values
+    }
+
+
+def get_values(data_type):
+    if data_type == "float":
+        return [i / 3 if i % 7 else None for i in range(LENGTH)]
+    elif data_type == "integer":
+        return [i if i % 7 else None for i in range(LENGTH)]
+    else:
+        return [str(i) if i % 7 else None for i in range(LENGTH)]
+
+
+BAD_VALUES = [True, False, 1.5, 2.0, float("nan"), float("inf"), "1", [1], {"a": 1}, 10**30]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        if fast_items.numpy is None:
+            pytest.skip("NumPy is not installed")
+    else:
+        monkeypatch.setattr(fast_items, "numpy", None)
+    return request.param
+
+
+@pytest.mark.parametrize("data_type", ["float", "integer", "string"])
+def test_same_errors_as_native(data_type, backend, schema_store):
+    ''' Offending values are reported with the same errors and paths '''
+
+    native = validator_.create_custom_validator("/schemas/ndArray", schema_store)
+    fast = validator_.create_custom_validator("/schemas/ndArray", schema_store, fast_items=True)
+
+    values = get_values(data_type)
+    assert list(fast.iter_errors(get_ndarray(data_type, values))) == []
+
+    for offset, bad_value in enumerate(BAD_VALUES):
+        values[offset * 97 + 3] = bad_value
+    ndarray = get_ndarray(data_type, values)
+    expected = [error_signature(e) for e in native.iter_errors(ndarray)]
+    actual = [error_signature(e) for e in fast.iter_errors(ndarray)]
+    assert actual == expected
+    assert len(actual) > 0
+
+
+def test_find_type_mismatches(backend):
+    ''' Integral floats are integers, booleans are not '''
+
+    values = [1, 2.0, None, True, 2.5, 3] * 10
+    mismatches = list(fast_items.find_type_mismatches(values, ["integer", "null"]))
+    assert mismatches == [i for i, v in enumerate(values) if v is True or v == 2.5]
+    assert list(fast_items.find_type_mismatches(values[:3] * 20, ["integer", "null"])) == []
@@ -0,0 +1,72 @@
+# Pytests to test the lazily loading schema store of tools/validator.py
+
+import json
+import os
+
+import pytest
+from jsonschema.exceptions import ValidationError
+
+import tools.validator as validator_
+
+
+def find_references(schema):
+    ''' Returns the values of all "$ref" keywords of a schema '''
+
+    if isinstance(schema, dict):
+        refs = {schema["$ref"]} if isinstance(schema.get("$ref"), str) else set()
+        for value in schema.values():
+            refs |= find_references(value)
+        return refs
+    if isinstance(schema, list):
+        return set().union(*map(find_references, schema))
+    return set()
+
+
+def test_index_without_parsing(schema_store):
+    ''' All schema ids are known before any schema is parsed '''
+
+    store = validator_.LazySchemaStore()
+    assert set(store) == set(schema_store)
+    assert store.loaded == set()
+
+
+def test_ndarray_loads_single_schema():
+    ''' Validating an NdArray only parses the NdArray schema '''
+
+    store = validator_.LazySchemaStore()
+    validator = validator_.create_custom_validator("/schemas/ndArray", store)
+    validator.validate({
+        "type": "NdArray",
+        "dataType": "float",
+        "values": [ 12.5 ]
+    })
+    assert store.loaded == {"/schemas/ndArray"}
+
+
+def test_coverage_loads_referenced_schemas(schema_store):
+    ''' Only schemas reachable through "$ref" are parsed '''
+
+    store = validator_.LazySchemaStore()
+    validator = validator_.create_custom_validator("/schemas/coveragejson", store)
+    path = os.path.join(os.path.dirname(__file__), "test_data", "playground", "grid.covjson")
+    with open(path) as f:
+        validator.validate(json.load(f))
+    assert "/schemas/coverage" in store.loaded
+    # Every other parsed schema is referenced by a parsed one
+    referenced = set()
+    for schema_id in store.loaded:
+        referenced |= find_references(schema_store[schema_id])
+    assert store.loaded - {"/schemas/coveragejson"} <= referenced
+    assert "/schemas/coverageCollection" not in store.loaded
+
+    with pytest.raises(ValidationError):
+        validator.validate({"type": "CoverageCollection"})
+    assert "/schemas/coverageCollection" in store.loaded
+
+
+def test_unknown_schema_id():
+    ''' Unknown schema ids raise KeyError '''
+
+    store = validator_.LazySchemaStore()
+    with pytest.raises(KeyError):
+        store["/schemas/unknown"]
@@ -0,0 +1,142 @@
+# Pytests to test the JSON backends of tools/loader.py, whose results
+# must be identical to those of json.load
+
+import gc
+import json
+import os
+
+import pytest
+
+import tools.loader as loader
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+FAST_BACKENDS = [name for name in loader.available_backends() if name != "json"]
+
+EDGE_CASES = [
+    b'{"values": [1, 2.5, -0, -0.0, 1e-400, 1E5, null, true, false]}',
+    b'[9223372036854775807, -9223372036854775808, 18446744073709551615]',
+    b'[18446744073709551616, -9223372036854775809, 123456789012345678901234567890]',
+    b'[0.1234567890123456789012, 1.5e300, 4.9e-324]',
+    b'[NaN, Infinity, -Infinity]',
+    b'[1e400, -1e400]',
+    b'{"a": 1, "a": 2, "b": {"c": 1, "c": [3]}}',
+    b'["\\ud800", "\\udc00x", "\\ud83d\\ude00", "\\u0000", "\\/\\b\\f\\n\\r\\t"]',
+    "[\"café\", \"\U0001F600\"]".encode("utf-8"),
+    b'\xef\xbb\xbf{"a": 1}',
+    b'{"a": 1}\r\n',
+    b' \t\r\n[1]\n',
+    b'',
+    b'   ',
+    b'[1] [2]',
+    b'{"a": 1,}',
+    b'[01]',
+    b'["tab\there"]',
+    b'["\xff"]',
+    b'[' * 5000 + b']' * 5000,
+]
+
+
+def outcome(function, *args):
+    ''' Returns the repr of the result, which distinguishes 1 and 1.0 and
+        compares NaN equal, or the type and message of the exception '''
+
+    try:
+        return repr(function(*args))
+    except ValueError as e:
+        return type(e).__name__, str(e)
+    except RecursionError:
+        return "RecursionError"
+
+
+def json_outcome(path):
+    def load():
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return outcome(load)
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize("data", EDGE_CASES, ids=range(len(EDGE_CASES)))
+def test_load_file_matches_json(tmp_path, backend, data):
+    ''' Valid: identical results and errors to json for edge cases '''
+
+    path = tmp_path / "doc.json"
+    path.write_bytes(data)
+    assert outcome(loader.load_file, path, backend) == json_outcome(path)
+
+
+@pytest.mark.parametrize("backend", FAST_BACKENDS)
+@pytest.mark.parametrize("data", EDGE_CASES, ids=range(len(EDGE_CASES)))
+def test_loads_matches_json(tmp_path, backend, data):
+    ''' Valid: loads of bytes gives the results of load_file '''
+
+    path = tmp_path / "doc.json"
+    path.write_bytes(data)
+    assert outcome(loader.loads, data, backend) == json_outcome(path)
+
+
+@pytest.mark.parametrize("backend", loader.available_backends())
+@pytest.mark.parametrize("name", sorted(name for name in os.listdir(PLAYGROUND_DIR)
+                                         if name.endswith(".covjson")))
+def test_load_playground(backend, name):
+    ''' Valid: the documents of the playground load like with json '''
+
+    path = os.path.join(PLAYGROUND_DIR, name)
+    assert outcome(loader.load_file, path, backend) == json_outcome(path)
+
+
+def test_has_long_digits_across_chunks(monkeypatch):
+    ''' Valid: runs of digits are found where they span two chunks '''
+
+    monkeypatch.setattr(loader, "SCAN_CHUNK_SIZE", 8)
+    assert loader.has_long_digits(b'[1, ' + b'9' * 19 + b']')
+    assert not loader.has_long_digits(b'[1, ' + b'9' * 18 + b', ' + b'9' * 18 + b']')
+
+
+def test_freeze_gc(tmp_path):
+    ''' Valid: the document is frozen and the collector enabled again '''
+
+    path = tmp_path / "doc.json"
+    path.write_text('{"values": [[1, 2], [3, 4]]}')
+    gc.unfreeze()
+    try:
+        assert loader.load_file(path, "json", freeze_gc=True) == {"values": [[1, 2], [3, 4]]}
+        assert gc.isenabled()
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_freeze_gc_error(tmp_path):
+    ''' Invalid: the collector is enabled again after a parse error '''
+
+    path = tmp_path / "doc.json"
+    path.write_text('{"values": [')
+    with pytest.raises(json.JSONDecodeError):
+        loader.load_file(path, "json", freeze_gc=True)
+    assert gc.isenabled()
+
+
+def test_auto_backend():
+    ''' Valid: auto chooses the first installed fast backend '''
+
+    expected = next((name for name in loader.AUTO_BACKENDS if name in FAST_BACKENDS), "json")
+    assert loader.get_backend("auto") == expected
+
+
+def test_unknown_backend():
+    ''' Invalid: backends that do not exist '''
+
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        loader.get_backend("ujson")
+
+
+def test_missing_backend(monkeypatch):
+    ''' Invalid: backends that are not installed '''
+
+    monkeypatch.setattr(loader, "orjson", None)
+    monkeypatch.setattr(loader, "simdjson", None)
+    assert loader.get_backend("auto") == "json"
+    with pytest.raises(ValueError, match="not installed"):
+        loader.get_backend("orjson")
@@ -0,0 +1,122 @@
+# Pytests to test the memoization of repeated domains in tools/memo.py
+
+import copy
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tools.batch as batch
+import tools.memo as memo
+import tools.validator as validator_
+from tools.validator import CACHE_DIR_ENV
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+@pytest.fixture(autouse=True)
+def empty_memo():
+    memo.clear()
+    yield
+    memo.clear()
+
+
+def create_validator(schema_store, memoize=True):
+    return validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                              dispatch=True, fast_items=True,
+                                              memoize=memoize)
+
+
+def get_collection(count):
+    ''' Returns a collection of count copies of the first coverage of the
+        point collection of the playground '''
+
+    with open(os.path.join(PLAYGROUND_DIR, "point-collection.covjson")) as f:
+        doc = json.load(f)
+    doc["coverages"] = [copy.deepcopy(doc["coverages"][0]) for _ in range(count)]
+    return doc
+
+
+def signatures(errors):
+    return sorted((tuple(error.absolute_path), error.message) for error in errors)
+
+
+def test_repeated_domains(schema_store):
+    ''' Valid: identical domains are validated once '''
+
+    doc = get_collection(20)
+    doc["coverages"][5]["domain"]["axes"]["x"]["values"] = [1.5]
+    create_validator(schema_store).validate(doc)
+    stats = memo.get_stats()
+    assert (stats["hits"], stats["misses"]) == (18, 2)
+    assert stats["saved_seconds"] > 0
+
+
+def test_json_equality(schema_store):
+    ''' Valid: domains that differ in key order share an entry,
+        domains that differ in a value do not '''
+
+    doc = get_collection(3)
+    axes = doc["coverages"][1]["domain"]["axes"]
+    axes["x"] = axes.pop("x")
+    doc["coverages"][2]["domain"]["axes"]["t"]["values"] = ["2020-01-01T00:00:00Z"]
+    create_validator(schema_store).validate(doc)
+    assert (memo.get_stats()["hits"], memo.get_stats()["misses"]) == (1, 2)
+
+
+def test_invalid_domains(schema_store):
+    ''' Invalid: the errors of repeated invalid domains are all reported '''
+
+    doc = get_collection(4)
+    for coverage in doc["coverages"]:
+        del coverage["domain"]["axes"]
+    errors = signatures(create_validator(schema_store).iter_errors(doc))
+    assert len(errors) == 4
+    assert errors == signatures(create_validator(schema_store, False).iter_errors(doc))
+    assert memo.get_stats()["hits"] == 0
+
+
+def test_separate_validators(schema_store):
+    ''' Valid: validators with other schemas do not share results '''
+
+    doc = get_collection(2)
+    create_validator(schema_store).validate(doc)
+    other_store = copy.deepcopy(schema_store)
+    other_store["/schemas/domainBase"]["maxProperties"] = 1
+    assert not create_validator(other_store).is_valid(doc)
+
+
+def test_batch_stats(tmp_path, monkeypatch):
+    ''' Valid: the statistics of the worker processes are summed up '''
+
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    doc = get_collection(10)
+    paths = []
+    for i in range(4):
+        paths.append(tmp_path / f"{i}.covjson")
+        paths[-1].write_text(json.dumps(doc))
+    stats = dict.fromkeys(memo.get_stats(), 0)
+    results = list(batch.validate_files(map(str, paths), workers=2, chunksize=1,
+                                        domain_stats=stats))
+    assert [status for _, status, _ in results] == [batch.VALID] * 4
+    assert stats["hits"] + stats["misses"] == 40
+    assert stats["misses"] <= 2
+
+
+def test_cli_collections(tmp_path):
+    ''' Valid: the command line only memoizes the domains of collections '''
+
+    collection_path = tmp_path / "collection.covjson"
+    collection_path.write_text(json.dumps(get_collection(10)))
+
+    def run(path):
+        return subprocess.run([sys.executable, "-m", "tools.validator", "--no-cache", str(path)],
+                              cwd=ROOT_DIR, capture_output=True, text=True)
+
+    result = run(collection_path)
+    assert result.stdout == "Valid!\n" and "Repeated domains: " in result.stderr
+    result = run(os.path.join(PLAYGROUND_DIR, "point.covjson"))
+    assert result.stdout == "Valid!\n" and "Repeated domains" not in result.stderr
@@ -0,0 +1,91 @@
+# Pytests to test the worker pool forked after the validator is created,
+# tools.pool.PreloadedPool, and its use by tools/batch.py
+
+import gc
+import glob
+import os
+
+import pytest
+
+import tools.batch as batch
+import tools.pool as pool_
+from tools.validator import CACHE_DIR_ENV
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+pytestmark = pytest.mark.skipif(not pool_.can_fork(), reason="Requires fork")
+
+_preloaded = None
+
+
+def get_preloaded():
+    return _preloaded
+
+
+def test_pool_shares_preloaded_state():
+    ''' Valid: workers see state created before forking and report their
+        startup time '''
+
+    global _preloaded
+
+    def warm_up():
+        global _preloaded
+        _preloaded = object()
+
+    with pool_.PreloadedPool(3, warm_up=warm_up) as pool:
+        pids = {stats["pid"] for stats in pool.worker_stats}
+        assert len(pids) == 3 and os.getpid() not in pids
+        assert all(stats["startup_seconds"] >= 0 for stats in pool.worker_stats)
+        assert pool.submit(get_preloaded).result() is not None
+    assert gc.get_freeze_count() == 0
+    _preloaded = None
+
+
+def test_memory_usage():
+    ''' Valid: the private memory is part of the resident memory '''
+
+    usage = pool_.get_memory_usage()
+    if usage is None:
+        pytest.skip("Memory use not available")
+    assert 0 < usage["private"] <= usage["rss"]
+    text = pool_.format_worker_stats([dict(usage, pid=1, startup_seconds=0.01)])
+    assert text.startswith("Worker 1: started in 10 ms, RSS ")
+
+
+def test_batch_results(tmp_path, monkeypatch):
+    ''' Valid: the workers of a preloaded pool validate like a single
+        process, also with a result cache opened in every worker '''
+
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    paths = sorted(glob.glob(os.path.join(PLAYGROUND_DIR, "*.covjson")))
+    paths.append(str(tmp_path / "missing.covjson"))
+    expected = list(batch.validate_files(paths, workers=1))
+    assert expected[-1][1] == batch.ERROR
+
+    result_cache = str(tmp_path / "results.sqlite")
+    for _ in range(2):
+        worker_stats = []
+        results = list(batch.validate_files(paths, workers=2, result_cache=result_cache,
+                                            worker_stats=worker_stats))
+        assert results == expected
+        assert len(worker_stats) == 2
+
+
+def fail_in_second_worker(lock_path):
+    ''' An initializer that fails in all but the first worker '''
+
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        raise RuntimeError("Cannot open the result cache")
+    os.close(fd)
+
+
+def test_failing_initializer(tmp_path):
+    ''' Invalid: a worker whose initializer fails breaks the pool instead of
+        leaving it waiting for the worker to start '''
+
+    with pytest.raises(pool_.BrokenProcessPool, match="Cannot open the result cache"):
+        pool_.PreloadedPool(3, initializer=fail_in_second_worker,
+                            initargs=(str(tmp_path / "lock"),))
+    assert gc.get_freeze_count() == 0
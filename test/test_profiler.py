@@ -0,0 +1,86 @@
+# Pytests to test the keyword profiler in tools/profiler.py
+
+import io
+import json
+import os
+import re
+
+import pytest
+
+import tools.validator as validator_
+from tools.profiler import KeywordProfiler, index_subschemas
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+def load_playground(name):
+    with open(os.path.join(PLAYGROUND_DIR, name)) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def validator(schema_store):
+    return validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                              dispatch=True, fast_items=True)
+
+
+def test_index_subschemas(schema_store):
+    index = index_subschemas(schema_store)
+    i18n = schema_store["/schemas/i18n"]
+    assert index[id(i18n)] == ("/schemas/i18n", "")
+    assert index[id(i18n["patternProperties"])] == ("/schemas/i18n", "/patternProperties")
+
+
+def test_same_errors(schema_store, validator):
+    ''' Invalid: a profiled validator yields the same errors '''
+
+    doc = load_playground("grid.covjson")
+    doc["ranges"]["ICEC"]["values"][0] = "x"
+    del doc["domain"]["axes"]["x"]["values"]
+    profiled = KeywordProfiler(schema_store).instrument(validator)
+    assert [(e.message, list(e.absolute_path), list(e.schema_path))
+            for e in profiled.iter_errors(doc)] == \
+        [(e.message, list(e.absolute_path), list(e.schema_path))
+         for e in validator.iter_errors(doc)]
+
+
+def test_stats(schema_store, validator):
+    ''' Valid: calls and times are recorded per schema, keyword and path '''
+
+    profiler = KeywordProfiler(schema_store)
+    profiler.instrument(validator).validate(load_playground("grid.covjson"))
+    calls, cumulative, self_time = profiler.stats[
+        ("/schemas/i18n", "patternProperties", "/patternProperties")]
+    assert calls > 0
+    assert 0 < self_time <= cumulative
+    root = profiler.stats[("/schemas/coveragejson", "allOf", "/allOf")]
+    assert root[0] == 1
+    assert root[1] >= sum(entry[2] for key, entry in profiler.stats.items()
+                          if key[0] != "/schemas/coveragejson") * 0.99
+
+    report = profiler.report(limit=5).splitlines()
+    assert len(report) == 7
+    self_times = [float(line.split()[2]) for line in report[1:-1]]
+    assert self_times == sorted(self_times, reverse=True)
+
+
+def test_collapsed_stacks(schema_store, validator):
+    ''' Valid: stacks are written in the collapsed format of flamegraph.pl '''
+
+    profiler = KeywordProfiler(schema_store)
+    profiler.instrument(validator).validate(load_playground("point.covjson"))
+    f = io.StringIO()
+    profiler.write_collapsed(f)
+    lines = f.getvalue().splitlines()
+    assert lines
+    for line in lines:
+        assert re.fullmatch(r"/schemas/coveragejson#/\w+(;[^; ]+)* \d+", line)
+
+
+def test_uninstrumented(schema_store, validator):
+    ''' Valid: validators are not affected unless instrumented '''
+
+    profiler = KeywordProfiler(schema_store)
+    profiler.instrument(validator)
+    validator.validate(load_playground("point.covjson"))
+    assert not profiler.stats
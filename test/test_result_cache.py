@@ -0,0 +1,71 @@
+# Pytests to test the validation result cache in tools/result_cache.py
+
+import os
+import shutil
+
+import pytest
+
+import tools.batch as batch
+from tools.result_cache import ResultCache
+from tools.validator import CACHE_DIR_ENV
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    return str(tmp_path / "results.sqlite")
+
+
+def test_identical_files_hit(db_path, tmp_path):
+    ''' Byte-identical files are looked up, changed files validated '''
+
+    paths = []
+    for i, name in enumerate(["grid.covjson", "point.covjson", "grid.covjson"]):
+        paths.append(str(tmp_path / f"{i}.covjson"))
+        shutil.copy(os.path.join(PLAYGROUND_DIR, name), paths[-1])
+    with open(paths[1], "a") as f:
+        f.write("x")
+
+    expected = list(batch.validate_files(paths, workers=1))
+    assert [status for _, status, _ in expected] == [batch.VALID, batch.ERROR, batch.VALID]
+
+    first = list(batch.validate_files(paths, workers=1, result_cache=db_path))
+    assert first == expected
+    cache = ResultCache("", "", db_path)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+    with open(paths[0], "a") as f:
+        f.write(" ")
+    second = list(batch.validate_files(paths, workers=1, result_cache=db_path))
+    assert second == expected
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 3, 3)
+
+
+def test_key_depends_on_schemas_and_mode(db_path):
+    ''' Results are not shared across schema versions or validator modes '''
+
+    digest = "0" * 64
+    keys = {
+        ResultCache("a", "m", db_path).key(digest),
+        ResultCache("b", "m", db_path).key(digest),
+        ResultCache("a", "n", db_path).key(digest),
+    }
+    assert len(keys) == 3
+
+
+def test_eviction(db_path):
+    ''' The least recently used entries are evicted '''
+
+    cache = ResultCache("a", "m", db_path, max_entries=2)
+    for key in ["k1", "k2", "k3"]:
+        cache.put(key, batch.VALID, None, 1.0)
+    assert cache.get("k1", 0) == (batch.VALID, None)
+    cache.evict()
+    assert cache.get("k2", 0) is None
+    assert cache.get("k1", 0) is not None
+    assert cache.get("k3", 0) is not None
+    assert cache.stats()["entries"] == 2
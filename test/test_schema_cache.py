@@ -0,0 +1,89 @@
+# Pytests to test the persistent schema store cache of tools/validator.py
+
+import json
+import os
+import shutil
+import time
+
+import tools.validator as validator_
+
+
+def copy_schemas(tmp_path):
+    schema_dir = tmp_path / "schemas"
+    shutil.copytree(validator_.SCHEMA_DIR, schema_dir)
+    return schema_dir
+
+
+def test_cached_store_matches_schema_dir(tmp_path, schema_store):
+    ''' The cached store is identical to a freshly loaded one, cold and warm '''
+
+    cache_dir = tmp_path / "cache"
+    for _ in range(2):
+        store = validator_.load_cached_schema_store(cache_dir=cache_dir)
+        assert store == schema_store
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_cache_invalidated_on_schema_change(tmp_path):
+    ''' Changing any schema file adds a cache entry '''
+
+    schema_dir = copy_schemas(tmp_path)
+    cache_dir = tmp_path / "cache"
+    store = validator_.load_cached_schema_store(schema_dir, cache_dir)
+    assert store["/schemas/ndArray"]["properties"]["values"]["minItems"] == 1
+
+    ndarray_path = schema_dir / "ndArray.json"
+    schema = json.loads(ndarray_path.read_text())
+    schema["properties"]["values"]["minItems"] = 2
+    ndarray_path.write_text(json.dumps(schema))
+
+    store = validator_.load_cached_schema_store(schema_dir, cache_dir)
+    assert store["/schemas/ndArray"]["properties"]["values"]["minItems"] == 2
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_old_entries_are_pruned(tmp_path, schema_store):
+    ''' Entries of other schema directories are kept until they are old '''
+
+    cache_dir = tmp_path / "cache"
+    other_dir = copy_schemas(tmp_path)
+    validator_.load_cached_schema_store(other_dir, cache_dir)
+    (other_entry,) = os.listdir(cache_dir)
+    assert validator_.load_cached_schema_store(cache_dir=cache_dir) == schema_store
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Using an entry keeps it
+    old = time.time() - validator_.CACHE_MAX_AGE - 60
+    os.utime(cache_dir / other_entry, (old, old))
+    validator_.load_cached_schema_store(other_dir, cache_dir)
+    (other_dir / "unit.json").touch()
+    validator_.load_cached_schema_store(other_dir, cache_dir)
+    assert other_entry in os.listdir(cache_dir)
+
+    os.utime(cache_dir / other_entry, (old, old))
+    (other_dir / "i18n.json").touch()
+    validator_.load_cached_schema_store(other_dir, cache_dir)
+    assert other_entry not in os.listdir(cache_dir)
+    assert len(os.listdir(cache_dir)) == 3
+    assert not [name for name in os.listdir(cache_dir) if name.endswith(".tmp")]
+
+
+def test_unwritable_cache_dir(tmp_path, schema_store):
+    ''' A cache directory that cannot be created does not prevent loading '''
+
+    cache_dir = tmp_path / "file"
+    cache_dir.write_text("not a directory")
+    store = validator_.load_cached_schema_store(cache_dir=cache_dir)
+    assert store == schema_store
+
+
+def test_failed_write_removes_temporary_file(tmp_path, monkeypatch, schema_store):
+    ''' A cache entry that cannot be written leaves no temporary file '''
+
+    def fail(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(validator_.pickle, "dump", fail)
+    cache_dir = tmp_path / "cache"
+    assert validator_.load_cached_schema_store(cache_dir=cache_dir) == schema_store
+    assert os.listdir(cache_dir) == []
@@ -0,0 +1,227 @@
+# Pytests to test the semantic checks in tools/semantic.py
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tools.semantic as semantic
+from tools.stream import load_streamed
+from tools.validator import format_error, json_pointer
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+PLAYGROUND_FILES = sorted(f for f in os.listdir(PLAYGROUND_DIR) if f.endswith(".covjson"))
+
+
+def load_playground(name):
+    with open(os.path.join(PLAYGROUND_DIR, name)) as f:
+        return json.load(f)
+
+
+def messages(doc):
+    return [format_error(error) for error in semantic.iter_semantic_errors(doc)]
+
+
+class CountingList(list):
+    ''' A list counting how often it is iterated or indexed '''
+
+    accesses = 0
+
+    def __iter__(self):
+        CountingList.accesses += 1
+        return super().__iter__()
+
+    def __getitem__(self, index):
+        CountingList.accesses += 1
+        return super().__getitem__(index)
+
+
+@pytest.mark.parametrize("name", PLAYGROUND_FILES)
+def test_playground(name):
+    ''' Valid: the playground documents are consistent '''
+
+    assert messages(load_playground(name)) == []
+
+
+def test_values_length():
+    ''' Invalid: the number of values does not match the shape '''
+
+    doc = load_playground("grid.covjson")
+    doc["ranges"]["ICEC"]["values"].pop()
+    assert messages(doc) == [
+        "values has 5 items, but shape [1, 1, 2, 3] requires 6 (at /ranges/ICEC/values)"]
+
+
+def test_values_length_without_shape():
+    ''' Invalid: an NdArray without shape has a single value '''
+
+    ndarray = {"type": "NdArray", "dataType": "float", "values": [1.5, 2.5]}
+    assert messages(ndarray) == [
+        "values has 2 items, but shape [] requires 1 (at /values)"]
+
+
+def test_axis_names_length():
+    ''' Invalid: axisNames and shape have different lengths '''
+
+    doc = load_playground("grid.covjson")
+    doc["ranges"]["ICEC"]["axisNames"].pop()
+    assert messages(doc) == [
+        "axisNames has 3 entries, but shape has 4 dimensions (at /ranges/ICEC/axisNames)"]
+
+
+def test_tile_shape_length():
+    ''' Invalid: a tileShape has an entry too few '''
+
+    doc = load_playground("grid-tiled.covjson")
+    range_ = next(iter(doc["ranges"]))
+    doc["ranges"][range_]["tileSets"][1]["tileShape"].pop()
+    errors = list(semantic.iter_semantic_errors(doc))
+    assert [json_pointer(error.absolute_path) for error in errors] == [
+        f"/ranges/{range_}/tileSets/1/tileShape"]
+
+
+def test_extension_members(tmp_path):
+    ''' Valid: extension members with the "type" of CoverageJSON objects
+        are not checked, like the schemas do not check them '''
+
+    doc = load_playground("grid.covjson")
+    doc["ex:extra"] = {"type": "NdArray"}
+    doc["ranges"]["ICEC"]["ex:tiles"] = {"type": "TiledNdArray", "shape": [1]}
+    doc["domain"]["ex:ranges"] = [{"type": "NdArray", "shape": [2], "values": [1]}]
+    assert messages(doc) == []
+
+    # Also valid against the schemas
+    path = tmp_path / "grid.covjson"
+    path.write_text(json.dumps(doc))
+    result = subprocess.run([sys.executable, "-m", "tools.validator", "--no-cache", str(path)],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    assert (result.returncode, result.stdout) == (0, "Valid!\n")
+
+
+@pytest.mark.parametrize("ndarray", [
+    {"type": "NdArray"},
+    {"type": "NdArray", "shape": "2", "axisNames": "x", "values": [1, 2]},
+    {"type": "NdArray", "shape": [None], "values": 1},
+    {"type": "TiledNdArray"},
+    {"type": "TiledNdArray", "shape": [1], "tileSets": [1, {"tileShape": None}]},
+])
+def test_arrays_invalid_against_schemas(ndarray):
+    ''' Invalid: arrays that the schemas reject are skipped, not failed on '''
+
+    assert messages(ndarray) == []
+
+
+def test_collection_paths():
+    ''' Invalid: errors in the coverages of a collection are in document order '''
+
+    doc = load_playground("point-collection.covjson")
+    for index in (1, 0):
+        range_ = next(iter(doc["coverages"][index]["ranges"].values()))
+        range_["values"].append(0)
+    assert [error.split(" (at ")[1] for error in messages(doc)] == [
+        f"/coverages/0/ranges/{next(iter(doc['coverages'][0]['ranges']))}/values)",
+        f"/coverages/1/ranges/{next(iter(doc['coverages'][1]['ranges']))}/values)",
+    ]
+
+
+def test_json_pointer():
+    assert json_pointer(()) == ""
+    assert json_pointer(("ranges", "a/b~c", 0)) == "/ranges/a~1b~0c/0"
+
+
+def test_values_not_iterated():
+    ''' Valid: the values are neither iterated nor indexed '''
+
+    doc = load_playground("grid.covjson")
+    values = doc["ranges"]["ICEC"]["values"]
+    doc["ranges"]["ICEC"]["values"] = CountingList(values)
+    CountingList.accesses = 0
+    assert messages(doc) == []
+    assert CountingList.accesses == 0
+
+
+def test_streamed_values():
+    ''' Valid: the length of streamed values is read from the file '''
+
+    doc = load_streamed(os.path.join(PLAYGROUND_DIR, "grid.covjson"))
+    assert messages(doc) == []
+
+
+def test_range_without_parameter():
+    ''' Invalid: a range key has no matching parameter '''
+
+    doc = load_playground("grid.covjson")
+    doc["ranges"]["ICE"] = doc["ranges"].pop("ICEC")
+    assert messages(doc) == ["Range 'ICE' has no matching parameter (at /ranges/ICE)"]
+
+
+def test_collection_parameters():
+    ''' Valid: coverages inherit the parameters of their collection,
+        in addition to their own '''
+
+    doc = load_playground("point-collection.covjson")
+    coverage = doc["coverages"][1]
+    coverage["parameters"] = {"POTM2": doc["parameters"]["POTM"]}
+    coverage["ranges"]["POTM2"] = coverage["ranges"]["POTM"]
+    assert messages(doc) == []
+
+    del doc["parameters"]["QC"]
+    assert messages(doc) == [
+        "Range 'QC' has no matching parameter (at /coverages/0/ranges/QC)",
+        "Range 'QC' has no matching parameter (at /coverages/1/ranges/QC)",
+    ]
+
+
+def test_parameters_not_copied():
+    ''' Valid: the parameters in scope share the dicts of the document '''
+
+    doc = load_playground("point-collection.covjson")
+    scopes = [parameters for path, obj, parameters in semantic.walk(doc)
+              if obj.get("type") == "Coverage"]
+    assert scopes[0].maps[0] is doc["parameters"]
+
+
+def test_range_axis_not_in_domain():
+    ''' Invalid: a range has an axis the domain does not have '''
+
+    doc = load_playground("grid.covjson")
+    doc["ranges"]["ICEC"]["axisNames"][1] = "h"
+    assert messages(doc) == [
+        "Axis 'h' is not an axis of the domain (at /ranges/ICEC/axisNames/1)"]
+
+
+def test_range_shape_mismatch():
+    ''' Invalid: the shape of a range disagrees with the axis lengths,
+        also of regularly spaced axes '''
+
+    doc = load_playground("grid.covjson")
+    doc["domain"]["axes"]["x"] = {"start": 0, "stop": 10, "num": 4}
+    doc["domain"]["axes"]["y"]["values"].append(90)
+    assert messages(doc) == [
+        "shape has 2 entries along axis 'y', but the axis has 3 coordinates "
+        "(at /ranges/ICEC/shape/2)",
+        "shape has 3 entries along axis 'x', but the axis has 4 coordinates "
+        "(at /ranges/ICEC/shape/3)",
+    ]
+
+
+@pytest.mark.parametrize("coverage", [
+    {"type": "Coverage", "ranges": [1]},
+    {"type": "Coverage", "domain": {"axes": []}, "ranges": {"a": {"shape": 1}}},
+    {"type": "Coverage", "domain": {"axes": {"x": 1, "y": {}}},
+     "ranges": {"a": {"axisNames": ["x", "y", ["z"]], "shape": [None, 2, 3]}}},
+    {"type": "Coverage", "domain": {"axes": {"x": {"values": "1"}}},
+     "ranges": {"a": {"axisNames": ["x"], "shape": [1]}}},
+])
+def test_coverages_invalid_against_schemas(coverage):
+    ''' Invalid: coverages that the schemas reject are checked as far as
+        possible instead of failed on '''
+
+    coverage["parameters"] = {"a": {}}
+    assert messages(coverage) == []
+    doc = load_playground("grid.covjson")
+    doc["ex:extra"] = coverage
+    assert messages(doc) == []
@@ -0,0 +1,173 @@
+# Pytests to test the validation service in tools/server.py
+
+import asyncio
+import json
+import os
+
+import pytest
+
+from tools.server import ValidationService, create_validators
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+
+@pytest.fixture(scope="module")
+def validators(schema_store):
+    return create_validators(schema_store)
+
+
+async def request(connect, method, target, body=b""):
+    ''' Sends a request and returns the status and decoded JSON response '''
+
+    reader, writer = await connect()
+    writer.write(f"{method} {target} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, data = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(data)
+
+
+def run_with_server(validators, client, unix_socket=None, **kwargs):
+    ''' Runs client(connect) against a ValidationService on a free port '''
+
+    async def main():
+        service = ValidationService(validators, **kwargs)
+        if unix_socket:
+            server = await asyncio.start_unix_server(service.handle_connection, unix_socket)
+            connect = lambda: asyncio.open_unix_connection(unix_socket)
+        else:
+            server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            connect = lambda: asyncio.open_connection("127.0.0.1", port)
+        async with server:
+            return await client(connect)
+
+    return asyncio.run(main())
+
+
+def read_playground(name):
+    with open(os.path.join(PLAYGROUND_DIR, name), "rb") as f:
+        return f.read()
+
+
+def test_valid(validators):
+    ''' Valid: documents are validated against the schema of the path '''
+
+    async def client(connect):
+        return await asyncio.gather(
+            request(connect, "POST", "/schemas/coveragejson", read_playground("grid.covjson")),
+            request(connect, "POST", "/validate", read_playground("point.covjson")),
+        )
+
+    for status, response in run_with_server(validators, client, concurrency=2):
+        assert status == 200
+        assert response == {"valid": True, "errors": []}
+
+
+def test_invalid(validators):
+    ''' Invalid: errors are reported with their paths '''
+
+    doc = json.loads(read_playground("grid.covjson"))
+    doc["ranges"]["ICEC"]["values"][1:3] = ["x", "y"]
+    body = json.dumps(doc).encode("utf-8")
+
+    async def client(connect):
+        return await asyncio.gather(
+            request(connect, "POST", "/schemas/coveragejson", body),
+            request(connect, "POST", "/schemas/coveragejson?max_errors=1", body),
+        )
+
+    (status, response), (_, limited) = run_with_server(validators, client)
+    assert status == 200
+    assert response["valid"] is False
+    assert [e["path"] for e in response["errors"]] == [
+        "$.ranges.ICEC.values[1]", "$.ranges.ICEC.values[2]"]
+    assert response["errors"][0]["message"] == "'x' is not of type 'number', 'null'"
+    assert limited["errors"] == response["errors"][:1]
+
+
+def test_unix_socket(validators, tmp_path):
+    ''' Valid: the service can listen on a Unix socket '''
+
+    async def client(connect):
+        return await request(connect, "POST", "/schemas/ndArray",
+                             b'{"type": "NdArray", "dataType": "float", "values": [1.5]}')
+
+    assert run_with_server(validators, client, str(tmp_path / "socket")) == \
+        (200, {"valid": True, "errors": []})
+
+
+@pytest.mark.parametrize("method,target,body,expected_status", [
+    ("POST", "/schemas/coveragejson", b"{", 400),
+    ("POST", "/schemas/unknown", b"{}", 404),
+    ("GET", "/schemas/coveragejson", b"", 405),
+    ("POST", "/schemas/coveragejson", b"{}" * 100, 413),
+    ("POST", "/schemas/coveragejson?max_errors=-1", b"{}", 400),
+    ("POST", "/schemas/coveragejson?max_errors=0", b'{"type": "Coverage"}', 400),
+])
+def test_bad_requests(validators, method, target, body, expected_status):
+    ''' Invalid: requests that cannot be validated get an error status '''
+
+    async def client(connect):
+        return await request(connect, method, target, body)
+
+    status, response = run_with_server(validators, client, max_body_size=100)
+    assert status == expected_status
+    assert "error" in response
+
+
+def test_deeply_nested(validators):
+    ''' Invalid: documents nested deeper than the parser can handle '''
+
+    async def client(connect):
+        return await request(connect, "POST", "/validate", b"[" * 100000 + b"]" * 100000)
+
+    status, response = run_with_server(validators, client)
+    assert status == 400
+    assert response["error"] == "The document is nested too deeply"
+
+
+def test_too_many_pending(validators):
+    ''' Invalid: requests beyond max_pending are rejected '''
+
+    async def client(connect):
+        return await request(connect, "POST", "/validate", b"{}")
+
+    status, _ = run_with_server(validators, client, max_pending=0)
+    assert status == 503
+
+
+def test_semantic_errors(validators):
+    ''' Invalid: documents valid against the schema are also checked like
+        the command line does, unless semantic is False '''
+
+    doc = json.loads(read_playground("grid.covjson"))
+    doc["ranges"]["ICEC"]["shape"][0] += 1
+    body = json.dumps(doc).encode("utf-8")
+
+    async def client(connect):
+        return await request(connect, "POST", "/validate", body)
+
+    status, response = run_with_server(validators, client)
+    assert status == 200 and response["valid"] is False
+    assert response["errors"][0]["path"] == "$.ranges.ICEC.shape[0]"
+    assert run_with_server(validators, client, semantic=False) == \
+        (200, {"valid": True, "errors": []})
+
+
+def test_internal_error(validators):
+    ''' Invalid: unexpected exceptions are answered with 500 '''
+
+    class BrokenValidator:
+        def iter_errors(self, instance):
+            raise RuntimeError("broken")
+
+    async def client(connect):
+        return await request(connect, "POST", "/schemas/broken", b"{}")
+
+    status, response = run_with_server(dict(validators, **{"/schemas/broken": BrokenValidator()}),
+                                       client)
+    assert status == 500
+    assert "broken" in response["error"]
@@ -0,0 +1,86 @@
+# Pytests to test that one validator of create_shared_validator gives
+# the same results when many threads validate with it at once
+
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import tools.validator as validator_
+
+from .mutations import error_signature, mutations
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+CALLS = 2000
+THREADS = 32
+
+
+@pytest.fixture(scope="module")
+def documents():
+    ''' Valid documents of the playground and invalid mutations of them '''
+
+    docs = []
+    for name in ["point.covjson", "trajectory.covjson"]:
+        with open(os.path.join(PLAYGROUND_DIR, name)) as f:
+            doc = json.load(f)
+        docs.append(doc)
+        docs.extend(list(mutations(doc))[::40])
+    return docs
+
+
+def signatures(validator, doc):
+    return sorted(map(error_signature, validator.iter_errors(doc)), key=repr)
+
+
+@pytest.fixture(autouse=True)
+def short_switch_interval():
+    ''' Switches threads often to interleave the validations more '''
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_concurrent_validation(schema_store, documents):
+    ''' Valid: thousands of concurrent validations with one validator give
+        the errors of a validator of their own '''
+
+    shared = validator_.create_shared_validator("/schemas/coveragejson", schema_store,
+                                                dispatch=True, fast_items=True)
+    reference = validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                                   dispatch=True, fast_items=True)
+    expected = [signatures(reference, doc) for doc in documents]
+    assert any(expected) and not all(expected)
+
+    indices = [i % len(documents) for i in range(CALLS)]
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(lambda i: signatures(shared, documents[i]), indices))
+    for i, result in zip(indices, results):
+        assert result == expected[i]
+    assert shared.is_valid(documents[0])
+
+
+def test_registry_is_crawled(schema_store):
+    ''' Valid: all schemas of the store are registered '''
+
+    registry = validator_.create_schema_registry(schema_store)
+    assert set(schema_store) <= set(registry)
+    assert not registry._uncrawled
+
+
+def test_without_jsonschema_internals(schema_store, documents, monkeypatch):
+    ''' Valid: without the internals of jsonschema that lookups are cached
+        by, references are looked up by the "$ref" keyword of jsonschema '''
+
+    import jsonschema.exceptions
+    monkeypatch.delattr(jsonschema.exceptions, "_WrappedReferencingError")
+    shared = validator_.create_shared_validator("/schemas/coveragejson", schema_store,
+                                                dispatch=True, fast_items=True)
+    reference = validator_.create_custom_validator("/schemas/coveragejson", schema_store,
+                                                   dispatch=True, fast_items=True)
+    for doc in documents[:20]:
+        assert signatures(shared, doc) == signatures(reference, doc)
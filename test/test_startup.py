@@ -0,0 +1,121 @@
+# Pytests to test that the command line of tools/validator.py rejects
+# documents that are not CoverageJSON, and validates with a precompiled
+# validator, without importing jsonschema
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+import tools.validator as validator_
+from tools.compile_validator import (
+    get_precompiled_path, load_precompiled_module, write_precompiled_module
+)
+from tools.validator import CACHE_DIR_ENV, CACHE_MAX_AGE, schema_files_signature
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), "..")
+POINT_PATH = os.path.join(os.path.dirname(__file__), "test_data", "playground", "point.covjson")
+
+
+def run_cli(args, cache_dir):
+    ''' Runs the command line, returns its result and the imported modules '''
+
+    env = dict(os.environ, **{CACHE_DIR_ENV: str(cache_dir)})
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "tools.validator"] + args,
+                            cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    modules = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines()
+               if line.startswith("import time:")}
+    return result, modules
+
+
+def test_document_types(schema_store):
+    ''' Valid: the document types are those of the root schema '''
+
+    schema = schema_store["/schemas/coveragejson"]
+    assert validator_.DOCUMENT_TYPES == schema["properties"]["type"]["enum"]
+
+
+@pytest.mark.parametrize("doc, message", [
+    ([1], "[1] is not of type 'object' (at the document root)"),
+    ({"domain": {}}, "'type' is a required property (at the document root)"),
+    ({"type": "Feature"}, "'Feature' is not one of ['Domain', 'NdArray', 'TiledNdArray', "
+                          "'Coverage', 'CoverageCollection'] (at /type)"),
+])
+def test_rejected_without_validator(tmp_path, doc, message):
+    ''' Invalid: documents that are not CoverageJSON objects '''
+
+    assert validator_.check_document_type(doc) == message
+    path = tmp_path / "doc.json"
+    path.write_text(json.dumps(doc))
+    result, modules = run_cli([str(path)], tmp_path / "cache")
+    assert result.returncode == 1
+    assert result.stdout == f"Invalid: {message}\n"
+    assert "jsonschema" not in modules
+
+
+def test_help_without_jsonschema(tmp_path):
+    ''' Valid: the help is printed without importing jsonschema '''
+
+    result, modules = run_cli(["--help"], tmp_path)
+    assert result.returncode == 0
+    assert "jsonschema" not in modules
+
+
+def test_precompiled(tmp_path):
+    ''' Valid: the precompiled validator gives the verdicts of the native one '''
+
+    cache_dir = tmp_path / "cache"
+    invalid_path = tmp_path / "invalid.covjson"
+    with open(POINT_PATH) as f:
+        doc = json.load(f)
+    doc["domain"]["axes"]["x"] = {"values": ["east"]}
+    invalid_path.write_text(json.dumps(doc))
+
+    native = [run_cli([path], cache_dir)[0] for path in [POINT_PATH, str(invalid_path)]]
+    assert load_precompiled_module(cache_dir=str(cache_dir)) is None
+    write_precompiled_module(cache_dir=str(cache_dir))
+
+    result, modules = run_cli([POINT_PATH], cache_dir)
+    assert result.stdout == native[0].stdout == "Valid!\n"
+    assert not modules & {"jsonschema", "numpy"}
+    result, _ = run_cli([str(invalid_path)], cache_dir)
+    assert result.returncode == native[1].returncode == 1
+    assert result.stdout == native[1].stdout == \
+        "Invalid: 'east' is not of type 'number' (at /domain/axes/x/values/0)\n"
+
+
+def test_precompiled_stale(tmp_path):
+    ''' Invalid: precompiled validators of other schemas are not used '''
+
+    path = write_precompiled_module(cache_dir=str(tmp_path))
+    assert path == get_precompiled_path(schema_files_signature(), str(tmp_path))
+    assert load_precompiled_module(cache_dir=str(tmp_path)) is not None
+    other_path = get_precompiled_path("0" * 64, str(tmp_path))
+    os.rename(path, other_path)
+    assert load_precompiled_module(cache_dir=str(tmp_path)) is None
+
+
+def test_precompiled_pruning(tmp_path):
+    ''' Valid: precompiled validators of other schemas or interpreters,
+        e.g. of other checkouts sharing the cache, are kept until old '''
+
+    path = write_precompiled_module(cache_dir=str(tmp_path))
+    other_paths = [get_precompiled_path("0" * 64, str(tmp_path)),
+                   path.replace(f".{sys.implementation.cache_tag}.", ".other-tag.")]
+    for other_path in other_paths:
+        shutil.copy(path, other_path)
+    write_precompiled_module(cache_dir=str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == sorted(map(os.path.basename, [path] + other_paths))
+
+    old = time.time() - CACHE_MAX_AGE - 60
+    for entry in [path] + other_paths:
+        os.utime(entry, (old, old))
+    # Loading marks the validator of the current schemas as used
+    assert load_precompiled_module(cache_dir=str(tmp_path)) is not None
+    assert os.stat(path).st_mtime > old
+    write_precompiled_module(cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
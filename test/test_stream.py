@@ -0,0 +1,138 @@
+# Pytests checking that documents read by tools/stream.py are
+# validated like documents loaded with json.load
+
+import json
+import os
+import tracemalloc
+
+import pytest
+
+import tools.fast_items as fast_items
+import tools.stream as stream
+import tools.validator as validator_
+
+from .mutations import error_signature, mutations
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+
+PLAYGROUND_FILES = sorted(
+    f for f in os.listdir(PLAYGROUND_DIR) if f.endswith(".covjson"))
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    ''' Exercises buffer refills and StreamedArray with small documents '''
+    monkeypatch.setattr(stream, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(stream, "MAX_MATERIALIZED_LENGTH", 1)
+    monkeypatch.setattr(fast_items, "MIN_LENGTH", 2)
+
+
+@pytest.fixture(scope="module")
+def coveragejson_validator(schema_store):
+    return validator_.create_custom_validator(
+        "/schemas/coveragejson", schema_store, dispatch=True, fast_items=True)
+
+
+def write_json(path, obj):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, indent=2)
+
+
+def count_streamed_arrays(obj):
+    if isinstance(obj, stream.StreamedArray):
+        return 1
+    if isinstance(obj, dict):
+        return sum(map(count_streamed_arrays, obj.values()))
+    if isinstance(obj, list):
+        return sum(map(count_streamed_arrays, obj))
+    return 0
+
+
+@pytest.mark.parametrize("name", PLAYGROUND_FILES)
+def test_playground_coverages(name, small_chunks, coveragejson_validator):
+    ''' Valid: the streamed document equals the loaded one '''
+
+    path = os.path.join(PLAYGROUND_DIR, name)
+    with open(path, encoding="utf-8") as f:
+        expected = json.load(f)
+    actual = stream.load_streamed(path)
+    assert actual == expected
+    coveragejson_validator.validate(actual)
+
+
+@pytest.mark.parametrize("name", ["grid.covjson", "profile-collection.covjson"])
+def test_same_errors_as_loaded(name, small_chunks, coveragejson_validator, tmp_path):
+    ''' Invalid: mutated documents give the same errors as when loaded '''
+
+    with open(os.path.join(PLAYGROUND_DIR, name), encoding="utf-8") as f:
+        doc = json.load(f)
+    path = tmp_path / "mutated.covjson"
+    streamed_arrays = 0
+    for mutated in mutations(doc):
+        write_json(path, mutated)
+        streamed = stream.load_streamed(path)
+        streamed_arrays += count_streamed_arrays(streamed)
+        expected = [error_signature(e) for e in coveragejson_validator.iter_errors(mutated)]
+        actual = [error_signature(e) for e in coveragejson_validator.iter_errors(streamed)]
+        assert actual == expected
+    assert streamed_arrays > 0
+
+
+def test_streamed_array(small_chunks, tmp_path):
+    ''' Valid: items are read from the file in any order '''
+
+    values = [1, 2.5, None, "a,b", "ä", [3, 4], {"x": [5, 6]}, True, -1e30]
+    path = tmp_path / "ndarray.json"
+    write_json(path, {"values": values})
+    array = stream.load_streamed(path)["values"]
+    assert isinstance(array, stream.StreamedArray)
+    assert len(array) == len(values)
+    assert list(array) == values
+    assert [array[i] for i in [8, 0, 3, 3, 4, -1]] == [values[i] for i in [8, 0, 3, 3, 4, -1]]
+    assert array[1:5] == values[1:5]
+    assert "a,b" in array and "b" not in array
+    assert repr(array) == repr(values)
+    with pytest.raises(IndexError):
+        array[len(values)]
+
+
+@pytest.mark.parametrize("text", [
+    '', '{', '{"a": 1,}', '[1,]', '{"a" 1}', '{"a": 1} x', '"abc', '["a\\x"]',
+    '{"a":\n [1,\n 2 3]}', '{"ranges": {"r": {"values": [1, 2, 3,, 4]}}}',
+])
+def test_malformed_json(text, small_chunks, tmp_path):
+    ''' Invalid: syntax errors are reported at the same position as by json '''
+
+    path = tmp_path / "malformed.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(text)
+    with pytest.raises(json.JSONDecodeError) as actual:
+        stream.load_streamed(path)
+    assert str(actual.value) == str(expected.value)
+
+
+def test_memory_independent_of_length(coveragejson_validator, tmp_path):
+    ''' Valid: the values of a large range are not held in memory '''
+
+    path = tmp_path / "large.covjson"
+    with open(os.path.join(PLAYGROUND_DIR, "grid.covjson"), encoding="utf-8") as f:
+        doc = json.load(f)
+    length = 200000
+    doc["domain"]["axes"]["x"] = {"start": 0, "stop": 1, "num": length}
+    for ndarray in doc["ranges"].values():
+        ndarray["shape"] = [1, 1, 1, length]
+        ndarray["values"] = [i / 3 for i in range(length)]
+    write_json(path, doc)
+    del doc, ndarray
+
+    tracemalloc.start()
+    try:
+        obj = stream.load_streamed(path)
+        coveragejson_validator.validate(obj)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert isinstance(obj["ranges"]["ICEC"]["values"], stream.StreamedArray)
+    # Loaded, the values would take 32 bytes each
+    assert peak < length * 32 / 4
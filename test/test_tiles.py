@@ -0,0 +1,95 @@
+# Pytests to test the expansion and validation of TiledNdArray tiles
+# in tools/tiles.py against the grid-tiled playground coverage
+
+import json
+import os
+import shutil
+
+import pytest
+
+import tools.tiles as tiles
+import tools.validator as validator_
+
+PLAYGROUND_DIR = os.path.join(os.path.dirname(__file__), "test_data", "playground")
+TILES_URL = "https://covjson.org/playground/coverages/grid-tiled/"
+
+
+@pytest.fixture(scope="module")
+def ndarray_validator(schema_store):
+    return validator_.create_custom_validator("/schemas/ndArray", schema_store)
+
+
+@pytest.fixture
+def coverage():
+    with open(os.path.join(PLAYGROUND_DIR, "grid-tiled.covjson")) as f:
+        return json.load(f)
+
+
+def test_expand_url_template():
+    assert tiles.expand_url_template("http://a/{y}-{x}.json", {"x": 3, "y": 0}) == \
+        "http://a/0-3.json"
+    assert tiles.expand_url_template("http://a/{t}{x}", {"t": "2010 a/b"}) == \
+        "http://a/2010%20a%2Fb"
+
+
+def test_iter_tiles():
+    ''' Tiles at the end of an axis are smaller '''
+
+    shape, axis_names = [2, 5, 10], ["t", "y", "x"]
+    tile_list = list(tiles.iter_tiles(shape, axis_names, [None, 2, 3]))
+    assert len(tile_list) == 12
+    assert tile_list[0] == ({"y": 0, "x": 0}, [2, 2, 3])
+    assert tile_list[-1] == ({"y": 2, "x": 3}, [2, 1, 1])
+    assert list(tiles.iter_tiles(shape, axis_names, [1, None, None])) == [
+        ({"t": 0}, [1, 5, 10]), ({"t": 1}, [1, 5, 10])]
+    assert list(tiles.iter_tiles(shape, axis_names, [None, None, None])) == [({}, shape)]
+
+
+def test_valid_tiles(coverage, ndarray_validator):
+    ''' Valid: all tiles of the playground coverage are loaded offline '''
+
+    tile_dirs = {TILES_URL: os.path.join(PLAYGROUND_DIR, "grid-tiled")}
+    assert list(tiles.iter_tile_errors(coverage, ndarray_validator, tile_dirs, workers=3)) == []
+
+
+def test_invalid_tiles(coverage, ndarray_validator, tmp_path):
+    ''' Invalid: missing tiles and tiles of the wrong shape are reported '''
+
+    shutil.copytree(os.path.join(PLAYGROUND_DIR, "grid-tiled"), tmp_path / "grid-tiled")
+    os.remove(tmp_path / "grid-tiled" / "b" / "1.covjson")
+    tile_path = tmp_path / "grid-tiled" / "a" / "2-3.covjson"
+    tile = json.loads(tile_path.read_text())
+    tile["shape"] = [2, 1, 2]
+    tile["values"] = "x"
+    tile_path.write_text(json.dumps(tile))
+
+    tile_dirs = {TILES_URL: str(tmp_path / "grid-tiled")}
+    errors = list(tiles.iter_tile_errors(coverage, ndarray_validator, tile_dirs))
+    assert [(e.json_path, e.message.split(": ")[0]) for e in errors] == [
+        ("$.ranges.FOO.tileSets[0]", f"Tile {TILES_URL}a/2-3.covjson is not a valid NdArray"),
+        ("$.ranges.FOO.tileSets[0]", f"Tile {TILES_URL}a/2-3.covjson has shape [2, 1, 2], expected [2, 1, 1]"),
+        ("$.ranges.FOO.tileSets[1]", f"Tile {TILES_URL}b/1.covjson cannot be loaded"),
+    ]
+
+
+@pytest.mark.parametrize("relpath", ["../secret.json", "a/%2E%2E/%2E%2E/secret.json",
+                                     "link/secret.json"])
+def test_tiles_outside_of_directory(tmp_path, relpath):
+    ''' Invalid: tile URLs leading out of the mapped directory are not read '''
+
+    (tmp_path / "secret.json").write_text("{}")
+    tile_dir = tmp_path / "tiles"
+    (tile_dir / "a").mkdir(parents=True)
+    (tile_dir / "link").symlink_to(tmp_path)
+    with pytest.raises(ValueError, match="outside of"):
+        tiles.load_tile(TILES_URL + relpath, {TILES_URL: str(tile_dir)})
+
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://example.com/tile.json",
+                                 "/etc/passwd"])
+def test_only_http_tiles(url):
+    ''' Invalid: tiles outside of the mapped directories are only loaded
+        over HTTP(S) '''
+
+    with pytest.raises(ValueError, match="only http and https"):
+        tiles.load_tile(url, {TILES_URL: PLAYGROUND_DIR})
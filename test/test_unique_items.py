@@ -0,0 +1,42 @@
+# Pytests checking that the hash-based "uniqueItems" check of
+# tools/unique_items.py agrees with the one of jsonschema
+
+import pytest
+from jsonschema._utils import uniq
+
+from tools.unique_items import is_unique
+
+CASES = [
+    [],
+    [1, 2, 3],
+    [1, 1.0],
+    [True, 1],
+    [False, 0, None],
+    [True, True],
+    ["1", 1],
+    [[1, 2], [1, 2.0]],
+    [[1, True], [1, 1]],
+    [[0.5, None], [0.5, 1], [None, 0.5]],
+    [[0.5, None], [0.5, None]],
+    [["2008-01-01T04:00:00Z", 1, 20], ["2008-01-01T04:00:00Z", 1, 20.0]],
+    [[[[100.0, 0.0], [101.0, 0.0], [100.0, 0.0]]], [[[100.0, 0.0], [101, 0], [100, 0]]]],
+    [[[[100.0, 0.0], [101.0, 0.0], [100.0, 0.0]]], [[[100.0, 0.0], [101.0, 1.0], [100.0, 0.0]]]],
+    [{"a": 1, "b": [2]}, {"b": [2.0], "a": 1}],
+    [{"a": 1}, {"a": True}],
+    [[], {}],
+]
+
+
+@pytest.mark.parametrize("values", CASES)
+def test_same_as_jsonschema(values):
+    assert is_unique(values) == uniq(values)
+
+
+def test_large_tuple_axis():
+    ''' Valid: tuples that cannot be sorted, which jsonschema compares
+        pairwise, are checked in linear time '''
+
+    values = [[i % 2 or None, i] for i in range(200000)]
+    assert is_unique(values)
+    values.append([None, 0])
+    assert not is_unique(values)
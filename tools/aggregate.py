@@ -0,0 +1,88 @@
+# Aggregates validation errors that repeat for many elements of an array,
+# e.g. one error per float of an integer NdArray with millions of values.
+# Errors are grouped by their keyword and the path of the failing
+# subschema, and every group keeps its count, its first message, the
+# instance paths of its first errors and the first runs of consecutive
+# array indices it failed at. The errors are consumed one at a time and
+# not kept, so that memory does not depend on their number.
+
+from .validator import format_message, json_pointer
+
+# The number of instance paths and index ranges kept per group
+DEFAULT_MAX_EXAMPLES = 5
+
+
+class ErrorGroup:
+    ''' The errors of one keyword at one schema path '''
+
+    def __init__(self, keyword, schema_path, message, max_examples=DEFAULT_MAX_EXAMPLES):
+        self.keyword = keyword
+        self.schema_path = schema_path
+        self.message = message
+        self.max_examples = max_examples
+        self.count = 0
+        # The instance paths of the first errors
+        self.paths = []
+        # The first runs of consecutive indices, as [array path, start, stop]
+        self.ranges = []
+        # Whether indices beyond those of the ranges failed
+        self.more_ranges = False
+
+    def add(self, path):
+        ''' Counts an error at an instance path (a tuple) '''
+
+        self.count += 1
+        if len(self.paths) < self.max_examples:
+            self.paths.append(path)
+        if not path or type(path[-1]) is not int:
+            return
+        array, index = path[:-1], path[-1]
+        if self.ranges:
+            last = self.ranges[-1]
+            if last[0] == array and last[1] <= index <= last[2]:
+                last[2] = max(last[2], index + 1)
+                return
+        if len(self.ranges) < self.max_examples:
+            self.ranges.append([array, index, index + 1])
+        else:
+            self.more_ranges = True
+
+    def format(self):
+        ''' Describes the group like format_error does, followed by the
+            paths and index ranges of more than one error '''
+
+        first = format_message(self.message, self.paths[0])
+        if self.count == 1:
+            return first
+        paths = ", ".join(json_pointer(path) or "/" for path in self.paths)
+        if self.count > len(self.paths):
+            paths += f" and {self.count - len(self.paths)} more"
+        schema_pointer = json_pointer(self.schema_path) or "the schema root"
+        lines = [f"{self.count} errors of {self.keyword!r} at {schema_pointer}, first: {first}",
+                 f"  at {paths}"]
+        if self.ranges:
+            ranges = ", ".join(
+                f"{json_pointer(array)}/{start}" + (f"-{stop - 1}" if stop - start > 1 else "")
+                for array, start, stop in self.ranges)
+            if self.more_ranges:
+                ranges += " and more"
+            lines.append(f"  indices {ranges}")
+        return "\n".join(lines)
+
+
+def aggregate_errors(errors, max_examples=DEFAULT_MAX_EXAMPLES):
+    ''' Groups an iterable of validation errors by keyword and absolute
+        schema path. Returns the groups in the order of their first error.
+        Errors of "anyOf" or "oneOf" branches (error.context) belong to
+        their parent error and are not grouped. '''
+
+    groups = {}
+    for error in errors:
+        schema_path = tuple(error.absolute_schema_path)
+        key = (error.validator, schema_path)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ErrorGroup(error.validator, schema_path, error.message,
+                                             max_examples)
+        group.add(tuple(error.absolute_path))
+    return list(groups.values())
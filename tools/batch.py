@@ -0,0 +1,230 @@
+# Validates many CoverageJSON files in parallel with a pool of worker
+# processes, each of which creates its validator only once. Where processes
+# can be forked, the validator is created in the parent process and the
+# workers share it copy-on-write (see PreloadedPool).
+
+import glob
+import hashlib
+import importlib.metadata
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .validator import (
+    create_custom_validator, create_schema_store, format_error, load_cached_schema_store,
+    schema_store_fingerprint
+)
+from . import memo
+from .compression import COMPRESSED_EXTENSIONS, DECOMPRESSION_ERRORS
+from .loader import load_file, loads
+from .pool import PreloadedPool, can_fork
+from .result_cache import ResultCache, file_digest
+from .semantic import VERSION as SEMANTIC_VERSION, iter_semantic_errors
+from .stream import load_streamed
+
+# Extensions of the files validated when a directory is given, also
+# with one of the COMPRESSED_EXTENSIONS appended
+COVJSON_EXTENSIONS = (".covjson", ".json")
+VALIDATED_EXTENSIONS = COVJSON_EXTENSIONS + tuple(
+    extension + compressed
+    for extension in COVJSON_EXTENSIONS for compressed in COMPRESSED_EXTENSIONS
+)
+
+GLOB_CHARS = re.compile(r'[*?[]')
+
+VALID = "Valid"
+INVALID = "Invalid"
+ERROR = "Error"
+
+SCHEMA_ID = "/schemas/coveragejson"
+
+# Validated before forking workers, so that the schemas and lazily created
+# state of the validator are shared by the workers
+WARM_UP_DOCUMENTS = [
+    {"type": "Coverage", "domain": {"type": "Domain", "domainType": domain_type}}
+    for domain_type in ["Grid", "Point", "PointSeries", "Trajectory", "VerticalProfile",
+                        "MultiPoint", "MultiPointSeries", "Section", "Polygon",
+                        "PolygonSeries", "MultiPolygon", "MultiPolygonSeries"]
+] + [{"type": "CoverageCollection", "coverages": []}, {"type": "NdArray"},
+      {"type": "TiledNdArray"}]
+
+# The validator of the current process, see init_worker
+_validator = None
+_stream = False
+_semantic = True
+_loader = "auto"
+_result_cache = None
+
+
+def expand_paths(patterns):
+    ''' Yields the files given by a list of paths, glob patterns (which may
+        contain **) and directories, which are searched recursively for
+        files with one of the VALIDATED_EXTENSIONS '''
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for dirpath, dirnames, filenames in os.walk(pattern):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith(VALIDATED_EXTENSIONS):
+                        yield os.path.join(dirpath, filename)
+        elif GLOB_CHARS.search(pattern):
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    yield path
+        else:
+            yield pattern
+
+
+def get_validator_mode(semantic=True):
+    ''' Describes the validator created by init_worker, for the result cache '''
+
+    mode = f"{SCHEMA_ID} dispatch fast_items jsonschema-{importlib.metadata.version('jsonschema')}"
+    return f"{mode} semantic-{SEMANTIC_VERSION}" if semantic else mode
+
+
+def preload_worker(no_cache=False, stream=False, semantic=True, loader="auto"):
+    ''' Creates the validator used by validate_file, without a result cache.
+        Processes forked afterwards share it. '''
+
+    global _validator, _stream, _semantic, _loader
+    if no_cache:
+        schema_store = create_schema_store()
+    else:
+        schema_store = load_cached_schema_store()
+    _validator = create_custom_validator(SCHEMA_ID, schema_store,
+                                         dispatch=True, fast_items=True, memoize=True)
+    _stream = stream
+    _semantic = semantic
+    _loader = loader
+
+
+def warm_up():
+    ''' Validates the WARM_UP_DOCUMENTS with the validator of preload_worker '''
+
+    for doc in WARM_UP_DOCUMENTS:
+        for _ in _validator.iter_errors(doc):
+            pass
+
+
+def open_result_cache(result_cache=None, semantic=True):
+    ''' Opens the ResultCache database used by validate_file in this
+        process, if a path is given. Connections cannot be shared with
+        forked processes. '''
+
+    global _result_cache
+    _result_cache = None
+    if result_cache is not None:
+        _result_cache = ResultCache(schema_store_fingerprint(), get_validator_mode(semantic),
+                                    result_cache)
+
+
+def init_worker(no_cache=False, stream=False, result_cache=None, semantic=True,
+                loader="auto"):
+    ''' Creates the validator used by validate_file in this process.
+        result_cache is the path of a ResultCache database to use.
+        With semantic, documents valid against the schemas are checked
+        by tools.semantic too. loader is the JSON backend of tools.loader. '''
+
+    preload_worker(no_cache, stream, semantic, loader)
+    open_result_cache(result_cache, semantic)
+
+
+def check_file(path, data=None):
+    ''' Validates a file, or its contents given as bytes.
+        Returns the status and message of validate_file. '''
+
+    try:
+        if _stream:
+            obj = load_streamed(path)
+        elif data is not None:
+            obj = loads(data, _loader)
+        else:
+            obj = load_file(path, _loader)
+        error = next(_validator.iter_errors(obj), None)
+        if error is None and _semantic:
+            error = next(iter_semantic_errors(obj), None)
+    except (ValueError,) + DECOMPRESSION_ERRORS as e:
+        return ERROR, str(e)
+    if error is None:
+        return VALID, None
+    return INVALID, format_error(error)
+
+
+def validate_file(path):
+    ''' Validates a file with the validator created by init_worker.
+        Returns the path, the status (VALID, INVALID or ERROR if the file
+        cannot be read or parsed) and a message describing the problem.
+        With a result cache, files seen before are not parsed again. '''
+
+    if _result_cache is None:
+        return (path,) + check_file(path)
+
+    start = time.perf_counter()
+    try:
+        if _stream:
+            data = None
+            digest = file_digest(path)
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+    except OSError as e:
+        return path, ERROR, str(e)
+    key = _result_cache.key(digest)
+    cached = _result_cache.get(key, start)
+    if cached is not None:
+        return (path,) + cached
+    status, message = check_file(path, data)
+    # Errors are only cached if they are due to the contents
+    if status != ERROR or data is not None:
+        _result_cache.put(key, status, message, time.perf_counter() - start)
+    return path, status, message
+
+
+def validate_file_counting(path):
+    ''' Returns the result of validate_file and the domain memo
+        statistics of the validation '''
+
+    stats_before = memo.get_stats()
+    result = validate_file(path)
+    return result, memo.get_stats_delta(stats_before)
+
+
+def validate_files(paths, workers=None, chunksize=16, no_cache=False, stream=False,
+                   result_cache=None, semantic=True, domain_stats=None, loader="auto",
+                   worker_stats=None):
+    ''' Yields the results of validate_file for all paths, in order as soon
+        as they are available. With workers=1 the files are validated
+        in this process, otherwise by a pool of worker processes
+        (default: the number of CPUs). result_cache is the path of
+        a ResultCache database to use. The domain memo statistics of all
+        processes are added to the dict domain_stats, if given.
+        loader is the JSON backend of tools.loader. The startup time and
+        memory use of the workers of a PreloadedPool are appended to the
+        list worker_stats, if given. '''
+
+    if workers == 1:
+        init_worker(no_cache, stream, result_cache, semantic, loader)
+        results = map(validate_file_counting, paths)
+    elif can_fork():
+        executor = PreloadedPool(
+            workers, warm_up=lambda: (preload_worker(no_cache, stream, semantic, loader),
+                                      warm_up()),
+            initializer=open_result_cache, initargs=(result_cache, semantic))
+        if worker_stats is not None:
+            worker_stats.extend(executor.worker_stats)
+        results = executor.map(validate_file_counting, paths, chunksize=chunksize)
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=init_worker,
+                                       initargs=(no_cache, stream, result_cache, semantic, loader))
+        results = executor.map(validate_file_counting, paths, chunksize=chunksize)
+    try:
+        for result, stats in results:
+            if domain_stats is not None:
+                memo.add_stats(domain_stats, stats)
+            yield result
+    finally:
+        if workers != 1:
+            executor.shutdown(cancel_futures=True)
@@ -0,0 +1,176 @@
+# A tool that builds all published variants of the schema in one go:
+# the native 2020-12 bundle, its draft-07 downgrade, the draft-07 schema
+# without $id (for pre-releases) and draft-07 schemas with the $id of each
+# given version or deployment. The schema files are loaded once and the
+# steps of bundle_schema.py, downgrade_schema_to_draft07.py and
+# patch_schema.py run in memory.
+#
+# Every artifact is keyed by a hash of its inputs: the schema files, the
+# root schema id, the step options and the source of the tools. Artifacts
+# whose key is recorded in the manifest of the output directory are not
+# built again, and artifacts that later steps need are read from disk.
+#
+#   python -m tools.build_schema --out-dir build --set-id 1.0=https://covjson.org/schema/1.0/coveragejson.json
+
+# Note: This tool is specialized to the way schemas are stored and
+# written in this repository and is not intended to be used elsewhere.
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+
+from .bundle_schema import bundle_schema
+from .downgrade_schema_to_draft07 import downgrade_schema_to_draft07
+from .patch_schema import patch_schema
+from .validator import create_schema_store, schema_store_fingerprint
+
+MANIFEST_NAME = "build-manifest.json"
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Source files whose changes affect the artifacts
+TOOL_SOURCES = ["bundle_schema.py", "downgrade_schema_to_draft07.py", "patch_schema.py"]
+
+
+def tools_fingerprint():
+    ''' Returns a hash of the source of the tools used by the build '''
+
+    digest = hashlib.sha256()
+    for name in TOOL_SOURCES:
+        with open(os.path.join(TOOLS_DIR, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def step_key(*inputs):
+    ''' Returns the key of an artifact built from inputs (strings) '''
+
+    return hashlib.sha256("\0".join(inputs).encode("utf-8")).hexdigest()
+
+
+def write_json(path, obj):
+    ''' Writes a JSON file atomically, formatted like the other tools do '''
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class SchemaBuild:
+    ''' Builds the artifacts of a root schema into out_dir. versions maps
+        names to the $id of the versioned artifacts "<stem>-<name>.json". '''
+
+    def __init__(self, out_dir, root="/schemas/coveragejson", versions=None,
+                 schema_dir=None, force=False):
+        self.out_dir = out_dir
+        self.root = root
+        self.versions = versions or {}
+        self.schema_dir = schema_dir
+        self.force = force
+        self.stem = root.rsplit("/", 1)[-1]
+        self._store = None
+        self._built = {}
+        self.manifest = self._read_manifest()
+
+        bundle_key = step_key("bundle", schema_store_fingerprint(schema_dir), root,
+                              tools_fingerprint())
+        draft07_key = step_key("draft-07", bundle_key)
+        # Maps artifact names to their key, input and function
+        self.steps = {
+            "bundle.json": (bundle_key, None, self._bundle),
+            f"{self.stem}.json": (draft07_key, "bundle.json", downgrade_schema_to_draft07),
+            f"{self.stem}-no-id.json": (step_key("drop-id", draft07_key), f"{self.stem}.json",
+                                        lambda schema: patch_schema(schema, drop_id=True)),
+        }
+        for name, schema_id in self.versions.items():
+            self.steps[f"{self.stem}-{name}.json"] = (
+                step_key("set-id", draft07_key, schema_id), f"{self.stem}.json",
+                lambda schema, schema_id=schema_id: patch_schema(schema, set_id=schema_id))
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _bundle(self, _):
+        if self._store is None:
+            self._store = create_schema_store(self.schema_dir)
+        return bundle_schema(self._store, self.root)
+
+    def is_current(self, name):
+        ''' Whether an artifact exists and was built from the same inputs '''
+
+        return not self.force and self.manifest.get(name) == self.steps[name][0] and \
+            os.path.exists(os.path.join(self.out_dir, name))
+
+    def get(self, name):
+        ''' Returns the schema of an artifact, building it if needed '''
+
+        if name not in self._built:
+            if self.is_current(name):
+                with open(os.path.join(self.out_dir, name)) as f:
+                    self._built[name] = json.load(f)
+            else:
+                _, input_name, function = self.steps[name]
+                self._built[name] = function(input_name and self.get(input_name))
+        return self._built[name]
+
+    def run(self):
+        ''' Builds all stale artifacts. Returns the names of the artifacts
+            written and of those skipped. '''
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        written, skipped = [], []
+        for name, (key, _, _) in self.steps.items():
+            if self.is_current(name):
+                skipped.append(name)
+                continue
+            write_json(os.path.join(self.out_dir, name), self.get(name))
+            self.manifest[name] = key
+            # Recorded after every artifact, so that an interrupted
+            # build does not redo the artifacts already written
+            write_json(os.path.join(self.out_dir, MANIFEST_NAME), self.manifest)
+            written.append(name)
+        return written, skipped
+
+
+def parse_versions(values):
+    ''' Parses NAME=ID arguments into a dict '''
+
+    versions = {}
+    for value in values:
+        name, sep, schema_id = value.partition("=")
+        if not sep or not name or not schema_id:
+            raise ValueError(f"Expected NAME=ID, got '{value}'")
+        versions[name] = schema_id
+    return versions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--root', default='/schemas/coveragejson')
+    parser.add_argument('--out-dir', default='build')
+    parser.add_argument('--set-id', action='append', default=[], metavar='NAME=ID',
+                        help='Also build <root>-NAME.json with $id ID, can be repeated')
+    parser.add_argument('--force', action='store_true',
+                        help='Build all artifacts, even if their inputs are unchanged')
+    args = parser.parse_args()
+    try:
+        versions = parse_versions(args.set_id)
+    except ValueError as e:
+        parser.error(str(e))
+
+    written, skipped = SchemaBuild(args.out_dir, args.root, versions, force=args.force).run()
+    for name in written:
+        print(f"Built {os.path.join(args.out_dir, name)}")
+    for name in skipped:
+        print(f"Unchanged {os.path.join(args.out_dir, name)}")
@@ -0,0 +1,197 @@
+# Validates large CoverageCollections by sharding their coverages across
+# a pool of worker processes.
+# The members of the collection are validated once, with an empty
+# "coverages" array. The rules of coverageCollection.json by which the
+# coverages inherit "parameters" and "referencing" from the collection
+# (if/then entries of its "allOf") are evaluated once for the collection,
+# and the "items" schemas they impose are added to the schema every
+# coverage is validated against.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import jsonschema
+
+from . import memo
+from .validator import create_custom_validator
+
+COLLECTION_SCHEMA_ID = "/schemas/coverageCollection"
+
+# Collections with fewer coverages are validated in this process
+MIN_PARALLEL_COVERAGES = 1000
+
+DEFAULT_SHARD_SIZE = 500
+
+TYPE_CHECKER = jsonschema.Draft202012Validator.TYPE_CHECKER
+
+# The coverages and validator of the current process, see init_worker
+_coverages = None
+_item_validator = None
+
+
+def _strip_type_checker(error):
+    # The type checker of errors cannot be pickled
+    error._type_checker = None
+    for suberror in error.context:
+        _strip_type_checker(suberror)
+
+
+def _restore_type_checker(error):
+    error._type_checker = TYPE_CHECKER
+    for suberror in error.context:
+        _restore_type_checker(suberror)
+
+
+def find_reference(schema, schema_id):
+    ''' Returns the schema path (a tuple) of the only subschema of a schema
+        that references schema_id, or None if there is no or more than one.
+        Like in the schema paths of errors, "$ref" is not part of it. '''
+
+    found = []
+    todo = [((), schema)]
+    while todo:
+        path, obj = todo.pop()
+        if isinstance(obj, dict):
+            if obj.get("$ref") == schema_id:
+                found.append(path)
+            todo.extend((path + (key,), value) for key, value in obj.items())
+        elif isinstance(obj, list):
+            todo.extend((path + (index,), value) for index, value in enumerate(obj))
+    return found[0] if len(found) == 1 else None
+
+
+def get_item_schema(collection_schema, collection, validator):
+    ''' Returns the schema every coverage of a collection must be valid
+        against, given the inheritance rules that apply to the collection,
+        and the schema paths within the collection schema of the entries of
+        its "allOf". validator is used to evaluate the conditions of the
+        rules. Returns None if the schema has rules of an unexpected form. '''
+
+    items = [collection_schema["properties"]["coverages"]["items"]]
+    locations = [("properties", "coverages", "items")]
+    for index, entry in enumerate(collection_schema.get("allOf", [])):
+        try:
+            inherited = entry["then"]["properties"]["coverages"]["items"]
+        except (KeyError, TypeError):
+            return None
+        if set(entry) - {"$comment", "if", "then"} or set(entry["then"]) != {"properties"} or \
+                set(entry["then"]["properties"]) != {"coverages"}:
+            return None
+        if validator.evolve(schema=entry["if"]).is_valid(collection):
+            items.append(inherited)
+            locations.append(("allOf", index, "then", "properties", "coverages", "items"))
+    return {"allOf": items}, locations
+
+
+def init_worker(coverages, item_schema, schema_store, dispatch, fast_items, memoize):
+    ''' Creates the validator used by validate_shard in this process.
+        The coverages are inherited from the parent process, not pickled,
+        when the pool forks. '''
+
+    global _coverages, _item_validator
+    _coverages = coverages
+    _item_validator = create_custom_validator(
+        COLLECTION_SCHEMA_ID, schema_store, dispatch, fast_items, memoize
+    ).evolve(schema=item_schema)
+
+
+def validate_shard(bounds):
+    ''' Returns the index and errors of the invalid coverages from
+        start to stop, in order, and the domain memo statistics of the shard '''
+
+    start, stop = bounds
+    stats_before = memo.get_stats()
+    results = []
+    for index in range(start, stop):
+        errors = list(_item_validator.iter_errors(_coverages[index]))
+        if errors:
+            for error in errors:
+                _strip_type_checker(error)
+            results.append((index, errors))
+    return results, memo.get_stats_delta(stats_before)
+
+
+class CollectionValidator:
+    ''' A validator for CoverageJSON documents which validates the coverages
+        of large CoverageCollections in parallel, in shards of shard_size
+        coverages, by workers processes (default: the number of CPUs).
+        Errors are yielded in a deterministic order: those of the members of
+        the collection first, then those of each coverage in order, with
+        paths relative to the document. Other documents are validated by the
+        validator for /schemas/coveragejson. domain_stats sums up the domain
+        memo statistics of all processes (see tools/memo.py). '''
+
+    def __init__(self, schema_store, workers=None, shard_size=DEFAULT_SHARD_SIZE,
+                 dispatch=True, fast_items=True, memoize=True,
+                 min_parallel_coverages=MIN_PARALLEL_COVERAGES):
+        self.schema_store = schema_store
+        self.workers = workers or os.cpu_count()
+        self.shard_size = shard_size
+        self.dispatch = dispatch
+        self.fast_items = fast_items
+        self.memoize = memoize
+        self.min_parallel_coverages = min_parallel_coverages
+        self.domain_stats = dict.fromkeys(memo.get_stats(), 0)
+        self.validator = create_custom_validator(
+            "/schemas/coveragejson", schema_store, dispatch, fast_items, memoize)
+        self.collection_schema = schema_store[COLLECTION_SCHEMA_ID]
+        # Where the root schema refers to the collection schema, as in the
+        # schema paths of the errors of serial validation
+        self.collection_location = find_reference(schema_store["/schemas/coveragejson"],
+                                                  COLLECTION_SCHEMA_ID)
+
+    def _iter_serial_errors(self, instance):
+        stats_before = memo.get_stats()
+        yield from self.validator.iter_errors(instance)
+        memo.add_stats(self.domain_stats, memo.get_stats_delta(stats_before))
+
+    def iter_errors(self, instance):
+        if not isinstance(instance, dict) or instance.get("type") != "CoverageCollection" or \
+                not isinstance(instance.get("coverages"), list) or \
+                len(instance["coverages"]) < self.min_parallel_coverages:
+            yield from self._iter_serial_errors(instance)
+            return
+        item_schema = get_item_schema(self.collection_schema, instance, self.validator)
+        if item_schema is None or self.collection_location is None:
+            yield from self._iter_serial_errors(instance)
+            return
+        item_schema, locations = item_schema
+
+        yield from self._iter_serial_errors(dict(instance, coverages=[]))
+
+        coverages = instance["coverages"]
+        shards = [(start, min(start + self.shard_size, len(coverages)))
+                  for start in range(0, len(coverages), self.shard_size)]
+        initargs = (coverages, item_schema, self.schema_store, self.dispatch, self.fast_items,
+                    self.memoize)
+        if self.workers == 1:
+            init_worker(*initargs)
+            results = map(validate_shard, shards)
+        else:
+            executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                           initargs=initargs)
+            results = executor.map(validate_shard, shards)
+        try:
+            for shard, stats in results:
+                memo.add_stats(self.domain_stats, stats)
+                for index, errors in shard:
+                    for error in errors:
+                        _restore_type_checker(error)
+                        error.path.extendleft([index, "coverages"])
+                        # From the entry of the "allOf" of item_schema to
+                        # the schema it was taken from
+                        _, entry = error.schema_path.popleft(), error.schema_path.popleft()
+                        error.schema_path.extendleft(
+                            reversed(self.collection_location + locations[entry]))
+                        yield error
+        finally:
+            if self.workers != 1:
+                executor.shutdown(cancel_futures=True)
+
+    def is_valid(self, instance):
+        return next(self.iter_errors(instance), None) is None
+
+    def validate(self, instance):
+        error = jsonschema.exceptions.best_match(self.iter_errors(instance))
+        if error is not None:
+            raise error
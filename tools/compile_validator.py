@@ -0,0 +1,902 @@
+# A tool that compiles the schemas into a standalone Python module of
+# straight-line check functions, avoiding the overhead of interpreting the
+# schemas with jsonschema on every validation.
+# The generated validators accept and reject exactly the same documents as
+# the validator created by validator.create_custom_validator and yield the
+# same errors, in the same order and with the same paths.
+
+# Note: This tool is specialized to the keywords used by the schemas in this
+# repository and is not intended to be used elsewhere.
+
+import argparse
+import json
+import marshal
+import os
+import re
+import sys
+import tempfile
+import types
+
+from .validator import create_schema_store, get_cache_dir, prune_cache, \
+    schema_files_signature, schema_store_fingerprint
+
+# Name of the precompiled validator of all schemas in the cache directory,
+# as a marshalled code object, which depends on the version of Python.
+# It is followed by the schema_files_signature of the schemas, which is
+# computed without reading them, and the cache tag of the interpreter.
+PRECOMPILED_PREFIX = "compiled-validator-"
+
+# Keywords that can be compiled. Any other keyword jsonschema knows about
+# is rejected, all remaining keywords are annotations and are ignored.
+SUPPORTED_KEYWORDS = {
+    "$ref", "additionalProperties", "allOf", "anyOf", "const",
+    "dependentSchemas", "enum", "if", "items", "maxItems", "minimum",
+    "minItems", "minProperties", "not", "oneOf", "pattern",
+    "patternProperties", "properties", "required", "type", "uniqueItems",
+}
+UNSUPPORTED_KEYWORDS = {
+    "$dynamicRef", "contains", "dependentRequired", "exclusiveMaximum",
+    "exclusiveMinimum", "format", "maxContains", "maxLength",
+    "maxProperties", "maximum", "minContains", "minLength", "multipleOf",
+    "prefixItems", "propertyNames", "unevaluatedItems",
+    "unevaluatedProperties",
+}
+
+TYPE_CHECKS = {
+    "array": "isinstance({0}, list)",
+    "boolean": "isinstance({0}, bool)",
+    "integer": "_is_integer({0})",
+    "null": "{0} is None",
+    "number": "_is_number({0})",
+    "object": "isinstance({0}, dict)",
+    "string": "isinstance({0}, str)",
+}
+
+# Runtime support shared by all generated check functions.
+# jsonschema is only imported once the first error needs to be reported.
+PRELUDE = '''\
+import numbers
+import re
+from collections import deque
+
+_ValidationError = None
+_TYPE_CHECKER = None
+
+
+def _error(message, validator, validator_value, instance, schema, context=()):
+    global _ValidationError, _TYPE_CHECKER
+    if _ValidationError is None:
+        import jsonschema
+        _ValidationError = jsonschema.exceptions.ValidationError
+        _TYPE_CHECKER = jsonschema.Draft202012Validator.TYPE_CHECKER
+    return _ValidationError(
+        message, validator=validator, validator_value=validator_value,
+        instance=instance, schema=schema, schema_path=(validator,),
+        context=context, type_checker=_TYPE_CHECKER)
+
+
+def _descend(errors, path, schema_path):
+    # schema_path is given in reverse order, ready for extendleft
+    for error in errors:
+        if path is not _NO_PATH:
+            error.path.appendleft(path)
+        error.schema_path.extendleft(schema_path)
+        yield error
+
+
+_NO_PATH = object()
+
+
+def _is_number(instance):
+    cls = type(instance)
+    if cls is int or cls is float:
+        return True
+    return isinstance(instance, numbers.Number) and not isinstance(instance, bool)
+
+
+def _is_integer(instance):
+    cls = type(instance)
+    if cls is int:
+        return True
+    if isinstance(instance, float):
+        return instance.is_integer()
+    return isinstance(instance, int) and not isinstance(instance, bool)
+
+
+def _unbool(element, true=object(), false=object()):
+    if element is True:
+        return true
+    elif element is False:
+        return false
+    return element
+
+
+def _equal(one, two):
+    if one is two:
+        return True
+    if isinstance(one, str) or isinstance(two, str):
+        return one == two
+    if isinstance(one, (list, tuple)) and isinstance(two, (list, tuple)):
+        return len(one) == len(two) and all(_equal(i, j) for i, j in zip(one, two))
+    if isinstance(one, dict) and isinstance(two, dict):
+        return len(one) == len(two) and all(
+            key in two and _equal(value, two[key]) for key, value in one.items())
+    return _unbool(one) == _unbool(two)
+
+
+_SCALAR_TYPES = frozenset([int, float, str, type(None)])
+
+
+def _canonical(value, true=object(), false=object()):
+    # A hashable form of a JSON value, see tools/unique_items.py
+    if isinstance(value, list):
+        if _SCALAR_TYPES.issuperset(map(type, value)):
+            return tuple(value)
+        return tuple(map(_canonical, value))
+    if isinstance(value, bool):
+        return true if value else false
+    if isinstance(value, dict):
+        return frozenset((key, _canonical(item)) for key, item in value.items())
+    return value
+
+
+def _uniq(container):
+    seen = set()
+    for item in map(_canonical, container):
+        if item in seen:
+            return False
+        seen.add(item)
+    return True
+
+
+class Validator:
+    \'\'\' A validator for one schema id, mirroring the jsonschema validator API \'\'\'
+
+    def __init__(self, schema_id):
+        self.schema_id = schema_id
+        self.schema = SCHEMAS[schema_id]
+        self._is_valid, self._iter_errors = VALIDATORS[schema_id]
+
+    def is_valid(self, instance):
+        return self._is_valid(instance)
+
+    def iter_errors(self, instance):
+        if self._is_valid(instance):
+            return iter(())
+        return self._iter_errors(instance)
+
+    def validate(self, instance):
+        for error in self.iter_errors(instance):
+            raise error
+'''
+
+
+def schema_store_from_bundle(bundle):
+    ''' Recovers a schema store from a schema created by bundle_schema '''
+
+    schema_store = {bundle["$id"]: bundle}
+    for schema in bundle.get("$defs", {}).values():
+        if "$id" in schema:
+            schema_store[schema["$id"]] = schema
+    return schema_store
+
+
+class _Writer:
+    ''' Accumulates indented lines of source code '''
+
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+
+    def __call__(self, line=""):
+        self.lines.append("    " * self.level + line if line else "")
+
+    def indent(self):
+        writer = self
+
+        class Block:
+            def __enter__(self):
+                writer.level += 1
+
+            def __exit__(self, *exc):
+                writer.level -= 1
+
+        return Block()
+
+
+class SchemaCompiler:
+    ''' Generates the source code of check functions for a schema store '''
+
+    def __init__(self, schema_store):
+        self.schema_store = schema_store
+        # Every schema node gets a number, its Python expression within
+        # SCHEMAS and a pair of check functions
+        self.nodes = []
+        self.node_numbers = {}
+        self.node_exprs = {}
+        self.root_names = {}
+        self.constants = []
+        self.out = _Writer()
+
+    def root_name(self, schema_id):
+        if schema_id not in self.root_names:
+            name = re.sub(r"\W", "_", schema_id.rsplit("/", 1)[-1])
+            self.root_names[schema_id] = name
+        return self.root_names[schema_id]
+
+    def constant(self, expr):
+        name = f"_C{len(self.constants)}"
+        self.constants.append((name, expr))
+        return name
+
+    def add_node(self, schema, expr):
+        if id(schema) in self.node_numbers:
+            return self.node_numbers[id(schema)]
+        number = len(self.nodes)
+        self.nodes.append(schema)
+        self.node_numbers[id(schema)] = number
+        self.node_exprs[number] = expr
+        if isinstance(schema, dict):
+            self.add_subschemas(schema, expr)
+        return number
+
+    def add_subschemas(self, schema, expr):
+        for keyword, value in schema.items():
+            if keyword in UNSUPPORTED_KEYWORDS:
+                raise NotImplementedError(
+                    f"Keyword '{keyword}' is not supported ({expr})")
+            sub_expr = f"{expr}[{keyword!r}]"
+            if keyword in ("properties", "patternProperties", "dependentSchemas"):
+                for name, subschema in value.items():
+                    self.add_node(subschema, f"{sub_expr}[{name!r}]")
+            elif keyword in ("allOf", "anyOf", "oneOf"):
+                for index, subschema in enumerate(value):
+                    self.add_node(subschema, f"{sub_expr}[{index}]")
+            elif keyword in ("not", "if", "then", "else", "items") or \
+                    keyword == "additionalProperties" and isinstance(value, dict):
+                self.add_node(value, sub_expr)
+            elif keyword == "$ref" and value not in self.schema_store:
+                raise NotImplementedError(
+                    f"Only references to schema ids are supported ({expr})")
+
+    def is_root(self, schema):
+        return isinstance(schema, dict) and \
+            self.schema_store.get(schema.get("$id")) is schema
+
+    def valid_name(self, schema):
+        if self.is_root(schema):
+            return f"is_valid_{self.root_name(schema['$id'])}"
+        return f"_is_valid_{self.node_numbers[id(schema)]}"
+
+    def errors_name(self, schema):
+        if self.is_root(schema):
+            return f"iter_errors_{self.root_name(schema['$id'])}"
+        return f"_iter_errors_{self.node_numbers[id(schema)]}"
+
+    def node_name(self, schema):
+        return f"_N{self.node_numbers[id(schema)]}"
+
+    def ref_target(self, ref):
+        return self.schema_store[ref]
+
+    # Validity checks, returning a boolean as early as possible
+
+    def simple_check(self, schema, var):
+        ''' Returns an expression checking a schema without applicators,
+            or None if the schema has applicators '''
+
+        if schema is True:
+            return "True"
+        if schema is False:
+            return "False"
+        checks = []
+        for keyword, value in schema.items():
+            if keyword not in SUPPORTED_KEYWORDS:
+                continue
+            if keyword == "$ref":
+                check = f"{self.valid_name(self.ref_target(value))}({var})"
+            else:
+                check = self.keyword_check(keyword, value, schema, var)
+            if check is None:
+                return None
+            if check != "True":
+                checks.append(f"({check})")
+        return " and ".join(checks) if checks else "True"
+
+    def check(self, schema, var):
+        ''' Returns an expression checking a schema '''
+
+        check = self.simple_check(schema, var)
+        if check is None or len(check) > 200:
+            return f"{self.valid_name(schema)}({var})"
+        return check
+
+    def type_check(self, types, var):
+        if isinstance(types, str):
+            types = [types]
+        return " or ".join(TYPE_CHECKS[t].format(var) for t in types)
+
+    def equal_check(self, value, var):
+        if isinstance(value, str):
+            return f"{var} == {value!r}"
+        return f"_equal({var}, {self.constant(repr(value))})"
+
+    def keyword_check(self, keyword, value, schema, var):
+        ''' Returns an expression checking a leaf keyword,
+            or None if the keyword is an applicator '''
+
+        if keyword == "type":
+            return self.type_check(value, var)
+        elif keyword == "const":
+            return self.equal_check(value, var)
+        elif keyword == "enum":
+            if all(isinstance(each, str) for each in value):
+                values = self.constant(f"frozenset({value!r})")
+                return f"isinstance({var}, str) and {var} in {values}"
+            return " or ".join(self.equal_check(each, var) for each in value) or "False"
+        elif keyword == "required":
+            if not value:
+                return "True"
+            present = " and ".join(f"{name!r} in {var}" for name in value)
+            return f"not isinstance({var}, dict) or ({present})"
+        elif keyword == "minItems":
+            return f"not isinstance({var}, list) or len({var}) >= {value!r}"
+        elif keyword == "maxItems":
+            return f"not isinstance({var}, list) or len({var}) <= {value!r}"
+        elif keyword == "minProperties":
+            return f"not isinstance({var}, dict) or len({var}) >= {value!r}"
+        elif keyword == "minimum":
+            return f"not _is_number({var}) or not ({var} < {value!r})"
+        elif keyword == "pattern":
+            regex = self.constant(f"re.compile({value!r})")
+            return f"not isinstance({var}, str) or {regex}.search({var}) is not None"
+        elif keyword == "uniqueItems":
+            if not value:
+                return "True"
+            return f"not isinstance({var}, list) or _uniq({var})"
+        return None
+
+    def write_valid_function(self, schema):
+        out = self.out
+        out(f"def {self.valid_name(schema)}(instance):")
+        with out.indent():
+            if not isinstance(schema, dict):
+                out(f"return {schema!r}")
+                return
+            for keyword, value in schema.items():
+                if keyword not in SUPPORTED_KEYWORDS:
+                    continue
+                check = self.keyword_check(keyword, value, schema, "instance")
+                if check is not None:
+                    if check != "True":
+                        out(f"if not ({check}):")
+                        with out.indent():
+                            out("return False")
+                    continue
+                self.write_applicator_check(keyword, value, schema)
+            out("return True")
+
+    def write_applicator_check(self, keyword, value, schema):
+        out = self.out
+        if keyword == "properties":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for name, subschema in value.items():
+                    check = self.check(subschema, f"instance[{name!r}]")
+                    if check != "True":
+                        out(f"if {name!r} in instance and not ({check}):")
+                        with out.indent():
+                            out("return False")
+                out("pass")
+        elif keyword == "patternProperties":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for pattern, subschema in value.items():
+                    regex = self.constant(f"re.compile({pattern!r})")
+                    check = self.check(subschema, "v")
+                    out("for k, v in instance.items():")
+                    with out.indent():
+                        out(f"if {regex}.search(k) and not ({check}):")
+                        with out.indent():
+                            out("return False")
+        elif keyword == "additionalProperties":
+            if value is True or value == {}:
+                return
+            extras = self.extras_expr(schema)
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                if value is False:
+                    out(f"if any({extras}):")
+                    with out.indent():
+                        out("return False")
+                else:
+                    check = self.check(value, "instance[k]")
+                    out(f"for k in ({extras}):")
+                    with out.indent():
+                        out(f"if not ({check}):")
+                        with out.indent():
+                            out("return False")
+        elif keyword == "items":
+            out("if isinstance(instance, list):")
+            with out.indent():
+                if value is False:
+                    out("if instance:")
+                    with out.indent():
+                        out("return False")
+                else:
+                    check = self.check(value, "v")
+                    if check != "True":
+                        out("for v in instance:")
+                        with out.indent():
+                            out(f"if not ({check}):")
+                            with out.indent():
+                                out("return False")
+                    out("pass")
+        elif keyword == "allOf":
+            for subschema in value:
+                out(f"if not ({self.check(subschema, 'instance')}):")
+                with out.indent():
+                    out("return False")
+        elif keyword == "anyOf":
+            checks = " or ".join(f"({self.check(s, 'instance')})" for s in value)
+            out(f"if not ({checks}):")
+            with out.indent():
+                out("return False")
+        elif keyword == "oneOf":
+            checks = ", ".join(f"({self.check(s, 'instance')})" for s in value)
+            out(f"if sum(({checks},)) != 1:")
+            with out.indent():
+                out("return False")
+        elif keyword == "not":
+            out(f"if {self.check(value, 'instance')}:")
+            with out.indent():
+                out("return False")
+        elif keyword == "if":
+            then = schema.get("then")
+            else_ = schema.get("else")
+            if then is None and else_ is None:
+                return
+            out(f"if {self.check(value, 'instance')}:")
+            with out.indent():
+                if then is not None:
+                    out(f"if not ({self.check(then, 'instance')}):")
+                    with out.indent():
+                        out("return False")
+                out("pass")
+            if else_ is not None:
+                out(f"elif not ({self.check(else_, 'instance')}):")
+                with out.indent():
+                    out("return False")
+        elif keyword == "dependentSchemas":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for name, subschema in value.items():
+                    out(f"if {name!r} in instance and not "
+                        f"({self.check(subschema, 'instance')}):")
+                    with out.indent():
+                        out("return False")
+                out("pass")
+        elif keyword == "$ref":
+            target = self.ref_target(value)
+            out(f"if not {self.valid_name(target)}(instance):")
+            with out.indent():
+                out("return False")
+        else:
+            raise NotImplementedError(f"Keyword '{keyword}' is not supported")
+
+    def extras_expr(self, schema):
+        ''' Returns a generator expression over the additional properties '''
+
+        properties = self.constant(repr(frozenset(schema.get("properties", {}))))
+        patterns = "|".join(schema.get("patternProperties", {}))
+        if patterns:
+            regex = self.constant(f"re.compile({patterns!r})")
+            return (f"k for k in instance if k not in {properties} "
+                    f"and not {regex}.search(k)")
+        return f"k for k in instance if k not in {properties}"
+
+    # Error generators, mirroring the keyword implementations of jsonschema
+
+    def write_errors_function(self, schema):
+        out = self.out
+        node = self.node_name(schema)
+        out(f"def {self.errors_name(schema)}(instance):")
+        with out.indent():
+            if schema is True:
+                out("return")
+                out("yield")
+                return
+            if schema is False:
+                out("error = _error(f'False schema does not allow {instance!r}', "
+                    f"None, None, instance, {node})")
+                out("error.schema_path.clear()")
+                out("yield error")
+                return
+            for keyword, value in schema.items():
+                if keyword not in SUPPORTED_KEYWORDS:
+                    continue
+                self.write_keyword_errors(keyword, value, schema, node)
+            out("return")
+            out("yield")
+
+    def error(self, message, keyword, node, context="()"):
+        return (f"_error({message}, {keyword!r}, {node}[{keyword!r}], "
+                f"instance, {node}, {context})")
+
+    def descend(self, subschema, var, path, schema_path):
+        ''' Returns an expression yielding the errors of a subschema '''
+        reverse = tuple(reversed(schema_path))
+        return (f"_descend({self.errors_name(subschema)}({var}), "
+                f"{path}, {reverse!r})")
+
+    def write_child_errors(self, subschema, var, path, schema_path):
+        out = self.out
+        check = self.check(subschema, var)
+        if check == "True":
+            return
+        out(f"if not ({check}):")
+        with out.indent():
+            out(f"yield from {self.descend(subschema, var, path, schema_path)}")
+
+    def write_keyword_errors(self, keyword, value, schema, node):
+        out = self.out
+        check = self.keyword_check(keyword, value, schema, "instance")
+        if check is not None:
+            if check == "True":
+                return
+            out(f"if not ({check}):")
+            with out.indent():
+                self.write_leaf_error(keyword, value, schema, node)
+            return
+
+        if keyword == "properties":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for name, subschema in value.items():
+                    out(f"if {name!r} in instance:")
+                    with out.indent():
+                        self.write_child_errors(
+                            subschema, f"instance[{name!r}]", repr(name),
+                            [keyword, name])
+                        out("pass")
+        elif keyword == "patternProperties":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for pattern, subschema in value.items():
+                    regex = self.constant(f"re.compile({pattern!r})")
+                    out("for k, v in instance.items():")
+                    with out.indent():
+                        out(f"if {regex}.search(k):")
+                        with out.indent():
+                            self.write_child_errors(
+                                subschema, "v", "k", [keyword, pattern])
+                            out("pass")
+        elif keyword == "additionalProperties":
+            if value is True or value == {}:
+                return
+            extras = self.extras_expr(schema)
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                out(f"extras = set({extras})")
+                if value is False:
+                    out("if extras:")
+                    with out.indent():
+                        if schema.get("patternProperties"):
+                            patterns = ", ".join(
+                                repr(each) for each in sorted(schema["patternProperties"]))
+                            out("verb = 'does' if len(extras) == 1 else 'do'")
+                            out("joined = ', '.join(repr(each) for each in sorted(extras))")
+                            message = f"f'{{joined}} {{verb}} not match any of the regexes: ' + {patterns!r}"
+                        else:
+                            out("verb = 'was' if len(extras) == 1 else 'were'")
+                            out("joined = ', '.join(repr(extra) for extra in sorted(extras, key=str))")
+                            message = "f'Additional properties are not allowed ({joined} {verb} unexpected)'"
+                        out(f"yield {self.error(message, keyword, node)}")
+                else:
+                    out("for k in extras:")
+                    with out.indent():
+                        self.write_child_errors(value, "instance[k]", "k", [keyword])
+                        out("pass")
+        elif keyword == "items":
+            out("if isinstance(instance, list):")
+            with out.indent():
+                if value is False:
+                    out("if instance:")
+                    with out.indent():
+                        out("extra = len(instance)")
+                        out("rest = instance if extra != 1 else instance[0]")
+                        message = "f'Expected at most 0 items but found {extra} extra: {rest!r}'"
+                        out(f"yield {self.error(message, keyword, node)}")
+                else:
+                    out("for index, v in enumerate(instance):")
+                    with out.indent():
+                        self.write_child_errors(value, "v", "index", [keyword])
+                        out("pass")
+        elif keyword == "allOf":
+            for index, subschema in enumerate(value):
+                self.write_child_errors(subschema, "instance", "_NO_PATH", [keyword, index])
+        elif keyword in ("anyOf", "oneOf"):
+            out("all_errors = []")
+            out("first_valid = None")
+            # Subschemas are only evaluated until the first valid one
+            level = out.level
+            for index, subschema in enumerate(value):
+                out(f"if {self.check(subschema, 'instance')}:")
+                with out.indent():
+                    out(f"first_valid = {index}")
+                out("else:")
+                out.level += 1
+                out(f"all_errors.extend({self.descend(subschema, 'instance', '_NO_PATH', [index])})")
+            out.level = level
+            out("if first_valid is None:")
+            with out.indent():
+                message = "f'{instance!r} is not valid under any of the given schemas'"
+                out(f"yield {self.error(message, keyword, node, 'all_errors')}")
+            if keyword == "oneOf":
+                out("else:")
+                with out.indent():
+                    checks = ", ".join(f"({self.check(s, 'instance')})" for s in value)
+                    out(f"valid = ({checks},)")
+                    out(f"more_valid = [each for index, each in enumerate({node}[{keyword!r}]) "
+                        "if index > first_valid and valid[index]]")
+                    out("if more_valid:")
+                    with out.indent():
+                        out(f"more_valid.append({node}[{keyword!r}][first_valid])")
+                        out("reprs = ', '.join(repr(schema) for schema in more_valid)")
+                        message = "f'{instance!r} is valid under each of {reprs}'"
+                        out(f"yield {self.error(message, keyword, node)}")
+        elif keyword == "not":
+            out(f"if {self.check(value, 'instance')}:")
+            with out.indent():
+                message = 'f"{instance!r} should not be valid under {' + \
+                    f"{node}[{keyword!r}]" + '!r}"'
+                out(f"yield {self.error(message, keyword, node)}")
+        elif keyword == "if":
+            then = schema.get("then")
+            else_ = schema.get("else")
+            if then is None and else_ is None:
+                return
+            out(f"if {self.check(value, 'instance')}:")
+            with out.indent():
+                if then is not None:
+                    self.write_child_errors(then, "instance", "_NO_PATH", ["then"])
+                out("pass")
+            if else_ is not None:
+                out("else:")
+                with out.indent():
+                    self.write_child_errors(else_, "instance", "_NO_PATH", ["else"])
+                    out("pass")
+        elif keyword == "dependentSchemas":
+            out("if isinstance(instance, dict):")
+            with out.indent():
+                for name, subschema in value.items():
+                    out(f"if {name!r} in instance:")
+                    with out.indent():
+                        self.write_child_errors(
+                            subschema, "instance", "_NO_PATH", [keyword, name])
+                        out("pass")
+        elif keyword == "$ref":
+            target = self.ref_target(value)
+            out(f"if not {self.valid_name(target)}(instance):")
+            with out.indent():
+                out(f"yield from {self.errors_name(target)}(instance)")
+        else:
+            raise NotImplementedError(f"Keyword '{keyword}' is not supported")
+
+    def write_leaf_error(self, keyword, value, schema, node):
+        out = self.out
+        if keyword == "type":
+            types = [value] if isinstance(value, str) else value
+            reprs = ", ".join(repr(t) for t in types)
+            message = f"f'{{instance!r}} is not of type ' + {reprs!r}"
+        elif keyword == "const":
+            message = repr(f"{value!r} was expected")
+        elif keyword == "enum":
+            message = f"f'{{instance!r}} is not one of ' + {repr(value)!r}"
+        elif keyword == "required":
+            out(f"for property in {node}[{keyword!r}]:")
+            with out.indent():
+                out("if property not in instance:")
+                with out.indent():
+                    message = "f'{property!r} is a required property'"
+                    out(f"yield {self.error(message, keyword, node)}")
+            return
+        elif keyword == "minItems":
+            text = "should be non-empty" if value == 1 else "is too short"
+            message = f"f'{{instance!r}} {text}'"
+        elif keyword == "maxItems":
+            text = "is expected to be empty" if value == 0 else "is too long"
+            message = f"f'{{instance!r}} {text}'"
+        elif keyword == "minProperties":
+            text = "should be non-empty" if value == 1 else "does not have enough properties"
+            message = f"f'{{instance!r}} {text}'"
+        elif keyword == "minimum":
+            message = f"f'{{instance!r}} is less than the minimum of ' + {repr(value)!r}"
+        elif keyword == "pattern":
+            message = f"f'{{instance!r}} does not match ' + {repr(value)!r}"
+        elif keyword == "uniqueItems":
+            message = "f'{instance!r} has non-unique elements'"
+        else:
+            raise NotImplementedError(f"Keyword '{keyword}' is not supported")
+        out(f"yield {self.error(message, keyword, node)}")
+
+    def compile(self, schema_ids, fingerprint=None):
+        ''' Returns the source code of a module validating the given schema ids '''
+
+        # Collect all schemas reachable from the requested ids
+        todo = list(schema_ids)
+        done = set()
+        while todo:
+            schema_id = todo.pop()
+            if schema_id in done:
+                continue
+            done.add(schema_id)
+            self.add_node(self.schema_store[schema_id],
+                          f"SCHEMAS[{schema_id!r}]")
+            for schema in self.nodes:
+                if isinstance(schema, dict) and "$ref" in schema:
+                    if schema["$ref"] not in done:
+                        todo.append(schema["$ref"])
+
+        out = self.out
+        for schema in self.nodes:
+            self.write_valid_function(schema)
+            out()
+            out()
+            self.write_errors_function(schema)
+            out()
+            out()
+        body = self.out.lines
+
+        self.out = out = _Writer()
+        out("# Generated by tools.compile_validator. Do not edit.")
+        if fingerprint is not None:
+            out(f"# Schema store fingerprint: {fingerprint}")
+        out()
+        out(PRELUDE)
+        out()
+        out(f"FINGERPRINT = {fingerprint!r}")
+        out()
+        store = {schema_id: self.schema_store[schema_id] for schema_id in sorted(done)}
+        out(f"SCHEMAS = {store!r}")
+        out()
+        for number, expr in self.node_exprs.items():
+            out(f"_N{number} = {expr}")
+        for name, expr in self.constants:
+            out(f"{name} = {expr}")
+        out()
+        out()
+        out.lines.extend(body)
+        out("VALIDATORS = {")
+        with out.indent():
+            for schema_id in sorted(done):
+                name = self.root_name(schema_id)
+                out(f"{schema_id!r}: (is_valid_{name}, iter_errors_{name}),")
+        out("}")
+        return "\n".join(out.lines) + "\n"
+
+
+def compile_schema_store(schema_store, schema_ids=None, fingerprint=None):
+    ''' Returns the source code of a module with check functions
+        for the given schema ids (default: all schemas in the store) '''
+
+    if schema_ids is None:
+        schema_ids = sorted(schema_store)
+    return SchemaCompiler(schema_store).compile(schema_ids, fingerprint)
+
+
+def load_compiled_module(source, name="covjson_compiled_validator"):
+    ''' Executes generated source code and returns it as a module '''
+
+    module = types.ModuleType(name)
+    exec(compile(source, f"<{name}>", "exec"), module.__dict__)
+    return module
+
+
+def get_precompiled_path(signature, cache_dir=None):
+    ''' Returns the path of the precompiled validator of the schemas with
+        the given signature (see validator.schema_files_signature) in the
+        cache directory '''
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    return os.path.join(
+        cache_dir, f"{PRECOMPILED_PREFIX}{signature}.{sys.implementation.cache_tag}.marshal")
+
+
+def write_precompiled_module(schema_dir=None, cache_dir=None):
+    ''' Compiles all schemas into the precompiled validator read by
+        load_precompiled_module, and returns its path. Precompiled
+        validators of other schemas or interpreters are removed once they
+        were not used for validator.CACHE_MAX_AGE seconds. '''
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+    signature = schema_files_signature(schema_dir)
+    fingerprint = schema_store_fingerprint(schema_dir)
+    source = compile_schema_store(create_schema_store(schema_dir), fingerprint=fingerprint)
+    code = compile(source, "<covjson_compiled_validator>", "exec")
+    path = get_precompiled_path(signature, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            marshal.dump(code, f)
+        os.replace(tmp_path, path)
+    finally:
+        # Left behind if writing or replacing failed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    prune_cache(cache_dir, PRECOMPILED_PREFIX, path)
+    return path
+
+
+def load_precompiled_module(schema_dir=None, cache_dir=None):
+    ''' Returns the module of the precompiled validator of the current
+        schemas, or None if there is none (see write_precompiled_module) '''
+
+    path = get_precompiled_path(schema_files_signature(schema_dir), cache_dir)
+    try:
+        with open(path, "rb") as f:
+            code = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    try:
+        # Marks the validator as used for validator.prune_cache
+        os.utime(path)
+    except OSError:
+        pass
+    module = types.ModuleType("covjson_compiled_validator")
+    exec(code, module.__dict__)
+    return module
+
+
+_COMPILED_MODULES = {}
+
+
+def create_compiled_validator(schema_id, schema_store=None):
+    ''' Creates a compiled validator for a schema id, compiling the store
+        on first use '''
+
+    if schema_store is None:
+        schema_store = create_schema_store()
+    key = id(schema_store)
+    cached = _COMPILED_MODULES.get(key)
+    if cached is None or cached[0] is not schema_store:
+        module = load_compiled_module(compile_schema_store(schema_store))
+        cached = _COMPILED_MODULES[key] = (schema_store, module)
+    return cached[1].Validator(schema_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bundle', help='Compile a schema created by '
+                        'bundle_schema instead of the schemas directory')
+    parser.add_argument('--root', action='append', dest='roots',
+                        help='Schema id to compile (default: all), can be repeated')
+    parser.add_argument('--out', help='Output file (default: stdout)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Write the validator of all schemas to the cache directory, '
+                             'where the command line of tools.validator finds it')
+    args = parser.parse_args()
+    if args.cache:
+        if args.bundle or args.roots or args.out:
+            parser.error('--cache cannot be combined with --bundle, --root or --out')
+        print(f"Wrote {write_precompiled_module()}")
+        sys.exit()
+
+    if args.bundle:
+        with open(args.bundle) as f:
+            store = schema_store_from_bundle(json.load(f))
+        fingerprint = None
+    else:
+        store = create_schema_store()
+        fingerprint = schema_store_fingerprint()
+
+    source = compile_schema_store(store, args.roots, fingerprint)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
@@ -0,0 +1,75 @@
+# Detects gzip, bzip2 and xz compressed documents by their magic bytes,
+# whatever their file name, and decompresses them while they are read,
+# without writing the uncompressed document anywhere
+
+import bz2
+import gzip
+import io
+import lzma
+
+# Maps the magic bytes at the start of compressed data to the format
+MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+
+MAGIC_LENGTH = max(map(len, MAGIC_NUMBERS))
+
+# Errors of reading corrupt or truncated compressed data
+DECOMPRESSION_ERRORS = (OSError, EOFError, lzma.LZMAError)
+
+# File name extensions of compressed documents
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".xz")
+
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+_DECOMPRESSORS = {"gzip": gzip.decompress, "bz2": bz2.decompress, "xz": lzma.decompress}
+
+
+def detect_compression(head):
+    ''' Returns the compression format of data starting with the bytes
+        head, or None if it is not compressed '''
+
+    for magic, compression in MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def get_file_compression(path):
+    ''' Returns the compression format of a file, or None '''
+
+    with open(path, "rb") as f:
+        return detect_compression(f.read(MAGIC_LENGTH))
+
+
+def open_file(path):
+    ''' Opens a file for reading its decompressed contents, as a binary
+        file object. Seeking decompresses the file up to the position,
+        from its start when seeking backwards. '''
+
+    compression = get_file_compression(path)
+    if compression is None:
+        return open(path, "rb")
+    return _OPENERS[compression](path, "rb")
+
+
+def open_stream(stream):
+    ''' Wraps a readable binary stream, e.g. an HTTP response, in a binary
+        file object which decompresses it if it is compressed '''
+
+    if not hasattr(stream, "peek"):
+        stream = io.BufferedReader(stream)
+    compression = detect_compression(stream.peek(MAGIC_LENGTH)[:MAGIC_LENGTH])
+    if compression is None:
+        return stream
+    return _OPENERS[compression](stream, "rb")
+
+
+def decompress(data):
+    ''' Returns the decompressed bytes of data, or data if it is not compressed '''
+
+    compression = detect_compression(bytes(data[:MAGIC_LENGTH]))
+    if compression is None:
+        return data
+    return _DECOMPRESSORS[compression](data)
@@ -0,0 +1,287 @@
+# A background process validating the documents of command line calls
+# (python -m tools.validator --daemon FILE), so that every call only pays
+# for starting a small client and for the validation itself. The first call
+# starts the daemon, which listens on a Unix socket in a directory of the
+# user, keeps its validator warm and exits after an idle timeout.
+#
+# Requests and responses are single lines of JSON, one of each per
+# connection: the client sends the absolute path of the document and the
+# daemon reads the file itself and answers with the status and messages.
+# The name of the socket contains the fingerprint of the schemas, so that
+# a daemon of changed schemas is not used (and exits once idle).
+#
+# Only the client functions are used by the command line before it
+# decides how to validate, so this module imports nothing else up front.
+
+import json
+import os
+import socket
+import sys
+import time
+
+# Environment variable overriding the directory of the sockets
+DAEMON_DIR_ENV = "COVJSON_VALIDATOR_DAEMON_DIR"
+
+# Seconds without requests after which the daemon exits
+DEFAULT_IDLE_TIMEOUT = 600
+
+# Seconds a client waits for a daemon it started to listen
+SPAWN_TIMEOUT = 30
+
+SCHEMA_ID = "/schemas/coveragejson"
+
+VALID = "Valid"
+INVALID = "Invalid"
+ERROR = "Error"
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class DaemonError(Exception):
+    ''' A daemon is listening but did not answer a request properly '''
+
+
+def get_daemon_dir():
+    ''' Returns the directory of the sockets of the daemons of this user,
+        which only the user can access, creating it if needed. Raises
+        OSError if it belongs to another user or there are no Unix
+        sockets. '''
+
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("Unix sockets are not supported")
+    daemon_dir = os.environ.get(DAEMON_DIR_ENV)
+    if not daemon_dir:
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir:
+            daemon_dir = os.path.join(runtime_dir, "covjson-validator")
+        else:
+            import tempfile
+            daemon_dir = os.path.join(tempfile.gettempdir(),
+                                      f"covjson-validator-{os.getuid()}")
+    os.makedirs(daemon_dir, mode=0o700, exist_ok=True)
+    if os.stat(daemon_dir).st_uid != os.getuid():
+        raise OSError(f"{daemon_dir} belongs to another user")
+    return daemon_dir
+
+
+def get_socket_path(fingerprint):
+    ''' Returns the socket of the daemon of the schemas with a fingerprint
+        (see validator.schema_store_fingerprint) '''
+
+    return os.path.join(get_daemon_dir(), f"daemon-{fingerprint[:16]}.sock")
+
+
+def send_request(socket_path, request):
+    ''' Sends a request to the daemon listening on socket_path and returns
+        its response, or None if there is no daemon. Raises DaemonError if
+        the daemon did not answer or answered with an error. '''
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return None
+        try:
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as f:
+                line = f.readline()
+        except OSError as e:
+            raise DaemonError(f"the daemon did not answer: {e}") from e
+    if not line:
+        # E.g. the daemon exited while answering
+        raise DaemonError("the daemon did not answer")
+    try:
+        response = json.loads(line)
+    except ValueError as e:
+        raise DaemonError(f"the daemon answered with invalid JSON: {e}") from e
+    if not isinstance(response, dict):
+        raise DaemonError("the daemon answered with invalid JSON: not an object")
+    if "error" in response:
+        raise DaemonError(f"the daemon answered with an error: {response['error']}")
+    return response
+
+
+def spawn_daemon(socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    ''' Starts a daemon listening on socket_path in the background and
+        waits for it to listen. Returns whether it does. '''
+
+    import subprocess
+    with open(socket_path + ".log", "ab") as log:
+        subprocess.Popen(
+            [sys.executable, "-m", "tools.daemon", "--socket", socket_path,
+             "--idle-timeout", str(idle_timeout)],
+            cwd=os.path.dirname(TOOLS_DIR), stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+            start_new_session=True)
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while time.monotonic() < deadline:
+        if send_request(socket_path, {"ping": True}) is not None:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def run_client(socket_path, path, semantic=True, loader="auto",
+               idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    ''' Validates a file with the daemon listening on socket_path, starting
+        it if needed, and prints the verdict like the command line does.
+        Returns the exit status of the command line, or None if no daemon
+        could be started. Raises DaemonError if a daemon is listening but
+        did not answer properly, which is not restarted then. '''
+
+    request = {"path": os.path.abspath(path), "semantic": semantic, "loader": loader}
+    response = send_request(socket_path, request)
+    if response is None:
+        if not spawn_daemon(socket_path, idle_timeout):
+            return None
+        response = send_request(socket_path, request)
+        if response is None:
+            raise DaemonError("the daemon stopped listening")
+
+    status, messages = response.get("status"), response.get("messages")
+    if status not in (VALID, INVALID, ERROR) or not isinstance(messages, list):
+        raise DaemonError(f"the daemon answered with an invalid response: {response!r}")
+    if status == VALID:
+        print("Valid!")
+        return 0
+    if status == INVALID:
+        for message in messages:
+            print("Invalid: " + message)
+    else:
+        for message in messages:
+            print("Error: " + message, file=sys.stderr)
+    return 1
+
+
+def create_daemon_validator():
+    ''' Returns the precompiled validator of the current schemas (see
+        compile_validator.write_precompiled_module) or compiles one '''
+
+    from .compile_validator import create_compiled_validator, load_precompiled_module
+    from .validator import load_cached_schema_store
+
+    module = load_precompiled_module()
+    if module is not None:
+        return module.Validator(SCHEMA_ID)
+    schema_store = load_cached_schema_store()
+    return create_compiled_validator(SCHEMA_ID, schema_store)
+
+
+def check_path(validator, path, semantic=True, loader="auto"):
+    ''' Validates a file like the command line does. Returns the status
+        (VALID, INVALID or ERROR if the file cannot be read or parsed, or
+        the validation failed) and the messages describing the problems. '''
+
+    from .compression import DECOMPRESSION_ERRORS
+    from .loader import load_file
+    from .semantic import iter_semantic_errors
+    from .validator import check_document_type, find_best_error, format_error
+
+    try:
+        obj = load_file(path, loader)
+        message = check_document_type(obj)
+        if message is not None:
+            return INVALID, [message]
+        error = find_best_error(validator, obj)
+        if error is not None:
+            return INVALID, [format_error(error)]
+        errors = list(iter_semantic_errors(obj)) if semantic else []
+    except (OSError, ValueError, RecursionError) + DECOMPRESSION_ERRORS as e:
+        return ERROR, [str(e)]
+    except Exception as e:
+        # The daemon keeps answering other requests
+        return ERROR, [f"Internal error: {e!r}"]
+    if errors:
+        return INVALID, [format_error(error) for error in errors]
+    return VALID, []
+
+
+async def serve_daemon(validator, socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    ''' Answers requests on socket_path until none came for idle_timeout
+        seconds. Documents are validated one at a time. '''
+
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(1)
+    state = {"active": 0, "last_used": time.monotonic()}
+
+    async def handle_connection(reader, writer):
+        state["active"] += 1
+        try:
+            try:
+                request = json.loads(await reader.readline())
+                if not isinstance(request, dict):
+                    raise ValueError("the request is not an object")
+                if request.get("ping"):
+                    response = {"pid": os.getpid()}
+                elif not isinstance(request.get("path"), str):
+                    raise ValueError("the request has no path")
+                else:
+                    status, messages = await loop.run_in_executor(
+                        executor, check_path, validator, request["path"],
+                        request.get("semantic", True), request.get("loader", "auto"))
+                    response = {"status": status, "messages": messages}
+            except ValueError as e:
+                response = {"error": f"Bad request: {e}"}
+            except ConnectionError:
+                raise
+            except Exception as e:
+                response = {"error": f"Internal error: {e!r}"}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            # The client is gone
+            pass
+        finally:
+            state["active"] -= 1
+            state["last_used"] = time.monotonic()
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle_connection, socket_path)
+    os.chmod(socket_path, 0o600)
+    try:
+        async with server:
+            while True:
+                remaining = state["last_used"] + idle_timeout - time.monotonic()
+                if remaining <= 0 and not state["active"]:
+                    break
+                await asyncio.sleep(max(remaining, 0.1))
+    finally:
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        executor.shutdown()
+
+
+def main(argv=None):
+    import argparse
+    import asyncio
+    import fcntl
+
+    parser = argparse.ArgumentParser(prog="python -m tools.daemon",
+                                     description="Validates the documents of command line "
+                                                 "calls with --daemon")
+    parser.add_argument('--socket', required=True, help='Unix socket to listen on')
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help='Seconds without requests after which the daemon exits')
+    args = parser.parse_args(argv)
+
+    # Only one daemon listens on a socket, others started at the same
+    # time exit. The lock file holds the pid of the daemon.
+    with open(args.socket + ".lock", "a+") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        lock.truncate(0)
+        lock.write(f"{os.getpid()}\n")
+        lock.flush()
+        validator = create_daemon_validator()
+        print(f"Daemon {os.getpid()} listening on {args.socket}", file=sys.stderr, flush=True)
+        asyncio.run(serve_daemon(validator, args.socket, args.idle_timeout))
+
+
+if __name__ == "__main__":
+    main()
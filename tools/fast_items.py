@@ -0,0 +1,115 @@
+# A replacement for the "items" keyword that checks arrays of primitive
+# values, such as the "values" of an NdArray, in bulk instead of
+# descending into every single item.
+# NumPy is used to check whether floats are integers when it is installed.
+
+import heapq
+
+import jsonschema
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ITEMS = jsonschema.validators.Draft202012Validator.VALIDATORS["items"]
+TYPE_CHECKER = jsonschema.validators.Draft202012Validator.TYPE_CHECKER
+
+# Arrays shorter than this are checked item by item
+MIN_LENGTH = 32
+
+# Python types whose instances certainly are of a given JSON type
+EXACT_TYPES = {
+    "array": {list},
+    "boolean": {bool},
+    "integer": {int},
+    "null": {type(None)},
+    "number": {int, float},
+    "object": {dict},
+    "string": {str},
+}
+
+
+# Python types that NumPy converts to float without inspecting them further
+NUMERIC_TYPES = {int, float, bool, type(None)}
+
+# The number of values converted by NumPy at a time
+CHUNK_SIZE = 65536
+
+
+def find_type_mismatches(values, types):
+    ''' Returns an iterable of the ascending indices of all values that may
+        not be of any of the given JSON types. Every value that is not of
+        these types is included, the others are included only if their
+        Python type does not settle the question. Indices beyond the first
+        are only searched for when they are iterated. '''
+
+    if isinstance(types, str):
+        types = [types]
+    allowed = set()
+    for type_ in types:
+        if type_ not in EXACT_TYPES:
+            return range(len(values))
+        allowed |= EXACT_TYPES[type_]
+    # A float is only an "integer" if it has no fractional part
+    check_floats = "integer" in types and "number" not in types
+
+    # A single pass at C speed settles the common case of a valid array
+    kinds = set(map(type, values))
+    suspicious = kinds - allowed
+    if not suspicious:
+        return ()
+
+    mismatches = ()
+    # Arrays read from a file by tools.stream are not converted,
+    # which would load them into memory
+    if check_floats and float in suspicious and numpy is not None and \
+            kinds <= NUMERIC_TYPES and type(values) is list:
+        mismatches = find_non_integral_floats(values)
+        suspicious.discard(float)
+
+    if suspicious:
+        others = (
+            index for index, kind in enumerate(map(type, values))
+            if kind in suspicious and
+            not (check_floats and kind is float and values[index].is_integer())
+        )
+        mismatches = heapq.merge(mismatches, others) if mismatches else others
+    return mismatches
+
+
+def find_non_integral_floats(values):
+    ''' Yields the ascending indices of all floats with a fractional part.
+        The values are converted by NumPy a chunk at a time, so that memory
+        does not grow with the length of the array, and chunks that cannot
+        be converted (e.g. integers beyond the range of floats) are checked
+        in Python. '''
+
+    for start in range(0, len(values), CHUNK_SIZE):
+        chunk = values[start:start + CHUNK_SIZE]
+        try:
+            floats = numpy.array(chunk, dtype=float)
+        except (OverflowError, TypeError, ValueError):
+            yield from (start + index for index, value in enumerate(chunk)
+                        if type(value) is float and not value.is_integer())
+            continue
+        # None becomes NaN, which is filtered out by the type check
+        non_integral = ~(numpy.isfinite(floats) & (floats == numpy.trunc(floats)))
+        for index in numpy.flatnonzero(non_integral).tolist():
+            if type(chunk[index]) is float:
+                yield start + index
+
+
+def fast_items(validator, items, instance, schema):
+    ''' "items" keyword that only descends into the items of a long array
+        which may not match a { "type": ... } items schema, yielding the same
+        errors as descending into every item '''
+
+    if not isinstance(instance, list) or len(instance) < MIN_LENGTH or \
+            not isinstance(items, dict) or items.keys() != {"type"} or \
+            "prefixItems" in schema or validator.TYPE_CHECKER is not TYPE_CHECKER:
+        yield from ITEMS(validator, items, instance, schema)
+        return
+
+    for index in find_type_mismatches(instance, items["type"]):
+        yield from validator.descend(instance[index], items, path=index)
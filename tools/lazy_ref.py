@@ -0,0 +1,44 @@
+# A replacement for the "$ref" keyword that yields the errors of the
+# referenced schema as they are found. jsonschema collects all of them
+# first when references are resolved by a RefResolver, so that a single
+# error cannot be found without finding every error, e.g. one per item of
+# an NdArray with millions of wrong values. With this keyword, the first
+# error or the first few (see validator.iter_limited_errors) cost as
+# much as finding them.
+#
+# The RefResolver of a validator has one stack of resolution scopes, which
+# relative references are resolved against. The scope of the referenced
+# schema is only pushed while its errors are searched and popped before
+# every error is yielded, so that the stack is the same as before at every
+# yield, and generators of errors can be suspended and consumed in any
+# order, e.g. two at a time, without resolving each other's references.
+
+import jsonschema
+
+REF = jsonschema.validators.Draft202012Validator.VALIDATORS["$ref"]
+
+
+def lazy_ref(validator, ref, instance, schema):
+    resolver = validator._ref_resolver
+    resolve = getattr(resolver, "resolve", None)
+    if resolve is None:
+        # Validators with a registry already descend lazily
+        yield from REF(validator, ref, instance, schema)
+        return
+
+    scope, resolved = resolve(ref)
+    errors = validator.descend(instance, resolved)
+    try:
+        while True:
+            resolver.push_scope(scope)
+            try:
+                error = next(errors, None)
+            finally:
+                resolver.pop_scope()
+            if error is None:
+                return
+            yield error
+    finally:
+        # Closes the errors of the referenced schema when the consumer
+        # closes this generator, while no scope is pushed
+        errors.close()
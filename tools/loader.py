@@ -0,0 +1,172 @@
+# Loads JSON documents with a fast parser, orjson or pysimdjson, if one is
+# installed, and with the json module otherwise.
+# The fast parsers read the file through mmap, without copying it into a
+# bytes object first. Their results must be those of json.load of the file
+# opened in text mode, so every document they might parse differently is
+# parsed by json instead, which also produces the usual error messages:
+#  - documents they reject, e.g. with NaN, 1e400 or lone surrogates
+#  - documents starting with a UTF-8 BOM, which pysimdjson skips
+#  - documents with runs of 19 or more digits, for orjson, which parses
+#    integers beyond 64 bits as floats
+# Compressed documents (see tools/compression.py) are decompressed into
+# memory while they are read.
+
+import contextlib
+import gc
+import io
+import json
+import mmap
+
+from .compression import decompress, get_file_compression, open_file
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+BACKENDS = ["json", "orjson", "simdjson"]
+
+# Backends tried by "auto", in order of preference
+AUTO_BACKENDS = ["orjson", "simdjson"]
+
+UTF8_BOM = b"\xef\xbb\xbf"
+
+# Maps digits to "0" and all other bytes to " "
+_DIGITS_TABLE = bytes(0x30 if 0x30 <= i <= 0x39 else 0x20 for i in range(256))
+LONG_DIGITS = 19
+_LONG_DIGITS_RUN = b"0" * LONG_DIGITS
+
+# Number of bytes searched for long runs of digits at a time
+SCAN_CHUNK_SIZE = 1 << 20
+
+_FALLBACK = object()
+
+
+def available_backends():
+    ''' Returns the backends that can be used in this environment '''
+
+    modules = {"json": json, "orjson": orjson, "simdjson": simdjson}
+    return [name for name in BACKENDS if modules[name] is not None]
+
+
+def get_backend(name="auto"):
+    ''' Returns the name of the backend to use for a backend name or "auto" '''
+
+    available = available_backends()
+    if name == "auto":
+        return next((name for name in AUTO_BACKENDS if name in available), "json")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name}")
+    if name not in available:
+        raise ValueError(f"JSON backend {name} is not installed")
+    return name
+
+
+def has_long_digits(data):
+    ''' Whether a bytes-like object contains LONG_DIGITS digits in a row '''
+
+    overlap = LONG_DIGITS - 1
+    for start in range(0, len(data), SCAN_CHUNK_SIZE):
+        chunk = bytes(data[max(start - overlap, 0):start + SCAN_CHUNK_SIZE])
+        if chunk.translate(_DIGITS_TABLE).find(_LONG_DIGITS_RUN) >= 0:
+            return True
+    return False
+
+
+def _fast_loads(data, backend):
+    ''' Returns the document parsed by a fast backend, or _FALLBACK if it
+        must be parsed by json '''
+
+    if data[:3] == UTF8_BOM:
+        return _FALLBACK
+    try:
+        if backend == "orjson":
+            if has_long_digits(data):
+                return _FALLBACK
+            return orjson.loads(data)
+        return simdjson.loads(data)
+    except (ValueError, RuntimeError):
+        # Including the errors of documents nested too deeply
+        return _FALLBACK
+
+
+def _load_mapped(path, backend):
+    with open(path, "rb") as f:
+        # Empty files cannot be mapped
+        if not f.seek(0, io.SEEK_END):
+            return _FALLBACK
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return _fast_loads(view, backend)
+            finally:
+                view.release()
+
+
+@contextlib.contextmanager
+def _frozen_gc(freeze):
+    ''' Disables the garbage collector while parsing, then moves the objects
+        tracked so far to its permanent generation, so that later
+        collections do not traverse the parsed document again '''
+
+    if not freeze:
+        yield
+        return
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+        gc.freeze()
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load_file(path, backend="auto", freeze_gc=False):
+    ''' Parses a JSON file like json.load of the file opened in text mode
+        with UTF-8 encoding, with the given backend (see get_backend).
+        With freeze_gc, the garbage collector is paused during the parse
+        and the document is frozen (see gc.freeze). '''
+
+    backend = get_backend(backend)
+    with _frozen_gc(freeze_gc):
+        if get_file_compression(path) is not None:
+            with open_file(path) as f:
+                return load_stream(f, backend)
+        if backend != "json":
+            obj = _load_mapped(path, backend)
+            if obj is not _FALLBACK:
+                return obj
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def loads(data, backend="auto"):
+    ''' Parses a JSON document given as bytes, possibly compressed, like
+        load_file parses a file '''
+
+    return _loads(decompress(data), get_backend(backend))
+
+
+def _loads(data, backend):
+    if backend != "json" and data:
+        obj = _fast_loads(data, backend)
+        if obj is not _FALLBACK:
+            return obj
+    # Decoded like a file opened in text mode, with universal newlines
+    return json.load(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"))
+
+
+def load_stream(f, backend="auto"):
+    ''' Parses a JSON document read from a binary file object, e.g. one
+        of tools.compression, like load_file parses a file '''
+
+    backend = get_backend(backend)
+    if backend == "json":
+        return json.load(io.TextIOWrapper(f, encoding="utf-8"))
+    return _loads(f.read(), backend)
@@ -0,0 +1,91 @@
+# A replacement for the "$ref" keyword that memoizes the validity of
+# subtrees validated against some schemas, such as the inline domains
+# that thousands of coverages of a collection or batch often repeat.
+# Subtrees are keyed by a hash of their canonical JSON encoding, the
+# referenced schema id and the mode of the validator: its class (i.e. its
+# keyword optimizations) and the resolver of its schemas. Only valid
+# subtrees are remembered: invalid ones are validated again to report
+# their errors with the usual paths.
+# The memo belongs to the process, so that every worker process
+# validates an identical domain once.
+
+import hashlib
+import json
+import time
+
+from .lazy_ref import lazy_ref as REF
+
+# The referenced schemas whose results are memoized
+MEMOIZED_SCHEMA_IDS = frozenset(["/schemas/domainBase"])
+
+# The memo is emptied when it grows beyond this number of entries
+MAX_ENTRIES = 100000
+
+# Maps the keys of valid subtrees to the seconds their validation took
+_valid = {}
+
+_stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+
+
+def subtree_digest(instance):
+    ''' Returns a hash of the canonical JSON encoding of a subtree, which
+        only differs for values that are different in JSON, except that
+        e.g. 1 and 1.0 are distinguished '''
+
+    data = json.dumps(instance, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("ascii"), digest_size=16).digest()
+
+
+def memoizing_ref(validator, ref, instance, schema):
+    if ref not in MEMOIZED_SCHEMA_IDS or not isinstance(instance, dict):
+        yield from REF(validator, ref, instance, schema)
+        return
+
+    try:
+        key = (ref, type(validator), validator._ref_resolver, subtree_digest(instance))
+    except (TypeError, ValueError):
+        # Not JSON, e.g. keys that are not strings
+        yield from REF(validator, ref, instance, schema)
+        return
+    seconds = _valid.get(key)
+    if seconds is not None:
+        _stats["hits"] += 1
+        _stats["saved_seconds"] += seconds
+        return
+
+    _stats["misses"] += 1
+    start = time.perf_counter()
+    valid = True
+    for error in REF(validator, ref, instance, schema):
+        valid = False
+        yield error
+    if valid:
+        if len(_valid) >= MAX_ENTRIES:
+            _valid.clear()
+        _valid[key] = time.perf_counter() - start
+
+
+def get_stats():
+    ''' Returns the hits, misses and seconds saved by the memo of this process '''
+
+    return dict(_stats)
+
+
+def get_stats_delta(before):
+    ''' Returns the statistics since an earlier result of get_stats '''
+
+    return {name: value - before[name] for name, value in _stats.items()}
+
+
+def add_stats(stats, delta):
+    ''' Adds statistics to those in stats '''
+
+    for name, value in delta.items():
+        stats[name] += value
+
+
+def clear():
+    ''' Empties the memo and resets its statistics '''
+
+    _valid.clear()
+    _stats.update(hits=0, misses=0, saved_seconds=0.0)
@@ -0,0 +1,130 @@
+# A pool of worker processes forked once the state they share, e.g. the
+# schema store and validators, has been created in the parent process, and
+# reports of the startup time and memory use of its workers
+
+import gc
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Seconds between checks whether the pool broke while waiting for the
+# workers to start
+STARTUP_POLL_INTERVAL = 0.1
+
+
+def get_memory_usage():
+    ''' Returns the resident memory of this process and the part of it that
+        is not shared with other processes, in bytes, or None if the
+        system does not tell (it is read from /proc) '''
+
+    sizes = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Private_Clean", "Private_Dirty"):
+                    sizes[name] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        return None
+    return {"rss": sizes["Rss"], "private": sizes["Private_Clean"] + sizes["Private_Dirty"]}
+
+
+def can_fork():
+    ''' Whether worker processes can be forked on this system '''
+
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _init_preloaded_worker(stats_queue, created, initializer, initargs):
+    # The stats are also put if the initializer fails, so that the pool
+    # does not wait for them
+    stats = {"pid": os.getpid()}
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+    except BaseException as e:
+        stats["error"] = repr(e)
+        raise
+    finally:
+        stats["startup_seconds"] = time.monotonic() - created
+        stats.update(get_memory_usage() or {})
+        stats_queue.put(stats)
+
+
+class PreloadedPool(ProcessPoolExecutor):
+    ''' A pool of worker processes forked from this process once the
+        schema store and validators used by the workers have been created
+        here (e.g. in module globals). warm_up runs first, e.g. a validation
+        creating state that validators create lazily, then all objects are
+        frozen (see gc.freeze), so that the garbage collectors of the
+        workers do not write to them and the workers share their memory
+        copy-on-write. initializer runs in every worker, for state that
+        cannot be shared, e.g. database connections.
+        worker_stats holds the pid, the startup time (from the creation of
+        the pool until the worker is ready) and the memory use of every
+        worker (see get_memory_usage). Raises BrokenProcessPool if a worker
+        fails to start. Requires the fork start method. '''
+
+    def __init__(self, workers=None, warm_up=None, initializer=None, initargs=()):
+        context = multiprocessing.get_context("fork")
+        stats_queue = context.Queue()
+        if warm_up is not None:
+            warm_up()
+        gc.collect()
+        gc.freeze()
+        try:
+            super().__init__(workers, mp_context=context, initializer=_init_preloaded_worker,
+                             initargs=(stats_queue, time.monotonic(), initializer, initargs))
+            try:
+                # All workers are forked on the first task
+                self.submit(int)
+                self.worker_stats = self._collect_worker_stats(stats_queue)
+            except BaseException:
+                self.shutdown(wait=True, cancel_futures=True)
+                raise
+        finally:
+            # Only the workers need to keep the objects frozen
+            gc.unfreeze()
+            stats_queue.close()
+
+    def _collect_worker_stats(self, stats_queue):
+        ''' Returns the stats of all workers once they have started, or
+            raises BrokenProcessPool if one of them failed to '''
+
+        worker_stats = []
+        while len(worker_stats) < self._max_workers:
+            try:
+                stats = stats_queue.get(timeout=STARTUP_POLL_INTERVAL)
+            except queue.Empty:
+                # Workers that died without putting their stats
+                if self._broken:
+                    raise BrokenProcessPool(self._broken)
+                continue
+            if "error" in stats:
+                raise BrokenProcessPool(
+                    f"Worker {stats['pid']} failed to start: {stats['error']}")
+            worker_stats.append(stats)
+        return worker_stats
+
+
+def format_worker_stats(worker_stats):
+    ''' Describes the startup time and memory use of worker processes '''
+
+    lines = []
+    for stats in worker_stats:
+        line = f"Worker {stats['pid']}: started in {stats['startup_seconds'] * 1000:.0f} ms"
+        if "rss" in stats:
+            line += (f", RSS {stats['rss'] / 2 ** 20:.1f} MB, "
+                     f"private {stats['private'] / 2 ** 20:.1f} MB")
+        lines.append(line)
+    line = (f"{len(worker_stats)} workers: slowest started in "
+            f"{max(stats['startup_seconds'] for stats in worker_stats) * 1000:.0f} ms")
+    if all("rss" in stats for stats in worker_stats):
+        line += (f", RSS {sum(stats['rss'] for stats in worker_stats) / 2 ** 20:.1f} MB "
+                 f"of which {sum(stats['private'] for stats in worker_stats) / 2 ** 20:.1f} MB "
+                 "private")
+    lines.append(line)
+    return "\n".join(lines)
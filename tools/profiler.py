@@ -0,0 +1,129 @@
+# Profiles validation by keyword and subschema. The keyword functions of
+# a validator class are wrapped to count their calls and measure their
+# cumulative time and their self time (excluding the keywords they
+# descend into), per schema $id, keyword and schema path.
+# Validators that are not instrumented are not affected in any way.
+#
+# The stacks of keywords can be written in the collapsed format of
+# flamegraph.pl and speedscope, with self times in microseconds.
+
+import time
+from collections import defaultdict
+
+import jsonschema
+
+_DONE = object()
+
+
+def index_subschemas(schema_store):
+    ''' Maps the id() of every subschema of the store to the $id of its
+        schema and its JSON pointer within that schema '''
+
+    index = {}
+    for schema_id in schema_store:
+        todo = [(schema_store[schema_id], "")]
+        while todo:
+            schema, pointer = todo.pop()
+            if isinstance(schema, dict):
+                index[id(schema)] = (schema_id, pointer)
+                items = schema.items()
+            elif isinstance(schema, list):
+                items = enumerate(schema)
+            else:
+                continue
+            for key, value in items:
+                escaped = str(key).replace("~", "~0").replace("/", "~1")
+                todo.append((value, f"{pointer}/{escaped}"))
+    return index
+
+
+class KeywordProfiler:
+    ''' Collects the calls, cumulative time and self time of every
+        keyword evaluated by the validators it instruments, keyed by
+        (schema $id, keyword, schema path). Recursive evaluations of the
+        same key are counted in its cumulative time once per level. '''
+
+    def __init__(self, schema_store):
+        self.subschemas = index_subschemas(schema_store)
+        # Maps keys to [calls, cumulative seconds, self seconds]
+        self.stats = defaultdict(lambda: [0, 0.0, 0.0])
+        # Maps stacks of keys to self seconds
+        self.stacks = defaultdict(float)
+        self._keys = {}
+        # Keeps the schemas in _keys alive so that their ids cannot be reused
+        self._schemas = []
+        self._stack = []
+
+    def _key(self, schema, keyword):
+        try:
+            return self._keys[id(schema), keyword]
+        except KeyError:
+            schema_id, pointer = self.subschemas.get(id(schema), ("?", ""))
+            key = self._keys[id(schema), keyword] = (schema_id, keyword, f"{pointer}/{keyword}")
+            self._schemas.append(schema)
+            return key
+
+    def _wrap(self, keyword, function):
+        def profiled(validator, value, instance, schema):
+            key = self._key(schema, keyword)
+            entry = self.stats[key]
+            entry[0] += 1
+            stack = self._stack
+            frames = (stack[-1][0] if stack else ()) + (key,)
+            errors = None
+            # Only the time spent in the keyword counts, not the time
+            # the consumer of its errors takes between them
+            while True:
+                frame = [frames, 0.0]
+                stack.append(frame)
+                start = time.perf_counter()
+                try:
+                    if errors is None:
+                        errors = iter(function(validator, value, instance, schema) or ())
+                    error = next(errors, _DONE)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    stack.pop()
+                    entry[1] += elapsed
+                    entry[2] += elapsed - frame[1]
+                    self.stacks[frames] += elapsed - frame[1]
+                    if stack:
+                        stack[-1][1] += elapsed
+                if error is _DONE:
+                    return
+                yield error
+        return profiled
+
+    def instrument(self, validator):
+        ''' Returns a validator with the same schema and resolver as a
+            jsonschema validator, whose keywords are profiled '''
+
+        cls = type(validator)
+        cls = jsonschema.validators.extend(cls, {
+            keyword: self._wrap(keyword, function)
+            for keyword, function in cls.VALIDATORS.items()
+        })
+        return cls(validator.schema, resolver=validator._ref_resolver)
+
+    def report(self, limit=25):
+        ''' Returns a table of the limit keys with the highest self time '''
+
+        total = sum(entry[2] for entry in self.stats.values())
+        rows = sorted(self.stats.items(), key=lambda item: item[1][2], reverse=True)
+        lines = [f"{'calls':>10}{'cumulative s':>14}{'self s':>10}{'self %':>8}  schema  keyword  path"]
+        for (schema_id, keyword, path), (calls, cumulative, self_time) in rows[:limit]:
+            share = self_time / total if total else 0
+            lines.append(f"{calls:>10}{cumulative:>14.4f}{self_time:>10.4f}{share:>8.1%}  "
+                         f"{schema_id}  {keyword}  {path}")
+        lines.append(f"{len(self.stats)} keys, {total:.4f} s in keywords")
+        return "\n".join(lines)
+
+    def write_collapsed(self, f):
+        ''' Writes the stacks in the collapsed format of flamegraph.pl '''
+
+        for frames, seconds in sorted(self.stacks.items()):
+            micros = round(seconds * 1e6)
+            if micros > 0:
+                names = ";".join(f"{schema_id}#{path}".replace(";", ",").replace(" ", "_")
+                                 for schema_id, _, path in frames)
+                f.write(f"{names} {micros}\n")
@@ -0,0 +1,144 @@
+# A persistent cache of validation results in a SQLite database, keyed by
+# a hash of the validated file, the schemas and the validator mode, so that
+# byte-identical files are only validated once
+
+import hashlib
+import os
+import sqlite3
+import time
+
+from .validator import get_cache_dir
+
+RESULT_CACHE_NAME = "results.sqlite"
+
+# Entries beyond this number are evicted, least recently used first
+DEFAULT_MAX_ENTRIES = 1000000
+
+# Eviction runs after this many new entries
+EVICT_EVERY = 1000
+
+
+def get_result_cache_path():
+    ''' Returns the default location of the result cache database '''
+
+    return os.path.join(get_cache_dir(), RESULT_CACHE_NAME)
+
+
+def file_digest(path):
+    ''' Returns the SHA-256 hex digest of a file '''
+
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class ResultCache:
+    ''' Maps the contents of files to their validation result, as
+        validated against schemas with the given fingerprint
+        (see validator.schema_store_fingerprint) in the given mode '''
+
+    def __init__(self, fingerprint, mode, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        if path is None:
+            path = get_result_cache_path()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._prefix = f"{fingerprint}\0{mode}\0".encode("utf-8")
+        self.max_entries = max_entries
+        self._added = 0
+        # Worker processes share the database, waiting for each other's writes
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY, status TEXT, message TEXT, seconds REAL, last_used REAL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value REAL)")
+            self._db.execute("""INSERT OR IGNORE INTO stats VALUES
+                ('hits', 0), ('misses', 0), ('saved_seconds', 0)""")
+
+    def key(self, digest):
+        ''' Returns the key of a file with the given hex digest '''
+
+        return hashlib.sha256(self._prefix + digest.encode("ascii")).hexdigest()
+
+    def get(self, key, start):
+        ''' Returns the cached (status, message) for a key, or None.
+            start is the time.perf_counter() at which the file was looked
+            up, for the time saved compared to validating it. '''
+
+        with self._db:
+            row = self._db.execute(
+                "SELECT status, message, seconds FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            status, message, seconds = row
+            self._db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            saved = seconds - (time.perf_counter() - start)
+            self._db.execute("""UPDATE stats SET value = value + (CASE name
+                WHEN 'hits' THEN 1 WHEN 'saved_seconds' THEN ? ELSE 0 END)""", (saved,))
+        return status, message
+
+    def put(self, key, status, message, seconds):
+        ''' Stores the result of validating a file in seconds '''
+
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                             (key, status, message, seconds, time.time()))
+            self._db.execute("UPDATE stats SET value = value + 1 WHERE name = 'misses'")
+        self._added += 1
+        if self._added % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        ''' Deletes the least recently used entries beyond max_entries '''
+
+        with self._db:
+            self._db.execute("""DELETE FROM results WHERE key IN (
+                SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+                             (self.max_entries,))
+
+    def stats(self):
+        ''' Returns the number of entries and the hits, misses and seconds
+            saved by all users of the database '''
+
+        stats = dict(self._db.execute("SELECT name, value FROM stats"))
+        stats["entries"] = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        stats["hits"] = int(stats["hits"])
+        stats["misses"] = int(stats["misses"])
+        return stats
+
+    def clear(self):
+        ''' Deletes all entries and statistics '''
+
+        with self._db:
+            self._db.execute("DELETE FROM results")
+            self._db.execute("UPDATE stats SET value = 0")
+
+    def close(self):
+        self.evict()
+        self._db.close()
+
+
+def format_stats(stats):
+    ''' Describes the hits, misses and seconds saved of stats '''
+
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = stats["hits"] / lookups if lookups else 0
+    return (f"{stats['hits']} hits, {stats['misses']} misses "
+            f"(hit rate {hit_rate:.1%}), {stats['saved_seconds']:.1f} s saved")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Shows the statistics of the result cache")
+    parser.add_argument('--path', type=str, default=None,
+                        help=f'Path of the database (default: {get_result_cache_path()})')
+    parser.add_argument('--clear', action='store_true', help='Delete all entries and statistics')
+    args = parser.parse_args()
+
+    cache = ResultCache("", "", args.path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    cache.close()
+    print(f"{stats['entries']} entries, " + format_stats(stats))
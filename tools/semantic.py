@@ -0,0 +1,194 @@
+# Checks semantic constraints of CoverageJSON documents which cannot be
+# expressed in JSON Schema, e.g. that the number of values of an NdArray
+# matches its shape.
+# All checks share a single traversal of the document: each rule is
+# registered for the "type" of the objects it checks and is called with
+# every such object, its path and the parameters in scope, i.e. those of
+# the enclosing Coverage and CoverageCollection. The documents are
+# expected to be valid against the schemas, but the rules do not fail on
+# objects that are not, which they skip.
+
+import math
+from collections import ChainMap
+from typing import NamedTuple
+
+# Changed whenever a rule changes, to invalidate cached results
+VERSION = 3
+
+# Maps object types to the rules checking them
+RULES = {}
+
+
+def rule(object_type):
+    ''' Registers a function yielding the errors of objects of a type '''
+
+    def register(fn):
+        RULES.setdefault(object_type, []).append(fn)
+        return fn
+    return register
+
+
+def semantic_error(message, rule_name, path, instance):
+    # jsonschema is only imported once an error is found
+    from jsonschema import ValidationError
+    return ValidationError(message, validator=rule_name, path=path,
+                           instance=instance, validator_value=None)
+
+
+def walk(doc):
+    ''' Yields the path, object and parameters in scope of the CoverageJSON
+        objects of a document in document order: the document itself, the
+        coverages of a collection and the ranges of coverages. Other members,
+        such as extension members that happen to have a "type", are not
+        visited, as the schemas do not check them. The parameters in scope
+        are a ChainMap of the parameters of the enclosing coverages, which
+        shares the dicts of the document instead of copying them. Arrays of
+        values are never iterated. '''
+
+    if not isinstance(doc, dict):
+        return
+    todo = [((), doc, ChainMap())]
+    while todo:
+        path, obj, parameters = todo.pop()
+        object_type = obj.get("type")
+        if object_type in ("Coverage", "CoverageCollection") and \
+                isinstance(obj.get("parameters"), dict):
+            parameters = parameters.new_child(obj["parameters"])
+        yield path, obj, parameters
+        children = []
+        if object_type == "CoverageCollection" and isinstance(obj.get("coverages"), list):
+            children = [(path + ("coverages", index), coverage, parameters)
+                        for index, coverage in enumerate(obj["coverages"])
+                        if isinstance(coverage, dict)]
+        elif object_type == "Coverage" and isinstance(obj.get("ranges"), dict):
+            children = [(path + ("ranges", key), range_, parameters)
+                        for key, range_ in obj["ranges"].items() if isinstance(range_, dict)]
+        todo.extend(reversed(children))
+
+
+def iter_semantic_errors(doc, rules=None):
+    ''' Yields a ValidationError for every violation of the rules
+        (default: all registered RULES) in a document '''
+
+    if rules is None:
+        rules = RULES
+    for path, obj, parameters in walk(doc):
+        object_type = obj.get("type")
+        if isinstance(object_type, str) and object_type in rules:
+            for check in rules[object_type]:
+                yield from check(obj, path, parameters)
+
+
+def is_shape(shape):
+    ''' Whether shape is a list of integers, as the schemas require '''
+
+    return isinstance(shape, list) and all(type(size) is int for size in shape)
+
+
+def check_axis_names_length(array, path, parameters):
+    ''' shape and axisNames must have the same length '''
+
+    if isinstance(array.get("shape"), list) and isinstance(array.get("axisNames"), list) and \
+            len(array["shape"]) != len(array["axisNames"]):
+        yield semantic_error(
+            f"axisNames has {len(array['axisNames'])} entries, but shape has "
+            f"{len(array['shape'])} dimensions",
+            "axisNames", path + ("axisNames",), array["axisNames"])
+
+
+rule("NdArray")(check_axis_names_length)
+rule("TiledNdArray")(check_axis_names_length)
+
+
+@rule("NdArray")
+def check_values_length(ndarray, path, parameters):
+    ''' The number of values must be the product of shape (1 without
+        shape). The length of the values is read without iterating them. '''
+
+    shape = ndarray.get("shape", [])
+    values = ndarray.get("values")
+    if not is_shape(shape) or not isinstance(values, list):
+        return
+    expected = math.prod(shape)
+    if len(values) != expected:
+        yield semantic_error(
+            f"values has {len(ndarray['values'])} items, but shape {shape} "
+            f"requires {expected}",
+            "values", path + ("values",), None)
+
+
+@rule("TiledNdArray")
+def check_tile_shape_length(tiled, path, parameters):
+    ''' The tileShape of each tile set must have one entry per dimension '''
+
+    tile_sets = tiled.get("tileSets")
+    if not isinstance(tile_sets, list) or not isinstance(tiled.get("shape"), list):
+        return
+    for index, tile_set in enumerate(tile_sets):
+        if not isinstance(tile_set, dict) or not isinstance(tile_set.get("tileShape"), list):
+            continue
+        if len(tile_set["tileShape"]) != len(tiled["shape"]):
+            yield semantic_error(
+                f"tileShape has {len(tile_set['tileShape'])} entries, but shape has "
+                f"{len(tiled['shape'])} dimensions",
+                "tileShape", path + ("tileSets", index, "tileShape"), tile_set["tileShape"])
+
+
+class CoverageIndex(NamedTuple):
+    ''' The parameters in scope of a coverage and the lengths of the axes
+        of its domain (None if the domain is given by a URL) '''
+
+    parameters: ChainMap
+    axes: dict
+
+
+def axis_length(axis):
+    ''' Returns the number of coordinates of an axis, without iterating
+        its values, or None if it has neither num nor values '''
+
+    if "num" in axis:
+        return axis["num"]
+    values = axis.get("values")
+    return len(values) if isinstance(values, list) else None
+
+
+def index_coverage(coverage, parameters):
+    ''' Collects the lookups needed by the cross-reference checks of a
+        coverage in one pass over its domain axes '''
+
+    domain = coverage.get("domain")
+    axes = None
+    if isinstance(domain, dict) and isinstance(domain.get("axes"), dict):
+        axes = {name: axis_length(axis) for name, axis in domain["axes"].items()
+                if isinstance(axis, dict)}
+    return CoverageIndex(parameters, axes)
+
+
+@rule("Coverage")
+def check_range_references(coverage, path, parameters):
+    ''' Every range must belong to a parameter in scope, and the axes of
+        every range must be axes of the domain with the same lengths '''
+
+    ranges = coverage.get("ranges")
+    if not isinstance(ranges, dict):
+        return
+    index = index_coverage(coverage, parameters)
+    for key, range_ in ranges.items():
+        range_path = path + ("ranges", key)
+        if key not in index.parameters:
+            yield semantic_error(f"Range {key!r} has no matching parameter",
+                                 "ranges", range_path, range_)
+        if index.axes is None or not isinstance(range_, dict) or \
+                not isinstance(range_.get("axisNames"), list) or not is_shape(range_.get("shape")):
+            continue
+        for i, (name, size) in enumerate(zip(range_["axisNames"], range_["shape"])):
+            if not isinstance(name, str):
+                continue
+            if name not in index.axes:
+                yield semantic_error(f"Axis {name!r} is not an axis of the domain",
+                                     "axisNames", range_path + ("axisNames", i), name)
+            elif index.axes[name] is not None and size != index.axes[name]:
+                yield semantic_error(
+                    f"shape has {size} entries along axis {name!r}, "
+                    f"but the axis has {index.axes[name]} coordinates",
+                    "shape", range_path + ("shape", i), size)
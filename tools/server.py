@@ -0,0 +1,261 @@
+# A long-running HTTP service validating CoverageJSON documents with
+# compiled validators for all schemas that are created once at startup.
+# Documents are POSTed to the id of the schema to validate against:
+#
+#   curl --data-binary @grid.covjson http://localhost:8137/schemas/coveragejson
+#
+# Started with: python -m tools.validator serve [--port 8137 | --unix PATH]
+
+import argparse
+import asyncio
+import json
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+from .compile_validator import create_compiled_validator
+from .semantic import iter_semantic_errors
+from .validator import create_schema_store, load_cached_schema_store
+
+DEFAULT_PORT = 8137
+DEFAULT_SCHEMA_ID = "/schemas/coveragejson"
+DEFAULT_MAX_ERRORS = 100
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    ''' An error response with a status code and a message '''
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def create_validators(schema_store):
+    ''' Creates a compiled validator for every schema id of the store '''
+
+    return {
+        schema_id: create_compiled_validator(schema_id, schema_store)
+        for schema_id in schema_store
+    }
+
+
+def describe_errors(errors):
+    ''' Converts validation errors into JSON-serializable objects '''
+
+    return [
+        {
+            "message": error.message,
+            "path": error.json_path,
+            "schema_path": "/".join(map(str, error.schema_path)),
+        }
+        for error in errors
+    ]
+
+
+class ValidationService:
+    ''' Handles HTTP connections, validating POSTed documents in at most
+        concurrency threads, and rejecting requests with 503 when more
+        than max_pending are waiting for a thread. With semantic, documents
+        valid against the schema are also checked like the command line
+        does (see tools/semantic.py). '''
+
+    def __init__(self, validators, concurrency=4, max_pending=64, max_body_size=1 << 30,
+                 semantic=True):
+        self.validators = validators
+        self.semantic = semantic
+        self.max_body_size = max_body_size
+        self.max_pending = max_pending
+        self._pending = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(concurrency)
+
+    def validate(self, schema_id, body, max_errors):
+        ''' Returns the verdict for a document given as bytes '''
+
+        try:
+            instance = json.loads(body)
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+        except RecursionError:
+            raise HTTPError(400, "The document is nested too deeply")
+        try:
+            errors = list(islice(self.validators[schema_id].iter_errors(instance), max_errors))
+            if not errors and self.semantic:
+                errors = list(islice(iter_semantic_errors(instance), max_errors))
+        except RecursionError:
+            raise HTTPError(400, "The document is nested too deeply")
+        return {"valid": not errors, "errors": describe_errors(errors)}
+
+    async def handle_request(self, method, target, body):
+        ''' Returns the status and JSON response for a request '''
+
+        url = urlsplit(target)
+        path = url.path
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path in ("/", "/schemas"):
+            if method != "GET":
+                raise HTTPError(405, "Use GET")
+            return 200, {"schemas": sorted(self.validators)}
+        if path == "/validate":
+            path = DEFAULT_SCHEMA_ID
+        if path not in self.validators:
+            raise HTTPError(404, f"Unknown schema {path}")
+        if method != "POST":
+            raise HTTPError(405, "POST the document to validate")
+
+        query = parse_qs(url.query)
+        try:
+            max_errors = int(query.get("max_errors", [DEFAULT_MAX_ERRORS])[0])
+        except ValueError:
+            raise HTTPError(400, "max_errors must be an integer")
+        # Like --max-errors of the command line, as no errors would make
+        # an invalid document look valid
+        if max_errors < 1:
+            raise HTTPError(400, "max_errors must be at least 1")
+
+        if self._pending >= self.max_pending:
+            raise HTTPError(503, "Too many pending requests")
+        self._pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._executor, self.validate, path, body, max_errors)
+        finally:
+            self._pending -= 1
+        return 200, result
+
+    async def read_request(self, reader):
+        ''' Reads a request, returning its method, target, headers and body,
+            or None if the connection has been closed '''
+
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        headers["version"] = version
+
+        body = b""
+        if method in ("POST", "PUT"):
+            if "content-length" not in headers:
+                raise HTTPError(411, "Content-Length is required")
+            try:
+                length = int(headers["content-length"])
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            if length > self.max_body_size:
+                raise HTTPError(413, f"The body exceeds {self.max_body_size} bytes")
+            body = await reader.readexactly(length)
+        return method, target, headers, body
+
+    async def handle_connection(self, reader, writer):
+        ''' Serves requests on a connection until the client closes it '''
+
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" or \
+                        headers["version"] == "HTTP/1.1" and connection != "close"
+                    status, response = await self.handle_request(method, target, body)
+                except HTTPError as e:
+                    status, response = e.status, {"error": e.message}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # Answered instead of dropping the connection
+                    traceback.print_exc()
+                    status, response = 500, {"error": f"Internal error: {e!r}"}
+                data = json.dumps(response).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                    f"\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=DEFAULT_PORT, unix_socket=None):
+    ''' Runs the service until cancelled '''
+
+    if unix_socket:
+        server = await asyncio.start_unix_server(service.handle_connection, unix_socket)
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"Serving {len(service.validators)} schemas on {addresses}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tools.validator serve",
+                                     description="Serves validation requests over HTTP")
+    parser.add_argument('--host', default="127.0.0.1", help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--unix', metavar='PATH', help='Listen on a Unix socket instead')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Maximum number of documents validated at the same time')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='Maximum number of requests waiting to be validated')
+    parser.add_argument('--max-body-size', type=int, default=1 << 30,
+                        help='Maximum size of a document in bytes')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Load the schemas from the schemas directory '
+                             'instead of the persistent cache')
+    parser.add_argument('--no-semantic', action='store_true',
+                        help='Skip the checks beyond the schemas of tools/semantic.py')
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        schema_store = create_schema_store()
+    else:
+        schema_store = load_cached_schema_store()
+    validators = create_validators(schema_store)
+
+    async def run():
+        service = ValidationService(validators, args.concurrency, args.max_pending,
+                                    args.max_body_size, not args.no_semantic)
+        await serve(service, args.host, args.port, args.unix)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,344 @@
+# Reads CoverageJSON documents with an incremental JSON tokenizer, without
+# holding the values of their ranges in memory.
+# The "values" arrays of ranges are replaced by arrays that read their items
+# from the file again whenever they are iterated, so that a document can be
+# validated with memory independent of the length of these arrays.
+# Compressed files are decompressed again whenever they are read.
+
+import codecs
+import json
+import pprint
+import re
+from json.decoder import scanstring
+
+from .compression import open_file
+
+# Number of bytes read from the file at a time
+CHUNK_SIZE = 1 << 16
+
+# Streamed arrays with up to this many items are kept in memory
+MAX_MATERIALIZED_LENGTH = 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# First character that cannot be part of a number or literal
+TOKEN_END = re.compile(r'[^0-9A-Za-z.+\-]')
+
+DECODER = json.JSONDecoder()
+
+
+def is_range_values(path):
+    ''' Whether a path points to the "values" of an NdArray which is
+        a range of a coverage, or the whole document '''
+
+    return (path == ("values",) or
+            len(path) >= 3 and path[-1] == "values" and path[-3] == "ranges")
+
+
+class StreamDecodeError(json.JSONDecodeError):
+    ''' A JSONDecodeError for a document that is not held in memory '''
+
+    def __init__(self, msg, pos, lineno, colno):
+        errmsg = f"{msg}: line {lineno} column {colno} (char {pos})"
+        ValueError.__init__(self, errmsg)
+        self.msg = msg
+        self.doc = None
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+
+    def __reduce__(self):
+        return self.__class__, (self.msg, self.pos, self.lineno, self.colno)
+
+
+class _Reader:
+    ''' Parses JSON from a binary file, holding only a buffer of the text '''
+
+    def __init__(self, f, filename, mark=None):
+        self._file = f
+        self._filename = filename
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        # Byte offset, character offset, line number and character offset
+        # of the line start of the beginning of the buffer
+        if mark is None:
+            mark = (0, 0, 1, 0)
+        self._offset, self._chars, self._lineno, self._line_start = mark
+        f.seek(self._offset)
+
+    def mark(self):
+        ''' Returns the state needed to continue reading at the current position '''
+
+        self._consume()
+        return self._offset, self._chars, self._lineno, self._line_start
+
+    def _consume(self):
+        ''' Drops the part of the buffer before the current position '''
+
+        pos = self._pos
+        if not pos:
+            return
+        consumed = self._buf[:pos]
+        self._offset += len(consumed) if consumed.isascii() else len(consumed.encode("utf-8"))
+        newline = consumed.rfind("\n")
+        if newline != -1:
+            self._lineno += consumed.count("\n")
+            self._line_start = self._chars + newline + 1
+        self._chars += pos
+        self._buf = self._buf[pos:]
+        self._pos = 0
+
+    def _fill(self):
+        ''' Reads more of the file into the buffer.
+            Returns False if the end of the file has been reached. '''
+
+        if self._eof:
+            return False
+        self._consume()
+        data = self._file.read(CHUNK_SIZE)
+        if not data:
+            self._eof = True
+            self._buf += self._decoder.decode(b"", final=True)
+            return False
+        self._buf += self._decoder.decode(data)
+        return True
+
+    def _ensure(self, length):
+        ''' Reads until the buffer holds length characters after the
+            current position, or up to the end of the file '''
+
+        while len(self._buf) - self._pos < length and self._fill():
+            pass
+
+    def error(self, msg, pos=None):
+        ''' Returns a StreamDecodeError at a position in the buffer '''
+
+        if pos is None:
+            pos = self._pos
+        newlines = self._buf.count("\n", 0, pos)
+        if newlines:
+            lineno = self._lineno + newlines
+            line_start = self._chars + self._buf.rfind("\n", 0, pos) + 1
+        else:
+            lineno = self._lineno
+            line_start = self._line_start
+        return StreamDecodeError(msg, self._chars + pos, lineno,
+                                 self._chars + pos - line_start + 1)
+
+    def skip(self):
+        ''' Skips whitespace and returns the next character, or "" at the
+            end of the file '''
+
+        while True:
+            self._pos = WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def parse(self, path, streamed):
+        ''' Parses the value at the current position, replacing arrays for
+            which streamed(path) holds by StreamedArray '''
+
+        c = self.skip()
+        if c != "{" and c != "[":
+            return self._parse_scalar()
+
+        # Values which fit into the buffer are parsed at once
+        self._ensure(CHUNK_SIZE // 2)
+        try:
+            value, self._pos = DECODER.raw_decode(self._buf, self._pos)
+            return value
+        except json.JSONDecodeError:
+            # Too large for the buffer or malformed, the tokenizer tells
+            pass
+
+        self._pos += 1
+        if c == "{":
+            return self._parse_object(path, streamed)
+        if streamed(path):
+            return self._parse_streamed_array(path, streamed)
+        return list(self.iter_items(path, streamed))
+
+    def _parse_scalar(self):
+        if self._buf.startswith('"', self._pos):
+            return self._parse_string()
+        # Make sure that numbers and literals are not cut off
+        while TOKEN_END.search(self._buf, self._pos + 1) is None and self._fill():
+            pass
+        try:
+            value, self._pos = DECODER.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError as e:
+            raise self.error(e.msg, e.pos) from None
+        return value
+
+    def _parse_string(self):
+        ''' Parses the string starting at the current position '''
+
+        while True:
+            try:
+                value, self._pos = scanstring(self._buf, self._pos + 1)
+                return value
+            except json.JSONDecodeError as e:
+                # The string or an escape sequence may be cut off
+                cut_off = e.msg.startswith("Unterminated string") or \
+                    e.pos >= len(self._buf) - 6
+                if not cut_off or self._eof:
+                    raise self.error(e.msg, e.pos) from None
+                self._fill()
+
+    def _parse_object(self, path, streamed):
+        obj = {}
+        c = self.skip()
+        if c == "}":
+            self._pos += 1
+            return obj
+        while True:
+            if c != '"':
+                raise self.error("Expecting property name enclosed in double quotes")
+            key = self._parse_string()
+            if self.skip() != ":":
+                raise self.error("Expecting ':' delimiter")
+            self._pos += 1
+            obj[key] = self.parse(path + (key,), streamed)
+            c = self.skip()
+            if c == "}":
+                self._pos += 1
+                return obj
+            if c != ",":
+                raise self.error("Expecting ',' delimiter")
+            self._pos += 1
+            c = self.skip()
+
+    def iter_items(self, path, streamed):
+        ''' Yields the items of the array whose "[" has been consumed '''
+
+        if self.skip() == "]":
+            self._pos += 1
+            return
+        index = 0
+        # Absolute position up to which the items are parsed one by one
+        slow_until = -1
+        while True:
+            self._ensure(CHUNK_SIZE // 2)
+            buf, pos = self._buf, self._pos
+            if self._chars + pos > slow_until:
+                # All items up to the last comma in the buffer are parsed at
+                # once; this fails if that comma is not between two items
+                comma = buf.rfind(",", pos)
+                items = None
+                if comma != -1:
+                    try:
+                        items = json.loads("[" + buf[pos:comma] + "]")
+                    except json.JSONDecodeError:
+                        pass
+                if items:
+                    self._pos = comma + 1
+                    index += len(items)
+                    yield from items
+                    continue
+                if comma != -1:
+                    slow_until = self._chars + comma
+
+            yield self.parse(path + (index,), streamed)
+            index += 1
+            c = self.skip()
+            if c == "]":
+                self._pos += 1
+                return
+            if c != ",":
+                raise self.error("Expecting ',' delimiter")
+            self._pos += 1
+
+    def _parse_streamed_array(self, path, streamed):
+        mark = self.mark()
+        items = []
+        length = 0
+        for item in self.iter_items(path, streamed):
+            length += 1
+            if items is not None:
+                items.append(item)
+                if length > MAX_MATERIALIZED_LENGTH:
+                    items = None
+        if items is not None:
+            return items
+        return StreamedArray(self._filename, mark, length, path, streamed)
+
+
+class StreamedArray(list):
+    ''' A read-only JSON array which reads its items from the file
+        whenever it is iterated. Items are looked up by index efficiently
+        in ascending order. '''
+
+    def __init__(self, filename, mark, length, path, streamed):
+        super().__init__()
+        self._filename = filename
+        self._mark = mark
+        self._length = length
+        self._path = path
+        self._streamed = streamed
+        self._cursor = None
+        self._cursor_index = -1
+        self._current = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        with open_file(self._filename) as f:
+            reader = _Reader(f, self._filename, self._mark)
+            yield from reader.iter_items(self._path, self._streamed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("list index out of range")
+        if self._cursor is None or index < self._cursor_index:
+            self._cursor = iter(self)
+            self._cursor_index = -1
+        while self._cursor_index < index:
+            self._current = next(self._cursor)
+            self._cursor_index += 1
+        return self._current
+
+    def __contains__(self, value):
+        return any(item is value or item == value for item in self)
+
+    def __eq__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return len(self) == len(other) and \
+            all(a is b or a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __repr__(self):
+        return "[" + ", ".join(map(repr, self)) + "]"
+
+
+# Error messages (ValidationError.__str__) pretty-print streamed arrays
+# like lists
+pprint.PrettyPrinter._dispatch[StreamedArray.__repr__] = \
+    pprint.PrettyPrinter._dispatch[list.__repr__]
+
+
+def load_streamed(path, streamed=is_range_values):
+    ''' Parses a JSON file like json.load, but replaces the arrays for
+        whose path (a tuple of keys and indices) streamed(path) holds by
+        a StreamedArray, unless they are short '''
+
+    with open_file(path) as f:
+        reader = _Reader(f, path)
+        if reader.skip() == "\ufeff" and reader.mark()[1] == 0:
+            raise reader.error("Unexpected UTF-8 BOM (decode using utf-8-sig)", 0)
+        value = reader.parse((), streamed)
+        if reader.skip() != "":
+            raise reader.error("Extra data")
+    return value
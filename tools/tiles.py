@@ -0,0 +1,177 @@
+# Expands the tiles of TiledNdArray objects from their URL templates and
+# validates each tile as an NdArray whose shape matches its extent.
+# Tiles are loaded concurrently by a bounded pool of threads, from local
+# directories for the URL prefixes given in a mapping, or over HTTP.
+
+import itertools
+import json
+import math
+import os
+import re
+import urllib.parse
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from jsonschema import ValidationError
+
+from .validator import json_pointer
+
+# Variable expression of an RFC 6570 Level 1 template, e.g. {x}
+TEMPLATE_EXPRESSION = re.compile(r'\{([A-Za-z0-9_]+(?:\.[A-Za-z0-9_]+)*)\}')
+
+DEFAULT_WORKERS = 8
+
+
+def expand_url_template(template, variables):
+    ''' Expands an RFC 6570 Level 1 URI template. Undefined variables
+        expand to an empty string, values are percent-encoded. '''
+
+    def expand(match):
+        value = variables.get(match.group(1))
+        return "" if value is None else urllib.parse.quote(str(value), safe="")
+
+    return TEMPLATE_EXPRESSION.sub(expand, template)
+
+
+def iter_tiles(shape, axis_names, tile_shape):
+    ''' Yields the template variables and the shape of every tile of a
+        tile set. An axis with a null tileShape is not split. '''
+
+    counts = [1 if size is None else math.ceil(n / size) for n, size in zip(shape, tile_shape)]
+    for index in itertools.product(*map(range, counts)):
+        variables = {}
+        extent = []
+        for name, n, size, i in zip(axis_names, shape, tile_shape, index):
+            if size is None:
+                extent.append(n)
+            else:
+                variables[name] = i
+                extent.append(min(size, n - i * size))
+        yield variables, extent
+
+
+def parse_tile_dirs(mappings):
+    ''' Parses PREFIX=DIRECTORY strings into a dict '''
+
+    tile_dirs = {}
+    for mapping in mappings:
+        prefix, sep, directory = mapping.partition("=")
+        if not sep:
+            raise ValueError(f"Expected PREFIX=DIRECTORY, got {mapping}")
+        tile_dirs[prefix] = directory
+    return tile_dirs
+
+
+def load_tile(url, tile_dirs=None):
+    ''' Loads a tile from the local directory of the longest matching URL
+        prefix in tile_dirs, or from the URL otherwise. The URLs come from
+        the document, so tiles are only read from within the directory and
+        only loaded over HTTP(S). Raises ValueError for other URLs. '''
+
+    for prefix in sorted(tile_dirs or {}, key=len, reverse=True):
+        if url.startswith(prefix):
+            relpath = urllib.parse.unquote(url[len(prefix):].lstrip("/"))
+            directory = os.path.realpath(tile_dirs[prefix])
+            path = os.path.realpath(os.path.join(directory, *relpath.split("/")))
+            if os.path.commonpath([directory, path]) != directory:
+                raise ValueError(f"the path is outside of {tile_dirs[prefix]}")
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    if urllib.parse.urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError("only http and https URLs are loaded")
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return json.load(response)
+
+
+def bounded_map(fn, items, workers):
+    ''' Calls fn for all items in a pool of threads, with at most
+        2 * workers calls submitted at a time. Yields each item with
+        the future of its result, in order. '''
+
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+
+def find_tiled_ndarrays(doc):
+    ''' Yields the path and object of all TiledNdArray objects
+        that are the document or ranges of its coverages '''
+
+    if not isinstance(doc, dict):
+        return
+    if doc.get("type") == "TiledNdArray":
+        yield (), doc
+    coverages = [((), doc)]
+    if isinstance(doc.get("coverages"), list):
+        coverages += [(("coverages", i), c) for i, c in enumerate(doc["coverages"])]
+    for path, coverage in coverages:
+        ranges = coverage.get("ranges") if isinstance(coverage, dict) else None
+        if not isinstance(ranges, dict):
+            continue
+        for key, range_ in ranges.items():
+            if isinstance(range_, dict) and range_.get("type") == "TiledNdArray":
+                yield path + ("ranges", key), range_
+
+
+def tile_error(message, path, tile_set):
+    return ValidationError(message, validator="tileSets", path=path,
+                           instance=tile_set, validator_value=tile_set)
+
+
+def check_tile(url, tile, tiled, extent, validator):
+    ''' Yields the messages of all problems of a loaded tile '''
+
+    for error in validator.iter_errors(tile):
+        yield (f"Tile {url} is not a valid NdArray: {error.message} "
+               f"(at {json_pointer(error.absolute_path) or 'the tile root'})")
+    if not isinstance(tile, dict):
+        return
+    if tile.get("shape") != extent:
+        yield f"Tile {url} has shape {tile.get('shape')}, expected {extent}"
+    if tile.get("axisNames") != tiled["axisNames"]:
+        yield f"Tile {url} has axisNames {tile.get('axisNames')}, expected {tiled['axisNames']}"
+    if tile.get("dataType") != tiled["dataType"]:
+        yield f"Tile {url} has dataType {tile.get('dataType')!r}, expected {tiled['dataType']!r}"
+
+
+def iter_tile_errors(doc, validator, tile_dirs=None, workers=DEFAULT_WORKERS):
+    ''' Loads every tile of the TiledNdArray objects of a document, which
+        must be valid against the schemas, and yields a ValidationError for
+        each problem. validator is a validator for /schemas/ndArray, which
+        is used from the calling thread only. '''
+
+    for path, tiled in find_tiled_ndarrays(doc):
+        shape = tiled["shape"]
+        axis_names = tiled["axisNames"]
+        for i, tile_set in enumerate(tiled["tileSets"]):
+            tile_set_path = path + ("tileSets", i)
+            tile_shape = tile_set["tileShape"]
+            if not len(shape) == len(axis_names) == len(tile_shape):
+                yield tile_error("shape, axisNames and tileShape have different lengths",
+                                 tile_set_path, tile_set)
+                continue
+            if any(size is not None and (size < 1 or size != int(size)) for size in tile_shape):
+                yield tile_error(f"tileShape {tile_shape} must contain positive integers",
+                                 tile_set_path, tile_set)
+                continue
+
+            def load(tile):
+                variables, _ = tile
+                return load_tile(expand_url_template(tile_set["urlTemplate"], variables), tile_dirs)
+
+            tiles = iter_tiles(shape, axis_names, tile_shape)
+            for (variables, extent), future in bounded_map(load, tiles, workers):
+                url = expand_url_template(tile_set["urlTemplate"], variables)
+                try:
+                    tile = future.result()
+                except (OSError, ValueError) as e:
+                    yield tile_error(f"Tile {url} cannot be loaded: {e}", tile_set_path, tile_set)
+                    continue
+                for message in check_tile(url, tile, tiled, extent, validator):
+                    yield tile_error(message, tile_set_path, tile_set)
@@ -0,0 +1,49 @@
+# A replacement for the "uniqueItems" keyword that detects duplicates with
+# a set of hashable canonical forms of the items, instead of sorting them
+# or, for items that cannot be sorted (e.g. tuples mixing numbers and null),
+# comparing all pairs of items.
+# The canonical forms are equal exactly if the items are equal in JSON:
+# 1 and 1.0 are equal, but true and 1 are not.
+
+import jsonschema
+
+# Stand-ins for booleans, which Python considers equal to 0 and 1
+_TRUE = object()
+_FALSE = object()
+
+# Types of values that are their own canonical form
+_SCALAR_TYPES = frozenset([int, float, str, type(None)])
+
+
+def canonical(value):
+    ''' Returns a hashable form of a JSON value: arrays become tuples,
+        objects become frozensets of their items '''
+
+    if isinstance(value, list):
+        # Tuples of axis values and polygon positions usually only contain
+        # numbers and strings, which can be taken over as a whole
+        if _SCALAR_TYPES.issuperset(map(type, value)):
+            return tuple(value)
+        return tuple(map(canonical, value))
+    if isinstance(value, bool):
+        return _TRUE if value else _FALSE
+    if isinstance(value, dict):
+        return frozenset((key, canonical(item)) for key, item in value.items())
+    return value
+
+
+def is_unique(container):
+    ''' Checks whether all items of an array are different, in O(n) '''
+
+    seen = set()
+    add = seen.add
+    for item in map(canonical, container):
+        if item in seen:
+            return False
+        add(item)
+    return True
+
+
+def unique_items(validator, unique, instance, schema):
+    if unique and validator.is_type(instance, "array") and not is_unique(instance):
+        yield jsonschema.ValidationError(f"{instance!r} has non-unique elements")
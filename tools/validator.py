@@ -1,68 +1,781 @@
 # Creates a custom JSON schema validator with a reference resolver
-# that can resolve any reference in the /schemas directory
+# that can resolve any reference in the /schemas directory.
+# jsonschema and the optimized keywords are only imported once a validator
+# is created, so that the command line can reject documents that are not
+# CoverageJSON at all, or use a precompiled validator, without them.
 
 import os
 import json
-import jsonschema
+import hashlib
+import itertools
+import pickle
+import tempfile
+import time
+from collections.abc import Mapping
 
+# Find the directory with all the schemas in
+# TODO: find a neater way to get the file path
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../schemas')
 
-def create_schema_store():
-    ''' Creates a store that maps schema ids to schema documents '''
+# Environment variable overriding the location of the persistent cache
+CACHE_DIR_ENV = "COVJSON_VALIDATOR_CACHE_DIR"
 
-    # Find the directory with all the schemas in
-    # TODO: find a neater way to get the file path
-    schema_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../schemas')
+# Environment variable which, set to 1, enables --daemon of the command line
+DAEMON_ENV = "COVJSON_VALIDATOR_DAEMON"
 
-    # Load all the schemas from this directory into the store
-    schema_store = {}
+SCHEMA_STORE_CACHE_PREFIX = "schema-store-"
+
+# Entries of the persistent cache not used for this many seconds are
+# removed, e.g. cached schema stores and precompiled validators
+CACHE_MAX_AGE = 30 * 24 * 3600
+
+# Each schema file <name>.json has the $id /schemas/<name>
+SCHEMA_ID_PREFIX = "/schemas/"
+
+# The values of "type" of the root of CoverageJSON documents,
+# as in /schemas/coveragejson
+DOCUMENT_TYPES = ["Domain", "NdArray", "TiledNdArray", "Coverage", "CoverageCollection"]
+
+
+def list_schema_files(schema_dir=None):
+    ''' Returns the sorted absolute paths of all schema files '''
+
+    if schema_dir is None:
+        schema_dir = SCHEMA_DIR
+
+    paths = []
     for f in os.scandir(schema_dir):
         if f.is_file() and f.path.endswith(".json"):
-            abspath = os.path.abspath(f.path)
-            with open(abspath) as schema_file:
-                schema = json.load(schema_file)
+            paths.append(os.path.abspath(f.path))
+    return sorted(paths)
+
+
+def create_schema_store(schema_dir=None):
+    ''' Creates a store that maps schema ids to schema documents '''
+
+    # Load all the schemas from this directory into the store
+    schema_store = {}
+    for abspath in list_schema_files(schema_dir):
+        with open(abspath) as schema_file:
+            schema = json.load(schema_file)
+        try:
+            schema_store[schema["$id"]] = schema
+        except KeyError:
+            raise KeyError("$id not present in schema " + abspath)
+
+    return schema_store
+
+
+class LazySchemaStore(Mapping):
+    ''' A store that maps schema ids to schema documents, parsing each
+        schema file only when its id is first looked up '''
+
+    def __init__(self, schema_dir=None):
+        # The $id -> file index is derived from the file names,
+        # so no schema needs to be parsed up front
+        self._paths = {}
+        for abspath in list_schema_files(schema_dir):
+            name = os.path.splitext(os.path.basename(abspath))[0]
+            self._paths[SCHEMA_ID_PREFIX + name] = abspath
+        self._schemas = {}
+
+    def __getitem__(self, schema_id):
+        try:
+            return self._schemas[schema_id]
+        except KeyError:
+            pass
+        abspath = self._paths[schema_id]
+        with open(abspath) as schema_file:
+            schema = json.load(schema_file)
+        if schema.get("$id") != schema_id:
+            raise KeyError(f"$id of schema {abspath} must be {schema_id}")
+        self._schemas[schema_id] = schema
+        return schema
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+    @property
+    def loaded(self):
+        ''' The ids of the schemas that have been parsed so far '''
+        return set(self._schemas)
+
+
+def get_cache_dir():
+    ''' Returns the directory used for persistent caches '''
+
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+    cache_home = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "covjson-validator")
+
+
+def schema_store_fingerprint(schema_dir=None):
+    ''' Returns a hash of the names and contents of all schema files '''
+
+    digest = hashlib.sha256()
+    for abspath in list_schema_files(schema_dir):
+        with open(abspath, "rb") as schema_file:
+            data = schema_file.read()
+        digest.update(os.path.basename(abspath).encode("utf-8") + b"\0")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def schema_files_signature(schema_dir=None):
+    ''' Returns a hash of the paths, sizes, modification times and inodes
+        of all schema files, which changes whenever a schema file is
+        changed, replaced, added or removed, without reading them '''
+
+    digest = hashlib.sha256()
+    for abspath in list_schema_files(schema_dir):
+        stat = os.stat(abspath)
+        digest.update(f"{abspath}\0{stat.st_size}\0{stat.st_mtime_ns}\0{stat.st_ino}\0"
+                      .encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prune_cache(cache_dir, prefix, keep_path):
+    ''' Removes the cache entries whose names start with prefix, other than
+        keep_path, that were not used for CACHE_MAX_AGE seconds. Entries of
+        other checkouts or interpreters sharing the cache directory are
+        kept while they are used. '''
+
+    cutoff = time.time() - CACHE_MAX_AGE
+    for f in os.scandir(cache_dir):
+        if f.name.startswith(prefix) and f.path != keep_path:
             try:
-                schema_store[schema["$id"]] = schema
-            except KeyError:
-                raise KeyError("$id not present in schema " + abspath)
+                if f.stat().st_mtime < cutoff:
+                    os.remove(f.path)
+            except FileNotFoundError:
+                pass
+
+
+def load_cached_schema_store(schema_dir=None, cache_dir=None):
+    ''' Returns the schema store, reading it from the persistent cache if
+        the schema files are unchanged, and rebuilding and caching it
+        otherwise. Cache entries are keyed by schema_files_signature. '''
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+
+    signature = schema_files_signature(schema_dir)
+    cache_path = os.path.join(
+        cache_dir, f"{SCHEMA_STORE_CACHE_PREFIX}{signature}.pickle")
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+        if cached["signature"] == signature:
+            # Marks the entry as used for prune_cache
+            os.utime(cache_path)
+            return cached["store"]
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+        pass
+
+    schema_store = create_schema_store(schema_dir)
+    cached = {"signature": signature, "store": schema_store}
+
+    # A cache that cannot be written (e.g. read-only file system)
+    # only costs the speed-up, never the result
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        finally:
+            # Left behind if writing or replacing failed
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        prune_cache(cache_dir, SCHEMA_STORE_CACHE_PREFIX, cache_path)
+    except OSError:
+        pass
 
     return schema_store
 
 
-def create_custom_validator(schema_id, schema_store=None):
-    ''' Creates a validator that uses the custom schema store '''
+# Annotation keywords that do not affect validation
+ANNOTATION_KEYWORDS = {"$comment", "description", "title"}
+
+
+def find_discriminator(all_of):
+    ''' Finds "allOf" branches of the form
+        { "if": { "properties": { <name>: { "const": <string> } } }, "then": ... }
+        (optionally with "type": "object" in "if") sharing the same property.
+        Returns the property name, a map from each const value to the
+        indices of its branches and the set of all these indices, or None
+        if there are fewer than two such branches. '''
+
+    name = None
+    branches = {}
+    for index, branch in enumerate(all_of):
+        if not isinstance(branch, dict) or \
+                set(branch) - ANNOTATION_KEYWORDS != {"if", "then"}:
+            continue
+        condition = branch["if"]
+        if not isinstance(condition, dict) or \
+                set(condition) - ANNOTATION_KEYWORDS - {"type"} != {"properties"} or \
+                condition.get("type", "object") != "object":
+            continue
+        properties = condition["properties"]
+        if not isinstance(properties, dict) or len(properties) != 1:
+            continue
+        (prop, prop_schema), = properties.items()
+        if not isinstance(prop_schema, dict) or prop_schema.keys() != {"const"} or \
+                not isinstance(prop_schema["const"], str):
+            continue
+        if name is not None and prop != name:
+            return None
+        name = prop
+        branches.setdefault(prop_schema["const"], []).append(index)
+
+    discriminated = set().union(*branches.values())
+    if len(discriminated) < 2:
+        return None
+    return name, branches, discriminated
+
+
+_DISCRIMINATORS = {}
+
+
+def dispatching_all_of(validator, all_of, instance, schema):
+    ''' "allOf" keyword that reads the discriminator of if/then branches
+        once and only evaluates the branch it selects, yielding the same
+        errors as evaluating every branch '''
+
+    try:
+        cached = _DISCRIMINATORS[id(all_of)]
+    except KeyError:
+        # The schema is kept alive so that its id cannot be reused
+        cached = _DISCRIMINATORS[id(all_of)] = (all_of, find_discriminator(all_of))
+    discriminator = cached[1]
+
+    # Without the discriminator every "if" with "properties" alone holds
+    # (and those with "type": "object" fail for non-objects), so the
+    # generic evaluation is needed
+    if discriminator is None or not isinstance(instance, dict) or \
+            discriminator[0] not in instance:
+        import jsonschema
+        yield from jsonschema.validators.Draft202012Validator.VALIDATORS["allOf"](
+            validator, all_of, instance, schema)
+        return
+
+    name, branches, discriminated = discriminator
+    value = instance[name]
+    selected = branches.get(value, ()) if isinstance(value, str) else ()
+    for index, subschema in enumerate(all_of):
+        if index in selected:
+            # Same errors as the "if" keyword yields when its condition holds
+            for error in validator.descend(instance, subschema["then"], schema_path="then"):
+                error.schema_path.appendleft(index)
+                yield error
+        elif index not in discriminated:
+            yield from validator.descend(instance, subschema, schema_path=index)
 
+
+_VALIDATOR_CLASSES = {}
+
+
+def get_validator_class(dispatch=False, fast_items=False, memoize=False):
+    ''' Returns the Draft 2020-12 validator class, extended with the
+        given keyword optimizations '''
+
+    key = (dispatch, fast_items, memoize)
+    if key not in _VALIDATOR_CLASSES:
+        import jsonschema
+        from .fast_items import fast_items as fast_items_keyword
+        from .lazy_ref import lazy_ref
+        from .memo import memoizing_ref
+        from .unique_items import unique_items as unique_items_keyword
+        keywords = {}
+        if dispatch:
+            keywords["allOf"] = dispatching_all_of
+        if fast_items:
+            keywords["items"] = fast_items_keyword
+            keywords["uniqueItems"] = unique_items_keyword
+            keywords["$ref"] = lazy_ref
+        if memoize:
+            keywords["$ref"] = memoizing_ref
+        cls = jsonschema.validators.Draft202012Validator
+        if keywords:
+            cls = jsonschema.validators.extend(cls, keywords)
+        _VALIDATOR_CLASSES[key] = cls
+    return _VALIDATOR_CLASSES[key]
+
+
+def create_custom_validator(schema_id, schema_store=None, dispatch=False,
+                            fast_items=False, memoize=False):
+    ''' Creates a validator that uses the custom schema store.
+        With dispatch, if/then chains in "allOf" that are selected by the
+        value of one property (e.g. "type") only evaluate the matching
+        branch. With fast_items, long arrays of primitive values (e.g. NdArray
+        "values") are type-checked in bulk, "uniqueItems" is checked by
+        hashing the items, also for arrays of tuples or polygons, and the
+        errors of references are yielded as they are found (see
+        tools/lazy_ref.py), so that the first errors are found without all
+        others. With memoize, identical domains are only validated once per
+        process (see tools/memo.py). '''
+
+    import jsonschema
     if schema_store is None:
-        schema_store = create_schema_store()
+        schema_store = LazySchemaStore()
     schema = schema_store[schema_id]
 
-    resolver = jsonschema.RefResolver(None, referrer=None, store=schema_store)
+    if isinstance(schema_store, LazySchemaStore):
+        # Schemas are resolved on first reference through the handler for
+        # scheme-less URIs, as passing the store would load all of them
+        resolver = jsonschema.RefResolver(
+            None, referrer=None, handlers={"": schema_store.__getitem__})
+    else:
+        resolver = jsonschema.RefResolver(None, referrer=None, store=schema_store)
     # TODO: should be able to use validator_for(schema) to get an appropriate
     # validator, but the resulting validator doesn't seem to work
-    validator = jsonschema.validators.Draft202012Validator(schema, resolver=resolver)
+    cls = get_validator_class(dispatch, fast_items, memoize)
+    validator = cls(schema, resolver=resolver)
 
     return validator
 
 
+def create_schema_registry(schema_store):
+    ''' Returns an immutable referencing.Registry of all schemas of the
+        store, with their subschemas and anchors indexed up front '''
+
+    import referencing
+    import referencing.jsonschema
+    return referencing.Registry().with_resources(
+        (schema_id, referencing.Resource.from_contents(
+            schema, default_specification=referencing.jsonschema.DRAFT202012))
+        for schema_id, schema in schema_store.items()
+    ).crawl()
+
+
+def create_lookup_caching_ref():
+    ''' Returns a replacement for the "$ref" keyword of validators with a
+        registry, which remembers the lookup of every reference from every
+        base URI. The lookups are immutable and the schemas of this
+        repository have no dynamic references, which depend on more than
+        the base URI. The base URI is read from internals of jsonschema and
+        referencing (see the versions in requirements.txt); without them,
+        references are looked up by the "$ref" keyword of jsonschema. '''
+
+    import jsonschema
+    import referencing.exceptions
+    ref_keyword = jsonschema.validators.Draft202012Validator.VALIDATORS["$ref"]
+    wrapped_error = getattr(jsonschema.exceptions, "_WrappedReferencingError", None)
+    lookups = {}
+
+    def lookup_caching_ref(validator, ref, instance, schema):
+        resolver = getattr(validator, "_resolver", None)
+        base_uri = getattr(resolver, "_base_uri", None)
+        if base_uri is None or wrapped_error is None:
+            yield from ref_keyword(validator, ref, instance, schema)
+            return
+        key = (base_uri, ref)
+        resolved = lookups.get(key)
+        if resolved is None:
+            try:
+                resolved = resolver.lookup(ref)
+            except referencing.exceptions.Unresolvable as err:
+                raise wrapped_error(err) from err
+            lookups[key] = resolved
+        yield from validator.descend(instance, resolved.contents, resolver=resolved.resolver)
+
+    return lookup_caching_ref
+
+
+def create_shared_validator(schema_id, schema_store=None, dispatch=False, fast_items=False):
+    ''' Creates a validator like create_custom_validator which can be
+        shared by many threads: references are looked up in an immutable
+        registry (see create_schema_registry) instead of a RefResolver,
+        whose scope stack is changed by every validation. Domains are not
+        memoized, as the memo is not meant to be shared by threads. '''
+
+    import jsonschema
+    if schema_store is None:
+        schema_store = LazySchemaStore()
+    # The lookups cached by "$ref" belong to the registry
+    cls = jsonschema.validators.extend(get_validator_class(dispatch, fast_items),
+                                       {"$ref": create_lookup_caching_ref()})
+    return cls(schema_store[schema_id], registry=create_schema_registry(schema_store))
+
+
+def iter_limited_errors(validator, instance, max_errors=None):
+    ''' Yields the first max_errors validation errors of an instance, or
+        all of them, and stops the validation once they are found. The
+        errors are those of iter_errors, in the same order. '''
+
+    errors = validator.iter_errors(instance)
+    try:
+        yield from itertools.islice(errors, max_errors)
+    finally:
+        # Ends the validation of a generator that was not exhausted
+        close = getattr(errors, "close", None)
+        if close is not None:
+            close()
+
+
+def print_errors(errors, quiet=False, max_examples=None):
+    ''' Prints validation errors as "Invalid:" lines as they are found, or
+        with max_examples, once all are found, one entry per group of
+        repeated errors (see tools/aggregate.py). quiet prints nothing.
+        Returns the number of errors. '''
+
+    if max_examples is not None:
+        from .aggregate import aggregate_errors
+        groups = aggregate_errors(errors, max_examples)
+        for group in groups:
+            print("Invalid: " + group.format(), flush=True)
+        return sum(group.count for group in groups)
+    count = 0
+    for error in errors:
+        count += 1
+        if not quiet:
+            print("Invalid: " + format_error(error), flush=True)
+    return count
+
+
+# Validation messages longer than this are shortened by format_error
+MAX_MESSAGE_LENGTH = 300
+
+
+def json_pointer(path):
+    ''' Returns the JSON pointer (RFC 6901) of a path of keys and indices '''
+
+    return "".join(
+        "/" + str(key).replace("~", "~0").replace("/", "~1") for key in path)
+
+
+def format_message(message, path):
+    ''' Describes a problem at a path of a document on a single line '''
+
+    if len(message) > MAX_MESSAGE_LENGTH:
+        message = message[:MAX_MESSAGE_LENGTH - 3] + "..."
+    pointer = json_pointer(path)
+    return f"{message} (at {pointer or 'the document root'})"
+
+
+def format_error(error):
+    ''' Describes a validation error on a single line '''
+
+    return format_message(error.message, error.absolute_path)
+
+
+def find_best_error(validator, instance):
+    ''' Returns the most relevant validation error of a document (see
+        jsonschema.exceptions.best_match), or None if it is valid. The
+        command line and the daemon report it for invalid documents. '''
+
+    # Precompiled validators do not import jsonschema for valid documents
+    if validator.is_valid(instance):
+        return None
+    from jsonschema.exceptions import best_match
+    return best_match(validator.iter_errors(instance))
+
+
+def check_document_type(obj):
+    ''' Returns a description of why a document is not a CoverageJSON
+        object of one of the DOCUMENT_TYPES, like format_error does, or None.
+        Such documents are rejected without a validator. '''
+
+    if not isinstance(obj, dict):
+        return format_message(f"{obj!r} is not of type 'object'", [])
+    if "type" not in obj:
+        return format_message("'type' is a required property", [])
+    if obj["type"] not in DOCUMENT_TYPES:
+        return format_message(f"{obj['type']!r} is not one of {DOCUMENT_TYPES!r}", ["type"])
+    return None
+
+
 if __name__ == "__main__":
     import argparse
+    import sys
+
+    if sys.argv[1:2] == ["serve"]:
+        from .server import main
+        main(sys.argv[2:])
+        sys.exit()
+
     parser = argparse.ArgumentParser()
     parser.add_argument('--source', type=str, choices=['url', 'file'], default='file', help='Source of the CoverageJSON document')
-    parser.add_argument('covjson_path', type=str,
-                        help='Path to CoverageJSON document')
-    
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always load the schemas from the schemas directory '
+                             f'instead of the persistent cache (location: ${CACHE_DIR_ENV})')
+    parser.add_argument('--stream', action='store_true',
+                        help='Read the values of ranges from the file while validating '
+                             'instead of loading them into memory (for huge files)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of processes validating several files '
+                             '(default: number of CPUs)')
+    parser.add_argument('--chunksize', type=int, default=16,
+                        help='Number of files sent to a worker process at a time')
+    parser.add_argument('--worker-stats', action='store_true',
+                        help='Print the startup time and memory use of every worker '
+                             'process to stderr')
+    parser.add_argument('--result-cache', type=str, nargs='?', const='', default=None,
+                        metavar='PATH',
+                        help='Reuse the results for files validated before, stored in an '
+                             'SQLite database (default: results.sqlite in the cache directory)')
+    parser.add_argument('--result-cache-size', type=int, default=None,
+                        help='Maximum number of results kept in the result cache')
+    parser.add_argument('--collection-workers', type=int, default=None, metavar='N',
+                        help='Validate the coverages of a large CoverageCollection '
+                             'in N processes')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the calls and time of every keyword of the schemas '
+                             'to stderr, most expensive first')
+    parser.add_argument('--profile-top', type=int, default=25, metavar='N',
+                        help='Number of keywords printed by --profile')
+    parser.add_argument('--profile-stacks', type=str, default=None, metavar='PATH',
+                        help='Write the keyword stacks of --profile in the collapsed '
+                             'format of flamegraph.pl to PATH')
+    parser.add_argument('--no-semantic', action='store_true',
+                        help='Skip the checks that cannot be expressed in the schemas, '
+                             'e.g. that the number of values of an NdArray matches its shape')
+    parser.add_argument('--loader', choices=['auto', 'json', 'orjson', 'simdjson'],
+                        default='auto',
+                        help='JSON parser of the documents (default: orjson or simdjson '
+                             'if installed, json otherwise)')
+    parser.add_argument('--freeze-gc', action='store_true',
+                        help='Pause the garbage collector while parsing a single document '
+                             'and exclude the document from later collections')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Validate a single file in a background process that is started '
+                             'by the first call and kept warm for later calls '
+                             f'(also enabled by ${DAEMON_ENV}=1)')
+    parser.add_argument('--daemon-idle-timeout', type=float, default=600, metavar='SECONDS',
+                        help='Seconds without calls after which the daemon exits')
+    parser.add_argument('--tiles', action='store_true',
+                        help='Load and validate all tiles of TiledNdArray ranges')
+    parser.add_argument('--tile-dir', action='append', default=[], metavar='PREFIX=DIR',
+                        help='Load tiles whose URL starts with PREFIX from the local '
+                             'directory DIR instead, can be repeated')
+    parser.add_argument('--tile-workers', type=int, default=8,
+                        help='Number of threads loading tiles')
+    errors_group = parser.add_mutually_exclusive_group()
+    errors_group.add_argument('--quick', action='store_true',
+                              help='Stop at the first error and only print whether the '
+                                   'document is valid')
+    errors_group.add_argument('--max-errors', type=int, default=None, metavar='N',
+                              help='Print the first N errors as they are found and stop')
+    errors_group.add_argument('--all', action='store_true',
+                              help='Print all errors as they are found instead of the '
+                                   'most relevant one')
+    parser.add_argument('--aggregate', action='store_true',
+                        help='Print all errors (or the first --max-errors) grouped by keyword '
+                             'and schema path, with their count and the paths and index '
+                             'ranges of the first errors')
+    parser.add_argument('--aggregate-examples', type=int, default=5, metavar='K',
+                        help='Number of paths and index ranges printed per group')
+    parser.add_argument('covjson_path', type=str, nargs='+',
+                        help='Path to CoverageJSON document. Several paths, glob patterns '
+                             'or directories validate all files and print one line per file')
+
     args = parser.parse_args()
+    if args.stream and args.source != 'file':
+        parser.error('--stream requires --source=file')
+    if args.source == 'url' and len(args.covjson_path) > 1:
+        parser.error('only one URL can be validated at a time')
+
+    if args.result_cache is not None and args.source != 'file':
+        parser.error('--result-cache requires --source=file')
+    if args.profile_stacks:
+        args.profile = True
+    from .loader import get_backend
+    try:
+        get_backend(args.loader)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.profile and args.collection_workers:
+        parser.error('--profile cannot be combined with --collection-workers')
+    if args.max_errors is not None and args.max_errors < 1:
+        parser.error('--max-errors must be at least 1')
+    if args.aggregate and args.quick:
+        parser.error('--aggregate cannot be combined with --quick')
+    if args.aggregate_examples < 1:
+        parser.error('--aggregate-examples must be at least 1')
+    # Errors are reported as they are found instead of the best match
+    report_errors = args.quick or args.all or args.max_errors is not None or args.aggregate
+    max_examples = args.aggregate_examples if args.aggregate else None
+
+    path = args.covjson_path[0]
+    daemon = args.daemon or os.environ.get(DAEMON_ENV) == "1"
+    # Other options are only supported without the daemon
+    if daemon and args.source == 'file' and len(args.covjson_path) == 1 and \
+            os.path.isfile(path) and args.result_cache is None and \
+            not (args.no_cache or args.stream or args.profile or args.collection_workers or
+                 args.tiles or args.freeze_gc or report_errors):
+        from .daemon import DaemonError, get_socket_path, run_client
+        try:
+            socket_path = get_socket_path(schema_store_fingerprint())
+            status = run_client(socket_path, path, not args.no_semantic, args.loader,
+                                args.daemon_idle_timeout)
+        except (OSError, DaemonError) as e:
+            print(f"Not using the daemon: {e}", file=sys.stderr)
+        else:
+            if status is not None:
+                sys.exit(status)
+            print("Not using the daemon: it did not start", file=sys.stderr)
 
-    if args.source == 'url':
+    if args.result_cache is not None or \
+            args.source == 'file' and (len(args.covjson_path) > 1 or os.path.isdir(path) or
+                                       not os.path.exists(path) and any(c in path for c in '*?[')):
+        if report_errors:
+            parser.error('--quick, --max-errors, --all and --aggregate require a single '
+                         'document')
+        from .batch import VALID, expand_paths, validate_files
+        from .result_cache import ResultCache, format_stats, get_result_cache_path
+        from .memo import get_stats as get_domain_stats
+        result_cache = args.result_cache
+        if result_cache is not None:
+            result_cache = result_cache or get_result_cache_path()
+            # Per-run statistics are the difference of the totals
+            cache = ResultCache("", "", result_cache)
+            if args.result_cache_size is not None:
+                cache.max_entries = args.result_cache_size
+            stats_before = cache.stats()
+        start = time.perf_counter()
+        count = failed = 0
+        domain_stats = dict.fromkeys(get_domain_stats(), 0)
+        worker_stats = []
+        results = validate_files(expand_paths(args.covjson_path), args.workers,
+                                 args.chunksize, args.no_cache, args.stream, result_cache,
+                                 not args.no_semantic, domain_stats, args.loader, worker_stats)
+        for file_path, status, message in results:
+            count += 1
+            if status == VALID:
+                print(f"{file_path}: {status}", flush=True)
+            else:
+                failed += 1
+                print(f"{file_path}: {status}: {message}", flush=True)
+        elapsed = time.perf_counter() - start
+        print(f"{count} files, {failed} invalid, {elapsed:.1f} s "
+              f"({count / elapsed:.1f} files/s)", file=sys.stderr)
+        if result_cache is not None:
+            stats = cache.stats()
+            for name in ["hits", "misses", "saved_seconds"]:
+                stats[name] -= stats_before[name]
+            cache.close()
+            print("Result cache: " + format_stats(stats), file=sys.stderr)
+        if domain_stats["hits"]:
+            print("Repeated domains: " + format_stats(domain_stats), file=sys.stderr)
+        if args.worker_stats and worker_stats:
+            from .pool import format_worker_stats
+            print(format_worker_stats(worker_stats), file=sys.stderr)
+        sys.exit(1 if failed else 0)
+    elif args.profile and len(args.covjson_path) > 1:
+        parser.error('--profile requires a single document')
+
+    if args.stream:
+        from .stream import load_streamed
+        obj = load_streamed(path)
+    elif args.source == 'url':
         import requests
+        from .compression import open_stream
+        from .loader import load_stream
         # Get the file from the URL
-        response = requests.get(args.covjson_path)
+        response = requests.get(path, stream=True)
         response.raise_for_status()  # Raise an exception if the request was unsuccessful
-        obj = response.json()
+        # Undo the Content-Encoding, then decompress compressed documents.
+        # The response must stay open at its end for the buffered reader.
+        response.raw.decode_content = True
+        response.raw.auto_close = False
+        with response, open_stream(response.raw) as f:
+            obj = load_stream(f, args.loader)
     else:
         # Assume the covjson_path is a local file
-        with open(args.covjson_path, encoding="utf-8") as f:
-            obj = json.load(f)
+        from .loader import load_file
+        obj = load_file(path, args.loader, args.freeze_gc)
+
+    # Documents that are not CoverageJSON at all are rejected before
+    # anything is loaded for the validation
+    message = check_document_type(obj)
+    if message is not None:
+        print("Invalid: " + message)
+        sys.exit(1)
+
+    precompiled = None
+    if not (args.no_cache or args.collection_workers or args.profile or args.stream or
+            args.tiles):
+        # Written by python -m tools.compile_validator --cache
+        from .compile_validator import load_precompiled_module
+        precompiled = load_precompiled_module()
+    if precompiled is not None:
+        validator = precompiled.Validator("/schemas/coveragejson")
+    else:
+        if args.no_cache:
+            schema_store = create_schema_store()
+        else:
+            schema_store = load_cached_schema_store()
+        if args.collection_workers:
+            from .collection import CollectionValidator
+            validator = CollectionValidator(schema_store, args.collection_workers)
+        else:
+            # Only the coverages of a collection can repeat a domain, hashing
+            # those of other documents would be wasted
+            validator = create_custom_validator(
+                "/schemas/coveragejson", schema_store, dispatch=True, fast_items=True,
+                memoize=obj["type"] == "CoverageCollection")
+
+    max_errors = 1 if args.quick else args.max_errors
+    found = 0
+    if args.profile:
+        from .profiler import KeywordProfiler
+        profiler = KeywordProfiler(schema_store)
+        validator = profiler.instrument(validator)
+    try:
+        if report_errors:
+            found = print_errors(iter_limited_errors(validator, obj, max_errors),
+                                 args.quick, max_examples)
+        else:
+            error = find_best_error(validator, obj)
+            if error is not None:
+                found = print_errors([error])
+    finally:
+        if args.profile:
+            print(profiler.report(args.profile_top), file=sys.stderr)
+            if args.profile_stacks:
+                with open(args.profile_stacks, "w") as f:
+                    profiler.write_collapsed(f)
+    if precompiled is not None:
+        # Domains are not memoized
+        domain_stats = {"hits": 0}
+    elif args.collection_workers:
+        domain_stats = validator.domain_stats
+    else:
+        from .memo import get_stats as get_domain_stats
+        domain_stats = get_domain_stats()
+    if domain_stats["hits"]:
+        from .result_cache import format_stats
+        print("Repeated domains: " + format_stats(domain_stats), file=sys.stderr)
 
-    validator = create_custom_validator("/schemas/coveragejson")
-    validator.validate(obj)
+    # Checks beyond the schemas, of documents valid against them
+    checks = []
+    if not found and not args.no_semantic:
+        from .semantic import iter_semantic_errors
+        checks.append(iter_semantic_errors(obj))
+    if not found and args.tiles:
+        from .tiles import iter_tile_errors, parse_tile_dirs
+        ndarray_validator = create_custom_validator("/schemas/ndArray", schema_store,
+                                                    dispatch=True, fast_items=True)
+        try:
+            tile_dirs = parse_tile_dirs(args.tile_dir)
+        except ValueError as e:
+            parser.error(str(e))
+        checks.append(iter_tile_errors(obj, ndarray_validator, tile_dirs, args.tile_workers))
+    errors = itertools.chain.from_iterable(checks)
+    if report_errors:
+        errors = itertools.islice(errors, max_errors)
+    found += print_errors(errors, args.quick, max_examples)
+    if found:
+        if args.quick:
+            print("Invalid")
+        sys.exit(1)
     print("Valid!")